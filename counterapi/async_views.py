@@ -0,0 +1,171 @@
+"""
+Async counterparts of the hot counter endpoints, for ASGI deployments.
+
+They build their bodies with the same helpers as the views in ``views.py``
+(see ``orders``), so both return the same JSON. Reads use Django's
+async ORM; placing an order runs ``submit_order`` in a worker thread because
+its transaction has to stay on one connection.
+"""
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+
+from django.utils import timezone
+
+from v1.asyncapi import api_response, async_api_view, parse_json_body
+from v1.idempotency import idempotent
+from v1.pricing import OrderError
+from v1.models import Order, OrderItem
+
+from .orders import order_details_body, place_order_body, recent_order_body, submit_order
+
+
+# Orders per page of the recent orders list, as in orders_past_three_hours
+RECENT_ORDERS_PAGE_SIZE = 10
+
+
+@async_api_view(['POST'])
+@idempotent
+async def place_order(request, outlet_id):
+    data = parse_json_body(request)
+    if not isinstance(data, dict):
+        return api_response({
+            "error": True,
+            "details": "Request body must be a JSON object"
+        }, status=400)
+
+    def place():
+        # Serializing reads the order's items, so it runs in the worker thread too
+        return place_order_body(*submit_order(outlet_id, data))
+
+    try:
+        response_data, status_code = await sync_to_async(place)()
+        return api_response(response_data, status=status_code)
+
+    except OrderError as e:
+        return api_response({
+            "error": True,
+            "details": str(e)
+        }, status=400)
+    except Exception as e:
+        return api_response({
+            "error": True,
+            "details": f"An error occurred: {str(e)}"
+        }, status=500)
+
+
+
+
+
+
+
+
+
+
+@async_api_view(['GET'])
+async def orders_past_three_hours(request, outlet_id):
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    if page < 1:
+        return api_response({
+            "error": True,
+            "details": "Invalid page."
+        }, status=404)
+
+    try:
+        # Calculate the time 3 hours ago from now
+        three_hours_ago = timezone.now() - timedelta(hours=3)
+
+        # Filter orders for the specific outlet and within the past three hours
+        orders = Order.objects.filter(
+            outlet_id=outlet_id,
+            order_date__gte=three_hours_ago
+        ).order_by('-order_date')
+
+        total_orders = await orders.acount()
+        total_pages = max(1, -(-total_orders // RECENT_ORDERS_PAGE_SIZE))
+        if page > total_pages:
+            return api_response({
+                "error": True,
+                "details": "Invalid page."
+            }, status=404)
+
+        offset = (page - 1) * RECENT_ORDERS_PAGE_SIZE
+        result_page = [
+            recent_order_body(order) async for order in orders[offset:offset + RECENT_ORDERS_PAGE_SIZE]
+        ]
+
+        def page_url(number):
+            query = request.GET.copy()
+            if number == 1:
+                query.pop('page', None)
+            else:
+                query['page'] = number
+            return request.build_absolute_uri(f"{request.path}?{query.urlencode()}" if query else request.path)
+
+        return api_response({
+            "error": False,
+            "details": "Orders fetched successfully",
+            "current_page": page,
+            "total_orders": total_orders,
+            "orders_on_current_page": len(result_page),
+            "total_pages": total_pages,
+            "next_page_url": page_url(page + 1) if page < total_pages else None,
+            "previous_page_url": page_url(page - 1) if page > 1 else None,
+            "orders": result_page,
+        }, status=200)
+    except Exception as e:
+        return api_response({
+            "error": True,
+            "details": f"An error occurred: {str(e)}"
+        }, status=500)
+
+
+
+
+
+
+
+
+
+
+@async_api_view(['GET'])
+async def order_details(request, outlet_id):
+    order_number = request.GET.get('order_number')
+
+    if not order_number:
+        return api_response({
+            "error": True,
+            "details": "Order number is required"
+        }, status=400)
+
+    try:
+        # Get the order based on outlet_id and order_number
+        order = await Order.objects.select_related('customer').filter(
+            outlet_id=outlet_id, order_number=order_number
+        ).afirst()
+
+        if not order:
+            return api_response({
+                "error": True,
+                "details": "Order not found"
+            }, status=404)
+
+        # Related rows are joined up front; lazy loads are not allowed in async code
+        items = [
+            item async for item in OrderItem.objects.filter(order=order).select_related('product', 'product_variant')
+        ]
+
+        return api_response({
+            "error": False,
+            "details": "Order fetched successfully",
+            "order": order_details_body(order, items),
+        }, status=200)
+
+    except Exception as e:
+        return api_response({
+            "error": True,
+            "details": f"An error occurred: {str(e)}"
+        }, status=500)
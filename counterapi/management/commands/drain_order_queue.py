@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from v1.models import Order
+
+from counterapi import order_queue
+from counterapi.orders import from_queue_payload, write_orders
+
+
+class Command(BaseCommand):
+    help = "Write orders accepted in queued ingestion mode to the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Maximum orders written per transaction.")
+        parser.add_argument('--interval', type=float, default=0.5, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain what is queued now and exit.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            written = self.drain_batch(batch_size)
+            if written:
+                self.stdout.write(f"Wrote {written} queued order(s)")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def drain_batch(self, batch_size):
+        batch = order_queue.fetch_batch(batch_size)
+        if not batch:
+            return 0
+
+        # A crash between commit and acknowledge leaves written orders in the queue; skip them on restart
+        order_numbers = [payload['order_number'] for _, payload in batch]
+        already_written = set(
+            Order.objects.filter(order_number__in=order_numbers).values_list('order_number', flat=True)
+        )
+        pending = [(queue_id, payload) for queue_id, payload in batch if payload['order_number'] not in already_written]
+
+        try:
+            write_orders([from_queue_payload(payload) for _, payload in pending])
+        except Exception:
+            # Retry one by one so a single bad order does not block the rest of the batch
+            for queue_id, payload in pending:
+                try:
+                    write_orders([from_queue_payload(payload)])
+                except Exception as e:
+                    order_queue.mark_failed(queue_id, str(e))
+                    self.stderr.write(f"Order {payload['order_number']} failed: {e}")
+                else:
+                    order_queue.acknowledge([queue_id])
+            order_queue.acknowledge([queue_id for queue_id, payload in batch if payload['order_number'] in already_written])
+            return len(batch)
+
+        order_queue.acknowledge([queue_id for queue_id, _ in batch])
+        return len(batch)
@@ -0,0 +1,82 @@
+"""
+Durable local queue for write-behind order ingestion.
+
+Accepted orders are appended to a separate SQLite file (``ORDER_QUEUE_PATH``)
+in WAL mode with full fsync, so an order survives a crash once it is queued
+and queueing never waits on the main database's write lock. The
+``drain_order_queue`` management command writes queued orders to the main
+database in batches.
+"""
+import json
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+
+_local = threading.local()
+
+
+def get_queue_path():
+    return str(getattr(settings, 'ORDER_QUEUE_PATH', settings.BASE_DIR / 'order_queue.sqlite3'))
+
+
+def get_connection():
+    path = get_queue_path()
+    connection = getattr(_local, 'connection', None)
+    if connection is None or _local.path != path:
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=FULL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS queued_order ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' order_number TEXT NOT NULL UNIQUE,'
+            ' payload TEXT NOT NULL,'
+            ' enqueued_at TEXT NOT NULL,'
+            ' failed_at TEXT,'
+            ' error TEXT)'
+        )
+        _local.connection = connection
+        _local.path = path
+    return connection
+
+
+def enqueue(payload):
+    get_connection().execute(
+        'INSERT INTO queued_order (order_number, payload, enqueued_at) VALUES (?, ?, ?)',
+        (payload['order_number'], json.dumps(payload), timezone.now().isoformat()),
+    )
+
+
+def fetch_batch(limit):
+    """Return up to ``limit`` ``(id, payload)`` pairs in arrival order, skipping failed entries."""
+    rows = get_connection().execute(
+        'SELECT id, payload FROM queued_order WHERE failed_at IS NULL ORDER BY id LIMIT ?',
+        (limit,),
+    ).fetchall()
+    return [(queue_id, json.loads(payload)) for queue_id, payload in rows]
+
+
+def acknowledge(queue_ids):
+    queue_ids = list(queue_ids)
+    connection = get_connection()
+    # Chunked to stay under SQLite's bound-parameter limit
+    for start in range(0, len(queue_ids), 500):
+        chunk = queue_ids[start:start + 500]
+        connection.execute(
+            f"DELETE FROM queued_order WHERE id IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+
+
+def mark_failed(queue_id, error):
+    get_connection().execute(
+        'UPDATE queued_order SET failed_at = ?, error = ? WHERE id = ?',
+        (timezone.now().isoformat(), error, queue_id),
+    )
+
+
+def pending_count():
+    return get_connection().execute('SELECT COUNT(*) FROM queued_order WHERE failed_at IS NULL').fetchone()[0]
@@ -0,0 +1,242 @@
+"""
+Order building blocks shared by the counter order paths.
+
+An order travels as a plain dict (see ``build_pending_order``) so the same
+data can be written straight away, queued for the drain worker, or written in
+bulk. Every write goes through ``write_orders``, which inserts any number of
+orders with a fixed number of queries inside one transaction.
+
+The ``*_body`` helpers build the response bodies of both the DRF views and
+their async counterparts, so the two return the same JSON.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from v1.catalog import fetch_price_entries, get_price_table
+from v1.customers import upsert_customers
+from v1.order_events import record_created
+from v1.order_numbers import next_order_number
+from v1.pricing import OrderError, collect_catalog_ids, price_lines
+from v1.models import Order, OrderItem
+
+from . import order_queue
+from .serializers import OrderSerializer
+
+
+def parse_order_date(value):
+    """Parse a client supplied order timestamp, e.g. from a counter that was offline."""
+    if not value:
+        return timezone.now()
+    try:
+        order_date = parse_datetime(value)
+    except (TypeError, ValueError):
+        order_date = None
+    if order_date is None:
+        raise OrderError("Invalid order_date")
+    if timezone.is_naive(order_date):
+        order_date = timezone.make_aware(order_date)
+    return order_date
+
+
+def build_pending_order(outlet_id, order_number, data, lines, total_price, total_gst, order_date=None):
+    customer_data = data.get('customer') or {}
+    return {
+        'outlet_id': outlet_id,
+        'order_number': order_number,
+        'order_date': order_date or timezone.now(),
+        'address': data.get('address', ''),
+        'mode': data.get('mode', ''),
+        'total_price': total_price,
+        'gst': total_gst,
+        'customer': {
+            'name': customer_data.get('name'),
+            'phone_number': customer_data.get('phone_number'),
+        },
+        'items': lines,
+    }
+
+
+def to_queue_payload(pending_order):
+    """Make a pending order JSON-safe for the durable queue."""
+    return {
+        **pending_order,
+        'order_date': pending_order['order_date'].isoformat(),
+        'total_price': str(pending_order['total_price']),
+        'gst': str(pending_order['gst']),
+        'items': [
+            {**line, 'price': str(line['price']), 'total_price': str(line['total_price']), 'gst': str(line['gst'])}
+            for line in pending_order['items']
+        ],
+    }
+
+
+def from_queue_payload(payload):
+    return {
+        **payload,
+        'order_date': parse_datetime(payload['order_date']),
+        'total_price': Decimal(payload['total_price']),
+        'gst': Decimal(payload['gst']),
+        'items': [
+            {**line, 'price': Decimal(line['price']), 'total_price': Decimal(line['total_price']), 'gst': Decimal(line['gst'])}
+            for line in payload['items']
+        ],
+    }
+
+
+def serialize_pending_order(pending_order, status='PENDING'):
+    """Response body for an order that has not been read back from the database."""
+    return {
+        'outlet': pending_order['outlet_id'],
+        'order_number': pending_order['order_number'],
+        'order_date': pending_order['order_date'],
+        'total_price': str(pending_order['total_price']),
+        'gst': str(pending_order['gst']),
+        'status': status,
+        'address': pending_order['address'],
+        'mode': pending_order['mode'],
+        'items': [
+            {
+                'product': line['product_id'],
+                'product_variant': line['product_variant_id'],
+                'quantity': line['quantity'],
+                'price': str(line['price']),
+                'total_price': str(line['total_price']),
+                'gst': str(line['gst']),
+            }
+            for line in pending_order['items']
+        ],
+        'customer': pending_order['customer'],
+    }
+
+
+def place_order_body(pending_order, order):
+    """
+    ``(body, status)`` of a place-order response.
+
+    Reads the order's items, so async views call it through ``sync_to_async``.
+    """
+    if order is None:
+        # Queued ingestion mode; the drain worker writes the order later
+        return serialize_pending_order(pending_order), 202
+
+    body = OrderSerializer(order).data
+    body['customer'] = pending_order['customer']
+    return body, 201
+
+
+def recent_order_body(order):
+    """One order of the recent orders list."""
+    return {
+        "order_number": order.order_number,
+        "order_date": order.order_date,
+        "total_price": str(order.total_price),
+        "status": order.status,
+        "mode": order.mode,
+    }
+
+
+def order_details_body(order, items):
+    """``order`` with its ``items``, whose product and variant are loaded, and its customer."""
+    customer = order.customer
+    return {
+        "order_number": order.order_number,
+        "order_date": order.order_date,
+        "total_price": str(order.total_price),
+        "gst": str(order.gst),
+        "status": order.status,
+        "mode": order.mode,
+        "address": order.address,
+        "items": [
+            {
+                "product_name": item.product.name if item.product else None,
+                "product_variant_name": item.product_variant.name if item.product_variant else None,
+                "quantity": item.quantity,
+                "price": str(item.price),
+                "total_price": str(item.total_price),
+                "gst": str(item.gst),
+            }
+            for item in items
+        ],
+        "customer": {
+            "name": customer.name if customer else None,
+            "phone_number": customer.phone_number if customer else None,
+        },
+    }
+
+
+def write_orders(pending_orders):
+    """
+    Insert pending orders with their items, customers and order events in one transaction.
+
+    Customers come from the phone-number directory in ``v1.customers``.
+    Returns the created ``Order`` instances in input order.
+    """
+    with transaction.atomic():
+        customers = upsert_customers([
+            (pending_order['customer']['name'], pending_order['customer']['phone_number'])
+            for pending_order in pending_orders
+        ])
+
+        orders = Order.objects.bulk_create([
+            Order(
+                outlet_id=pending_order['outlet_id'],
+                order_number=pending_order['order_number'],
+                order_date=pending_order['order_date'],
+                total_price=pending_order['total_price'],
+                gst=pending_order['gst'],
+                status='PENDING',
+                address=pending_order['address'],
+                mode=pending_order['mode'],
+                customer=customer,
+            )
+            for pending_order, customer in zip(pending_orders, customers)
+        ])
+
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, **line)
+            for order, pending_order in zip(orders, pending_orders)
+            for line in pending_order['items']
+        ])
+
+        # Kitchen screens hear about the orders once they commit
+        record_created(orders)
+
+    return orders
+
+
+def submit_order(outlet_id, data):
+    """
+    Price and record one counter order.
+
+    Returns ``(pending_order, order)``. In queued ingestion mode the order is
+    appended to the durable queue and ``order`` is ``None``.
+    """
+    items_data = data.get('items')
+    product_ids, variant_ids = collect_catalog_ids(items_data)
+
+    if getattr(settings, 'ORDER_INGESTION_MODE', 'sync') == 'queued':
+        # Price against the cached outlet catalog and hand the order to the drain worker
+        products, variants = get_price_table(outlet_id)
+        lines, total_price, total_gst = price_lines(items_data, products, variants)
+        pending_order = build_pending_order(
+            outlet_id, next_order_number(outlet_id), data, lines, total_price, total_gst
+        )
+        order_queue.enqueue(to_queue_payload(pending_order))
+        return pending_order, None
+
+    # Fetch the referenced products and variants of this outlet with one query per table
+    products, variants = fetch_price_entries(product_ids=product_ids, variant_ids=variant_ids, outlet_id=outlet_id)
+    lines, total_price, total_gst = price_lines(items_data, products, variants)
+
+    # Allocated before writing so a rollback never re-issues a reserved block
+    pending_order = build_pending_order(
+        outlet_id, next_order_number(outlet_id), data, lines, total_price, total_gst
+    )
+
+    # Write the customer, order and items together so a failure leaves nothing behind
+    order, = write_orders([pending_order])
+    return pending_order, order
@@ -6,12 +6,14 @@ from v1.models import (
     Category,
     Product,
     ProductVariant,
+    Menu,
     Order,
     OrderItem,
     Customer,
     StockRequest,
     Employee
     )
+from v1.images import ImageDerivativesField
 from users.models import CustomUser
 
 
@@ -59,21 +61,50 @@ class CustomUserCounterLoginSerializer(serializers.Serializer):
 class ProductVariantSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductVariant
-        fields = ['id', 'name', 'price', 'is_gst_inclusive', 'extra_description', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'price', 'price_with_gst', 'is_gst_inclusive', 'extra_description', 'created_at', 'updated_at']
 
 class ProductSerializer(serializers.ModelSerializer):
     variants = ProductVariantSerializer(many=True, read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_thumbnails = ImageDerivativesField(source='image')
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'price', 'description', 'gst_percentage', 'is_gst_inclusive', 'created_at', 'updated_at', 'category', 'variants', 'image_url']
+        fields = ['id', 'name', 'price', 'price_with_gst', 'description', 'gst_percentage', 'is_gst_inclusive', 'created_at', 'updated_at', 'category', 'variants', 'image_url', 'image_thumbnails']
 
     def get_image_url(self, obj):
         # Return the absolute URL of the image if it exists
         if obj.image:
             return obj.image.url
         return None
+
+
+
+class SyncCategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'updated_at']
+
+
+class SyncProductSerializer(ProductSerializer):
+    # Variants are synced as their own list, so a price change does not resend the product
+    class Meta(ProductSerializer.Meta):
+        fields = ['id', 'name', 'price', 'price_with_gst', 'description', 'gst_percentage', 'is_gst_inclusive', 'created_at', 'updated_at', 'category', 'image_url', 'image_thumbnails']
+
+
+class SyncProductVariantSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductVariant
+        fields = ['id', 'product', 'name', 'price', 'price_with_gst', 'is_gst_inclusive', 'extra_description', 'created_at', 'updated_at']
+
+
+class SyncMenuSerializer(serializers.ModelSerializer):
+    # Set by v1.sync.catalog_changes
+    products = serializers.ListField(source='product_ids', child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = Menu
+        fields = ['id', 'name', 'is_enabled', 'start_date', 'end_date', 'open_time', 'close_time', 'updated_at', 'products']
     
 
 
@@ -102,7 +133,7 @@ class OrderSerializer(serializers.ModelSerializer):
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
-        fields = ['name', 'phone_number', 'order']
+        fields = ['name', 'phone_number']
         ref_name = 'CounterCustomerSerializer'
 
 
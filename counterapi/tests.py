@@ -1,3 +1,224 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+
+from v1.idempotency import IN_FLIGHT, get_store, make_cache_key
+from v1.models import Category, Company, Order, Outlet, Product
+
+from . import order_queue
+from .orders import write_orders
 
 # Create your tests here.
+
+
+@override_settings(ORDER_INGESTION_MODE='sync', QR_MENU_PUBLISH=False)
+class OrderTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet, cls.other_outlet = [
+            Outlet.objects.create(
+                company=company, logo='logos/outlet.png', gst_number='GST', outlet_name=name, address='Address'
+            )
+            for name in ('Outlet', 'Other outlet')
+        ]
+        cls.product, cls.other_product = [
+            Product.objects.create(
+                outlet=outlet, category=Category.objects.create(outlet=outlet, name='Mains'), name='Thali',
+                price=Decimal('100.00'), gst_percentage=Decimal('5'), is_gst_inclusive=False
+            )
+            for outlet in (cls.outlet, cls.other_outlet)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+
+class PlaceOrderTests(OrderTestCase):
+    def place(self, body, **headers):
+        return self.client.post(
+            f'/v1/counter/api/orders/{self.outlet.id}/place-order/', body, content_type='application/json', **headers
+        )
+
+    def test_places_order_priced_from_the_catalog(self):
+        response = self.place({'items': [{'product': self.product.id, 'quantity': 2}], 'mode': 'cash'})
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual((order.outlet_id, order.total_price, order.gst), (self.outlet.id, Decimal('210.00'), Decimal('10.00')))
+
+    def test_rejects_products_of_another_outlet(self):
+        response = self.place({'items': [{'product': self.other_product.id, 'quantity': 1}]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_rejects_a_zero_quantity(self):
+        response = self.place({'items': [{'product': self.product.id, 'quantity': 0}]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_idempotency_key_replays_the_first_response(self):
+        body = {'items': [{'product': self.product.id, 'quantity': 1}]}
+        first = self.place(body, HTTP_IDEMPOTENCY_KEY='key-1')
+        replay = self.place(body, HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual((first.status_code, replay.status_code), (201, 201))
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_keys_are_not_kept_in_process_memory(self):
+        body = {'items': [{'product': self.product.id, 'quantity': 1}]}
+        self.place(body, HTTP_IDEMPOTENCY_KEY='key-1')
+        # A retry that lands on another worker finds an empty local cache
+        cache.clear()
+        replay = self.place(body, HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_key_reused_with_another_body_is_refused(self):
+        self.place({'items': [{'product': self.product.id, 'quantity': 1}]}, HTTP_IDEMPOTENCY_KEY='key-1')
+        response = self.place({'items': [{'product': self.product.id, 'quantity': 2}]}, HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_key_in_flight_is_a_conflict(self):
+        path = f'/v1/counter/api/orders/{self.outlet.id}/place-order/'
+        get_store().add(make_cache_key(path, 'key-1'), IN_FLIGHT)
+
+        response = self.place({'items': [{'product': self.product.id, 'quantity': 1}]}, HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+
+
+
+class AsyncViewTests(OrderTestCase):
+    def place(self, prefix):
+        body = {
+            'items': [{'product': self.product.id, 'quantity': 2}], 'mode': 'cash',
+            'customer': {'name': 'Asha', 'phone_number': '9876543210'},
+        }
+        response = self.client.post(
+            f'/v1/counter/api/{prefix}orders/{self.outlet.id}/place-order/', body, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_place_order_returns_the_sync_body(self):
+        sync_body, async_body = self.place('').json(), self.place('async/').json()
+
+        for body in (sync_body, async_body):
+            del body['order_number']
+        # Both are rendered by OrderSerializer, in the same time zone
+        self.assertEqual(sync_body.pop('order_date')[-6:], async_body.pop('order_date')[-6:])
+        self.assertEqual(sync_body, async_body)
+
+    def test_reads_return_the_sync_bodies(self):
+        order_number = self.place('').json()['order_number']
+
+        for path in (f'orders/{self.outlet.id}/order-details/?order_number={order_number}', f'orders/{self.outlet.id}/get-orders/'):
+            with self.subTest(path=path):
+                sync_response = self.client.get(f'/v1/counter/api/{path}')
+                async_response = self.client.get(f'/v1/counter/api/async/{path}')
+                self.assertEqual(sync_response.status_code, 200)
+                self.assertEqual(async_response.content, sync_response.content)
+
+class BulkUploadTests(OrderTestCase):
+    def test_valid_orders_are_written_and_invalid_ones_reported(self):
+        response = self.client.post(f'/v1/counter/api/orders/{self.outlet.id}/bulk-upload/', {'orders': [
+            {'client_reference': 'T1-1', 'order_date': '2024-12-08T13:05:00+05:30', 'items': [{'product': self.product.id, 'quantity': 1}]},
+            {'client_reference': 'T1-2', 'items': [{'product': self.other_product.id, 'quantity': 1}]},
+            {'client_reference': 'T1-3', 'items': [{'product': self.product.id, 'quantity': 0}]},
+            {'client_reference': 'T1-4', 'items': []},
+        ]}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (1, 3))
+        self.assertEqual([result['client_reference'] for result in data['results']], ['T1-1', 'T1-2', 'T1-3', 'T1-4'])
+        self.assertEqual([result['error'] for result in data['results']], [False, True, True, True])
+
+        order = Order.objects.get()
+        self.assertEqual(order.order_number, data['results'][0]['order_number'])
+        self.assertEqual(data['results'][0]['total_price'], '105.00')
+        # Offline orders keep the time they were taken
+        self.assertEqual(order.order_date.isoformat(), '2024-12-08T07:35:00+00:00')
+
+    def test_an_order_the_database_refuses_fails_alone(self):
+        def write(pending_orders):
+            if any(pending_order['address'] == 'refused' for pending_order in pending_orders):
+                raise IntegrityError("refused")
+            return write_orders(pending_orders)
+
+        with mock.patch('counterapi.views.write_orders', side_effect=write):
+            response = self.client.post(f'/v1/counter/api/orders/{self.outlet.id}/bulk-upload/', {'orders': [
+                {'items': [{'product': self.product.id, 'quantity': 1}]},
+                {'address': 'refused', 'items': [{'product': self.product.id, 'quantity': 1}]},
+                {'items': [{'product': self.product.id, 'quantity': 2}]},
+            ]}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (2, 1))
+        self.assertEqual([result['error'] for result in data['results']], [False, True, False])
+        self.assertEqual(
+            sorted(Order.objects.values_list('order_number', flat=True)),
+            [data['results'][0]['order_number'], data['results'][2]['order_number']]
+        )
+
+    def test_an_empty_upload_is_refused(self):
+        response = self.client.post(
+            f'/v1/counter/api/orders/{self.outlet.id}/bulk-upload/', {'orders': []}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class QueuedIngestionTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(ORDER_INGESTION_MODE='queued', ORDER_QUEUE_PATH=Path(directory) / 'queue.sqlite3')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_orders_are_accepted_then_written_by_the_drain(self):
+        response = self.client.post(
+            f'/v1/counter/api/orders/{self.outlet.id}/place-order/',
+            {'items': [{'product': self.product.id, 'quantity': 2}]}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(order_queue.pending_count(), 1)
+
+        call_command('drain_order_queue', '--once', stdout=StringIO())
+
+        order = Order.objects.get()
+        self.assertEqual(order.order_number, response.json()['order_number'])
+        self.assertEqual(order.total_price, Decimal('210.00'))
+        self.assertEqual(order.items.get().quantity, 2)
+        self.assertEqual(order_queue.pending_count(), 0)
+
+    def test_queued_orders_are_validated_before_they_are_accepted(self):
+        response = self.client.post(
+            f'/v1/counter/api/orders/{self.outlet.id}/place-order/',
+            {'items': [{'product': self.other_product.id, 'quantity': 1}]}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(order_queue.pending_count(), 0)
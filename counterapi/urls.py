@@ -3,11 +3,16 @@ from .views import (
     user_login,
     category_list,
     product_list,
+    product_search,
+    catalog_sync,
     place_order,
+    bulk_upload_orders,
     orders_past_three_hours,
     order_details,
+    customer_lookup,
     create_stock_request
     )
+from . import async_views
 
 urlpatterns = [
     # Endpoint to login into the counter
@@ -16,18 +21,35 @@ urlpatterns = [
     # Endpoint to fetch the list of categories
     path('<int:outlet_id>/get-categories/', category_list, name='Get Categories for Counter'),
     
-    # Endpoint to fetch the list of products
-    path('products/', product_list, name='product_list'),
+    # Endpoint to fetch the products of an outlet
+    path('<int:outlet_id>/get-products/', product_list, name='product_list'),
+
+    # Endpoint to search the products of an outlet, passing outlet_id in the URL
+    path('<int:outlet_id>/search-products/', product_search, name='product_search'),
+
+    # Endpoint to fetch catalog changes since the previous sync, passing outlet_id in the URL
+    path('<int:outlet_id>/sync/', catalog_sync, name='catalog_sync'),
 
     # Endpoint to place an order, passing outlet_id in the URL
     path('orders/<int:outlet_id>/place-order/', place_order, name='place_order'),
 
+    # Endpoint to upload orders taken while the counter was offline, passing outlet_id in the URL
+    path('orders/<int:outlet_id>/bulk-upload/', bulk_upload_orders, name='bulk_upload_orders'),
+
     # Endpoint to fetch orders placed in the past 3 hours, passing outlet_id in the URL
     path('orders/<int:outlet_id>/get-orders/', orders_past_three_hours, name='orders_past_three_hours'),
 
     # Endpoint to get order details by order number, passing outlet_id in the URL
     path('orders/<int:outlet_id>/order-details/', order_details, name='order_details'),
 
+    # Endpoint to look up a repeat customer by phone number, passing outlet_id in the URL
+    path('customers/<int:outlet_id>/lookup/', customer_lookup, name='customer_lookup'),
+
+    # Async versions of the order endpoints for ASGI deployments, passing outlet_id in the URL
+    path('async/orders/<int:outlet_id>/place-order/', async_views.place_order, name='async_place_order'),
+    path('async/orders/<int:outlet_id>/get-orders/', async_views.orders_past_three_hours, name='async_orders_past_three_hours'),
+    path('async/orders/<int:outlet_id>/order-details/', async_views.order_details, name='async_order_details'),
+
     # Endpoint to create a stock request, passing outlet_id in the URL
     path('stock-requests/<int:outlet_id>/stock-requests/', create_stock_request, name='create_stock_request'),
     
@@ -1,12 +1,11 @@
-import random
-import string
-
 from decimal import Decimal
 
 from django.shortcuts import render
 from django.core.mail import send_mail
 from django.utils import timezone
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -29,11 +28,33 @@ from .serializers import (
     OrderListSerializer,
     OrderItemListSerializer,
     CustomerListSerializer,
-    StockRequestSerializer
+    StockRequestSerializer,
+    SyncCategorySerializer,
+    SyncProductSerializer,
+    SyncProductVariantSerializer,
+    SyncMenuSerializer
     
 )
+from .orders import (
+    parse_order_date,
+    build_pending_order,
+    order_details_body,
+    place_order_body,
+    recent_order_body,
+    submit_order,
+    write_orders
+)
 
 from users.models import CustomUser
+from v1.idempotency import idempotent
+from v1.order_numbers import allocate_order_numbers
+from v1.active_menus import get_active_menu_index, requested_moment
+from v1.catalog import cached_catalog, fetch_price_entries
+from v1.conditional import catalog_validators, conditional
+from v1.customers import normalize_phone
+from v1.pricing import OrderError, collect_catalog_ids, price_lines
+from v1.search import parse_limit, search_products
+from v1.sync import InvalidCursor, catalog_changes, decode_cursor
 from v1.models import (
     Company,
     Outlet,
@@ -186,6 +207,7 @@ def user_login(request):
                 ),
             },
         ),
+        304: openapi.Response(description="Not modified since the version in If-None-Match / If-Modified-Since"),
         404: openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -204,6 +226,7 @@ def user_login(request):
 )
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional(catalog_validators)
 def category_list(request, outlet_id):
     try:
         # Fetch the outlet to ensure it exists
@@ -232,6 +255,29 @@ def category_list(request, outlet_id):
 
 @swagger_auto_schema(
     method='get',
+    manual_parameters=[
+        openapi.Parameter(
+            'outlet_id',
+            openapi.IN_PATH,
+            description="ID of the outlet whose products are being fetched",
+            type=openapi.TYPE_INTEGER,
+            required=True,
+        ),
+        openapi.Parameter(
+            'active',
+            openapi.IN_QUERY,
+            description="If true, only products on a menu active now",
+            type=openapi.TYPE_BOOLEAN,
+            required=False,
+        ),
+        openapi.Parameter(
+            'at',
+            openapi.IN_QUERY,
+            description="ISO 8601 datetime; only products on a menu active at that moment",
+            type=openapi.TYPE_STRING,
+            required=False,
+        )
+    ],
     responses={
         200: openapi.Response(
             description='Products fetched successfully',
@@ -276,6 +322,8 @@ def category_list(request, outlet_id):
                 }
             )
         ),
+        304: openapi.Response(description="Not modified since the version in If-None-Match / If-Modified-Since"),
+        400: openapi.Response(description="Invalid 'at' datetime"),
         500: openapi.Response(
             description='Internal Server Error',
             schema=openapi.Schema(
@@ -290,15 +338,42 @@ def category_list(request, outlet_id):
 )
 @api_view(['GET'])
 @permission_classes([AllowAny])
-def product_list(request):
+@conditional(catalog_validators)
+def product_list(request, outlet_id):
     try:
-        products = Product.objects.all()
-        serializer = ProductSerializer(products, many=True)
+        def build_products():
+            # Fetch the outlet to ensure it exists
+            outlet = get_object_or_404(Outlet, id=outlet_id)
+
+            # Variants of every product are loaded with one extra query
+            products = Product.objects.filter(outlet=outlet).prefetch_related('variants').order_by('id')
+            return ProductSerializer(products, many=True).data
+
+        # Serialized once per catalog change; see v1.catalog
+        products = cached_catalog(outlet_id, 'counter-products', build_products)
+
+        # Keep only products on a menu active at the requested moment, if any
+        try:
+            moment = requested_moment(request)
+        except ValueError as e:
+            return Response({
+                "error": True,
+                "details": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if moment is not None:
+            orderable = get_active_menu_index(outlet_id).products_at(moment)
+            products = [product for product in products if product['id'] in orderable]
+
         return Response({
             "error": False,
             "details": "Products fetched successfully",
-            "products": serializer.data
+            "products": products
         })
+    except Http404:
+        return Response({
+            "error": True,
+            "details": "Outlet not found"
+        }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({
             "error": True,
@@ -314,6 +389,182 @@ def product_list(request):
 
 
 
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter(
+            'outlet_id',
+            openapi.IN_PATH,
+            description="ID of the outlet whose products are being searched",
+            type=openapi.TYPE_INTEGER,
+            required=True,
+        ),
+        openapi.Parameter(
+            'q',
+            openapi.IN_QUERY,
+            description="Words to look for in product, category and variant names and descriptions; each word matches as a prefix",
+            type=openapi.TYPE_STRING,
+            required=True,
+        ),
+        openapi.Parameter(
+            'limit',
+            openapi.IN_QUERY,
+            description="Maximum number of results (default 20, at most 100)",
+            type=openapi.TYPE_INTEGER,
+            required=False,
+        )
+    ],
+    responses={
+        200: openapi.Response(
+            description='Products found, best match first',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "error": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                    "details": openapi.Schema(type=openapi.TYPE_STRING),
+                    "products": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                }
+            )
+        ),
+        400: openapi.Response(description="Missing search query"),
+        500: openapi.Response(description="Internal Server Error"),
+    }
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_search(request, outlet_id):
+    try:
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({
+                "error": True,
+                "details": "Query parameter 'q' is required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Ranked ids come from the search index; variants are loaded with one extra query
+        products = search_products(
+            outlet_id,
+            query,
+            parse_limit(request.query_params.get('limit')),
+            queryset=Product.objects.prefetch_related('variants'),
+        )
+
+        return Response({
+            "error": False,
+            "details": "Products fetched successfully",
+            "products": ProductSerializer(products, many=True).data
+        })
+    except Exception as e:
+        return Response({
+            "error": True,
+            "details": f"An error occurred: {str(e)}"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+
+
+
+
+
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter(
+            'outlet_id',
+            openapi.IN_PATH,
+            description="ID of the outlet whose catalog is being synced",
+            type=openapi.TYPE_INTEGER,
+            required=True,
+        ),
+        openapi.Parameter(
+            'since',
+            openapi.IN_QUERY,
+            description="Cursor returned by the previous sync; omit it for a full snapshot",
+            type=openapi.TYPE_STRING,
+            required=False,
+        )
+    ],
+    responses={
+        200: openapi.Response(
+            description='Catalog changes fetched successfully',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "error": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                    "details": openapi.Schema(type=openapi.TYPE_STRING),
+                    "cursor": openapi.Schema(type=openapi.TYPE_STRING, description="Pass as ?since= on the next sync"),
+                    "full": openapi.Schema(type=openapi.TYPE_BOOLEAN, description="True when the response is a full snapshot that replaces the local catalog"),
+                    "categories": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    "products": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    "variants": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    "menus": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    "deleted": openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        description="Ids deleted since the cursor, per kind",
+                        properties={
+                            kind: openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER))
+                            for kind in ('categories', 'products', 'variants', 'menus')
+                        }
+                    ),
+                }
+            )
+        ),
+        400: openapi.Response(description="Invalid sync cursor"),
+        404: openapi.Response(description="Outlet not found"),
+        500: openapi.Response(description="Internal Server Error"),
+    }
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def catalog_sync(request, outlet_id):
+    try:
+        # Decode the cursor of the previous sync, if any
+        since = request.query_params.get('since')
+        if since:
+            since = decode_cursor(since)
+
+        if not Outlet.objects.filter(id=outlet_id).exists():
+            return Response({
+                "error": True,
+                "details": "Outlet not found"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        changes = catalog_changes(outlet_id, since or None)
+
+        return Response({
+            "error": False,
+            "details": "Catalog changes fetched successfully",
+            "cursor": changes['cursor'],
+            "full": changes['full'],
+            "categories": SyncCategorySerializer(changes['categories'], many=True).data,
+            "products": SyncProductSerializer(changes['products'], many=True).data,
+            "variants": SyncProductVariantSerializer(changes['variants'], many=True).data,
+            "menus": SyncMenuSerializer(changes['menus'], many=True).data,
+            "deleted": changes['deleted'],
+        })
+    except InvalidCursor as e:
+        return Response({
+            "error": True,
+            "details": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            "error": True,
+            "details": f"An error occurred: {str(e)}"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+
+
+
+
+
+
+
 # {
 #   "customer": {
 #     "name": "John Doe",
@@ -332,12 +583,18 @@ def product_list(request):
 #   "address": "123, Main Street, City, State, ZIP",
 #   "mode": "cash"
 # }
-def generate_order_number():
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=12))
-
 @swagger_auto_schema(
     method='post',
     request_body=OrderSerializer,
+    manual_parameters=[
+        openapi.Parameter(
+            'Idempotency-Key',
+            openapi.IN_HEADER,
+            description="Optional client-generated key; retries with the same key return the original response",
+            type=openapi.TYPE_STRING,
+            required=False,
+        )
+    ],
     responses={
         201: openapi.Response(
             description="Order placed successfully",
@@ -350,112 +607,170 @@ def generate_order_number():
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotent
 def place_order(request, outlet_id):
     try:
-        data = request.data
-        customer_data = data.get('customer')
-        items_data = data.get('items')
+        pending_order, order = submit_order(outlet_id, request.data)
 
-        # Check if the customer exists
-        customer = Customer.objects.filter(
-            name=customer_data.get('name'),
-            phone_number=customer_data.get('phone_number')
-        ).first()
+        # The created order with customer details, or the queued one (202)
+        response_data, status_code = place_order_body(pending_order, order)
+        return Response(response_data, status=status_code)
 
-        if not customer:
-            # Create a new customer if it doesn't exist
-            customer = Customer.objects.create(
-                name=customer_data.get('name'),
-                phone_number=customer_data.get('phone_number')
-            )
+    except OrderError as e:
+        return Response({
+            "error": True,
+            "details": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            "error": True,
+            "details": f"An error occurred: {str(e)}"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Create the Order
-        order = Order.objects.create(
-            outlet_id=outlet_id,
-            order_number=generate_order_number(),
-            total_price=Decimal('0.00'),
-            gst=Decimal('0.00'),
-            status='PENDING',
-            order_date=timezone.now(),
-            address=data.get('address', ''),
-            mode=data.get('mode', ''),
-        )
 
-        # Link the customer to the order
-        customer.order = order
-        customer.save()
-
-        total_price = Decimal('0.00')
-        total_gst = Decimal('0.00')
-
-        # Process each order item
-        for item_data in items_data:
-            product_id = item_data.get('product')
-            variant_id = item_data.get('product_variant')
-            quantity = item_data.get('quantity')
-
-            if product_id:
-                product = Product.objects.get(id=product_id)
-                price = product.price
-                gst = product.gst_percentage
-                is_gst_inclusive = product.is_gst_inclusive
-            elif variant_id:
-                variant = ProductVariant.objects.get(id=variant_id)
-                product = variant.product
-                price = variant.price
-                gst = product.gst_percentage
-                is_gst_inclusive = product.is_gst_inclusive
-            else:
-                return Response({
-                    "error": True,
-                    "details": "Either product or variant ID must be provided"
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            total_item_price = price * quantity
-            gst_amount = (gst / Decimal('100')) * total_item_price
-            total_item_gst_inclusive = total_item_price + gst_amount if not is_gst_inclusive else total_item_price
-
-            # Create OrderItem
-            OrderItem.objects.create(
-                order=order,
-                product=product if product_id else None,
-                product_variant=variant if variant_id else None,
-                quantity=quantity,
-                price=price,
-                total_price=total_item_gst_inclusive,
-                gst=gst_amount
-            )
 
-            total_price += total_item_gst_inclusive
-            total_gst += gst_amount
 
-        # Update the total price and GST of the order
-        order.total_price = total_price
-        order.gst = total_gst
-        order.save()
 
-        # Serialize and return the created order with customer details
-        order_serializer = OrderSerializer(order)
-        response_data = order_serializer.data
 
-        # Add customer data to the response manually
-        response_data['customer'] = {
-            "name": customer.name,
-            "phone_number": customer.phone_number
-        }
 
-        return Response(response_data, status=status.HTTP_201_CREATED)
 
-    except Product.DoesNotExist:
-        return Response({
-            "error": True,
-            "details": "Product not found"
-        }, status=status.HTTP_400_BAD_REQUEST)
-    except ProductVariant.DoesNotExist:
+
+
+
+
+
+
+
+# {
+#   "orders": [
+#     {
+#       "client_reference": "T1-0042",
+#       "order_date": "2024-12-08T13:05:00+05:30",
+#       "customer": {"name": "John Doe", "phone_number": "1234567890"},
+#       "items": [{"product": 1, "quantity": 2}, {"product_variant": 5, "quantity": 1}],
+#       "address": "",
+#       "mode": "cash"
+#     }
+#   ]
+# }
+@swagger_auto_schema(
+    method='post',
+    operation_description="Upload orders taken while a counter was offline. Valid orders are written in one "
+                          "transaction; invalid ones, and any the database refuses, are reported per order "
+                          "and skipped.",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            "orders": openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                description="Orders in the same format as place-order, plus optional order_date and client_reference",
+            ),
+        },
+        required=['orders'],
+    ),
+    manual_parameters=[
+        openapi.Parameter(
+            'Idempotency-Key',
+            openapi.IN_HEADER,
+            description="Optional client-generated key; retries with the same key return the original response",
+            type=openapi.TYPE_STRING,
+            required=False,
+        )
+    ],
+    responses={
+        200: "Orders processed; see per-order results",
+        400: "Invalid request data",
+    }
+)
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@idempotent
+def bulk_upload_orders(request, outlet_id):
+    try:
+        orders_data = request.data.get('orders')
+        if not isinstance(orders_data, list) or not orders_data:
+            return Response({
+                "error": True,
+                "details": "A non-empty list of orders must be provided"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        upload_limit = getattr(settings, 'BULK_ORDER_UPLOAD_LIMIT', 1000)
+        if len(orders_data) > upload_limit:
+            return Response({
+                "error": True,
+                "details": f"At most {upload_limit} orders can be uploaded at once"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [
+            {"index": index, "client_reference": order_data.get('client_reference') if isinstance(order_data, dict) else None}
+            for index, order_data in enumerate(orders_data)
+        ]
+
+        # Collect the catalog ids of every order so the catalog is fetched once for the whole upload
+        referenced = {}
+        product_ids = set()
+        variant_ids = set()
+        for index, order_data in enumerate(orders_data):
+            try:
+                if not isinstance(order_data, dict):
+                    raise OrderError("Each order must be an object")
+                order_product_ids, order_variant_ids = collect_catalog_ids(order_data.get('items'))
+            except OrderError as e:
+                results[index].update({"error": True, "details": str(e)})
+                continue
+            referenced[index] = order_data
+            product_ids |= order_product_ids
+            variant_ids |= order_variant_ids
+
+        products, variants = fetch_price_entries(product_ids=product_ids, variant_ids=variant_ids, outlet_id=outlet_id)
+
+        priced = []
+        for index, order_data in referenced.items():
+            try:
+                lines, total_price, total_gst = price_lines(order_data.get('items'), products, variants)
+                order_date = parse_order_date(order_data.get('order_date'))
+            except OrderError as e:
+                results[index].update({"error": True, "details": str(e)})
+                continue
+            priced.append((index, order_data, lines, total_price, total_gst, order_date))
+
+        # Reserve all order numbers up front, outside the write transaction
+        order_numbers = allocate_order_numbers(outlet_id, len(priced))
+        pending_orders = [
+            build_pending_order(outlet_id, order_number, order_data, lines, total_price, total_gst, order_date=order_date)
+            for order_number, (index, order_data, lines, total_price, total_gst, order_date) in zip(order_numbers, priced)
+        ]
+        written = list(zip(pending_orders, priced))
+        try:
+            write_orders(pending_orders)
+        except Exception:
+            # Retry one by one so a single bad order fails only its own result
+            written = []
+            for pending_order, priced_order in zip(pending_orders, priced):
+                try:
+                    write_orders([pending_order])
+                except Exception as e:
+                    results[priced_order[0]].update({"error": True, "details": f"Order could not be saved: {e}"})
+                else:
+                    written.append((pending_order, priced_order))
+
+        for pending_order, (index, *_) in written:
+            results[index].update({
+                "error": False,
+                "order_number": pending_order['order_number'],
+                "total_price": str(pending_order['total_price']),
+                "gst": str(pending_order['gst']),
+            })
+
         return Response({
-            "error": True,
-            "details": "Product variant not found"
-        }, status=status.HTTP_400_BAD_REQUEST)
+            "error": False,
+            "details": f"{len(written)} of {len(orders_data)} order(s) uploaded successfully",
+            "created": len(written),
+            "failed": len(orders_data) - len(written),
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
     except Exception as e:
         return Response({
             "error": True,
@@ -471,11 +786,6 @@ def place_order(request, outlet_id):
 
 
 
-
-
-
-
-
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def orders_past_three_hours(request, outlet_id):
@@ -510,16 +820,7 @@ def orders_past_three_hours(request, outlet_id):
             "total_pages": total_pages,
             "next_page_url": paginator.get_next_link(),
             "previous_page_url": paginator.get_previous_link(),
-            "orders": [
-                {
-                    "order_number": order.order_number,
-                    "order_date": order.order_date,
-                    "total_price": str(order.total_price),
-                    "status": order.status,
-                    "mode": order.mode,
-                }
-                for order in result_page
-            ]
+            "orders": [recent_order_body(order) for order in result_page]
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
@@ -593,7 +894,7 @@ def order_details(request, outlet_id):
 
     try:
         # Get the order based on outlet_id and order_number
-        order = Order.objects.filter(outlet_id=outlet_id, order_number=order_number).first()
+        order = Order.objects.select_related('customer').filter(outlet_id=outlet_id, order_number=order_number).first()
 
         if not order:
             return Response({
@@ -601,43 +902,11 @@ def order_details(request, outlet_id):
                 "details": "Order not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        # Get the customer associated with the order
-        customer = order.customers.first()  # Assuming an Order has a related Customer
-
-        # Serialize the order and its items
-        items = [
-            {
-                "product_name": item.product.name if item.product else None,
-                "product_variant_name": item.product_variant.name if item.product_variant else None,
-                "quantity": item.quantity,
-                "price": str(item.price),
-                "total_price": str(item.total_price),
-                "gst": str(item.gst),
-            }
-            for item in order.items.all()
-        ]
-
-        # Prepare customer details
-        customer_details = {
-            "name": customer.name if customer else None,
-            "phone_number": customer.phone_number if customer else None,
-        }
-
         # Build the response data
         response_data = {
             "error": False,
             "details": "Order fetched successfully",
-            "order": {
-                "order_number": order.order_number,
-                "order_date": order.order_date,
-                "total_price": str(order.total_price),
-                "gst": str(order.gst),
-                "status": order.status,
-                "mode": order.mode,
-                "address": order.address,
-                "items": items,
-                "customer": customer_details,
-            },
+            "order": order_details_body(order, order.items.all()),
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
@@ -658,6 +927,74 @@ def order_details(request, outlet_id):
 
 
 
+@swagger_auto_schema(
+    method='get',
+    operation_description="Look up a repeat customer by phone number with their recent orders at this outlet.",
+    manual_parameters=[
+        openapi.Parameter('phone_number', openapi.IN_QUERY, description="Customer phone number in any format", type=openapi.TYPE_STRING, required=True)
+    ],
+    responses={
+        200: "Customer fetched successfully",
+        400: "Phone number is required",
+        404: "Customer not found",
+    }
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def customer_lookup(request, outlet_id):
+    normalized_phone = normalize_phone(request.query_params.get('phone_number'))
+    if not normalized_phone:
+        return Response({
+            "error": True,
+            "details": "Phone number is required"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        customer = Customer.objects.filter(normalized_phone=normalized_phone).first()
+        if not customer:
+            return Response({
+                "error": True,
+                "details": "Customer not found"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        orders = Order.objects.filter(customer=customer, outlet_id=outlet_id)
+        recent_orders = orders.order_by('-order_date')[:5]
+
+        return Response({
+            "error": False,
+            "details": "Customer fetched successfully",
+            "customer": {
+                "id": customer.id,
+                "name": customer.name,
+                "phone_number": customer.phone_number,
+            },
+            "total_orders": orders.count(),
+            "recent_orders": [
+                {
+                    "order_number": order.order_number,
+                    "order_date": order.order_date,
+                    "total_price": str(order.total_price),
+                    "status": order.status,
+                }
+                for order in recent_orders
+            ],
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            "error": True,
+            "details": f"An error occurred: {str(e)}"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+
+
+
+
+
+
+
 @swagger_auto_schema(
     method='post',
     request_body=StockRequestSerializer,
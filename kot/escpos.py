@@ -0,0 +1,210 @@
+"""
+ESC/POS kitchen tickets and receipts.
+
+Thermal printers take a stream of text and control codes. ``kitchen_ticket``
+and ``receipt`` render an order, loaded with its items and outlet (see
+kot.orders.with_kitchen_details), into bytes that go to the printer as is,
+so a tablet or print agent only has to copy them to the printer's socket.
+
+A receipt opens with the outlet's logo, name, address and GSTIN and closes
+with a thank-you line and a paper cut. Turning the logo into a dithered
+raster image is by far the slowest part, and these segments only change when
+the outlet does, so they are compiled once and cached under a key hashing
+everything they are made of; an edited outlet simply gets new ones.
+
+Lines are ``ESCPOS_COLUMNS`` characters wide (48 on 80 mm paper, 32 on
+58 mm) and the logo at most ``ESCPOS_LOGO_WIDTH`` dots. Text is sent in code
+page 437, the printers' default; characters it lacks print as ``?``.
+"""
+import hashlib
+import logging
+import textwrap
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+INITIALIZE = ESC + b'@'
+ALIGN_LEFT = ESC + b'a\x00'
+ALIGN_CENTER = ESC + b'a\x01'
+BOLD_ON = ESC + b'E\x01'
+BOLD_OFF = ESC + b'E\x00'
+NORMAL_SIZE = GS + b'!\x00'
+DOUBLE_HEIGHT = GS + b'!\x01'
+DOUBLE_SIZE = GS + b'!\x11'
+# Feed the paper up to the cutter and cut it, leaving a hinge
+CUT = GS + b'VB\x03'
+
+ENCODING = 'cp437'
+
+
+def get_columns():
+    return getattr(settings, 'ESCPOS_COLUMNS', 48)
+
+
+def get_logo_width():
+    return getattr(settings, 'ESCPOS_LOGO_WIDTH', 384)
+
+
+def get_cache_timeout():
+    return getattr(settings, 'ESCPOS_SEGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def text(value):
+    return str(value).encode(ENCODING, errors='replace')
+
+
+def lines(value, width):
+    """``value`` wrapped to ``width`` characters, one printed line each."""
+    wrapped = [row for paragraph in str(value).splitlines() for row in textwrap.wrap(paragraph, width)]
+    return b''.join(text(row) + b'\n' for row in wrapped)
+
+
+def columns(left, right, width):
+    """``left`` and ``right`` aligned to both edges; a long ``left`` wraps onto the lines before."""
+    right = str(right)
+    room = max(width - len(right) - 1, 1)
+    rows = textwrap.wrap(str(left), room) or ['']
+    rows[-1] = f"{rows[-1].ljust(room)} {right}"
+    return b''.join(text(row) + b'\n' for row in rows)
+
+
+def rule(width):
+    return text('-' * width) + b'\n'
+
+
+def amount(value):
+    return f"{value:.2f}" if value is not None else ''
+
+
+def raster(image, max_width):
+    """``image`` as a ``GS v 0`` raster bit image, scaled to fit ``max_width`` dots square."""
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        # Transparent areas print as paper
+        image = image.convert('RGBA')
+        image = Image.alpha_composite(Image.new('RGBA', image.size, (255, 255, 255, 255)), image)
+    image = image.convert('L')
+    image.thumbnail((max_width, max_width), Image.LANCZOS)
+
+    # Rows are sent as whole bytes, so pad the width to a multiple of 8 dots with paper
+    width_bytes = (image.width + 7) // 8
+    padded = Image.new('L', (width_bytes * 8, image.height), 255)
+    padded.paste(image, (0, 0))
+    # Set bits of a mode '1' image are white but printers burn set bits, hence the inversion;
+    # the conversion dithers the greys
+    data = ImageOps.invert(padded).convert('1').tobytes()
+    size = bytes((width_bytes & 0xFF, width_bytes >> 8, image.height & 0xFF, image.height >> 8))
+    return GS + b'v0\x00' + size + data
+
+
+def logo_raster(name):
+    """The outlet logo stored as ``name``, ready to print, or nothing if it cannot be read."""
+    if not name:
+        return b''
+    width = get_logo_width()
+    try:
+        with default_storage.open(name, 'rb') as file:
+            image = Image.open(file)
+            # JPEGs decode straight at a reduced scale
+            image.draft('L', (width, width))
+            image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.warning("Logo %s could not be read, receipts print without it: %s", name, e)
+        return b''
+    return raster(ImageOps.exif_transpose(image), width)
+
+
+def compile_header(outlet):
+    width = get_columns()
+    segment = [INITIALIZE, ALIGN_CENTER, logo_raster(outlet.logo.name)]
+    # Double size letters are twice as wide
+    segment += [BOLD_ON, DOUBLE_SIZE, lines(outlet.outlet_name, width // 2), NORMAL_SIZE, BOLD_OFF]
+    segment.append(lines(outlet.address, width))
+    if outlet.phone_number:
+        segment.append(lines(f"Ph: {outlet.phone_number}", width))
+    segment += [lines(f"GSTIN: {outlet.gst_number}", width), ALIGN_LEFT, rule(width)]
+    return b''.join(segment)
+
+
+def compile_footer(outlet):
+    width = get_columns()
+    segment = [ALIGN_CENTER, lines("Thank you, visit again!", width)]
+    if outlet.opening_hours:
+        segment.append(lines(f"Open {outlet.opening_hours}", width))
+    segment += [ALIGN_LEFT, CUT]
+    return b''.join(segment)
+
+
+def _cached_segment(name, compile, outlet):
+    parts = (
+        outlet.logo.name, outlet.outlet_name, outlet.address, outlet.phone_number, outlet.gst_number,
+        outlet.opening_hours, get_columns(), get_logo_width(),
+    )
+    key = f"escpos-{name}:{outlet.id}:{hashlib.sha256(repr(parts).encode()).hexdigest()[:16]}"
+    segment = cache.get(key)
+    if segment is None:
+        segment = compile(outlet)
+        cache.set(key, segment, get_cache_timeout())
+    return segment
+
+
+def receipt_header(outlet):
+    return _cached_segment('header', compile_header, outlet)
+
+
+def receipt_footer(outlet):
+    return _cached_segment('footer', compile_footer, outlet)
+
+
+def item_name(item):
+    names = [item.product.name if item.product else None, item.product_variant.name if item.product_variant else None]
+    return ' - '.join(name for name in names if name) or 'Item'
+
+
+def order_heading(order, width):
+    heading = [lines(f"Order {order.order_number}", width), lines(timezone.localtime(order.order_date).strftime('%d-%m-%Y %H:%M'), width)]
+    if order.customer:
+        heading.append(lines(' '.join(value for value in (order.customer.name, order.customer.phone_number) if value), width))
+    if order.address:
+        heading.append(lines(f"Deliver to: {order.address}", width))
+    return b''.join(heading)
+
+
+def kitchen_ticket(order):
+    """The KOT the kitchen printer cuts for ``order``: big order number and quantities, no prices."""
+    width = get_columns()
+    ticket = [INITIALIZE, ALIGN_CENTER, BOLD_ON, DOUBLE_SIZE, lines("KOT", width // 2), NORMAL_SIZE, BOLD_OFF, ALIGN_LEFT]
+    ticket += [DOUBLE_HEIGHT, order_heading(order, width), NORMAL_SIZE, rule(width), BOLD_ON, DOUBLE_HEIGHT]
+    ticket += [lines(f"{item.quantity} x {item_name(item)}", width) for item in order.items.all()]
+    ticket += [NORMAL_SIZE, BOLD_OFF, rule(width), CUT]
+    return b''.join(ticket)
+
+
+def receipt(order):
+    """The customer receipt of ``order``, between its outlet's cached header and footer."""
+    width = get_columns()
+    body = [order_heading(order, width)]
+    if order.mode:
+        body.append(lines(f"Payment: {order.get_mode_display()}", width))
+    body.append(rule(width))
+    for item in order.items.all():
+        body.append(columns(f"{item.quantity} x {item_name(item)}", amount(item.total_price), width))
+    body += [rule(width), columns("GST", amount(order.gst), width)]
+    body += [BOLD_ON, columns("TOTAL", amount(order.total_price), width), BOLD_OFF, rule(width)]
+    return receipt_header(order.outlet) + b''.join(body) + receipt_footer(order.outlet)
+
+
+# ``?kind=`` of the print endpoints
+PRINT_KINDS = {
+    'kot': kitchen_ticket,
+    'receipt': receipt,
+}
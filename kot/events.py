@@ -0,0 +1,316 @@
+"""
+Server-Sent Events stream of an outlet's orders for KOT screens.
+
+Instead of re-downloading the pending board every few seconds, a screen
+loads it once, then keeps one stream open and applies each event::
+
+    id: 42
+    event: order-created
+    data: {"order": {...same fields as the KOT order list...}}
+
+    id: 43
+    event: status-changed
+    data: {"order_number": "...", "status": "PROCESSING", "version": 1}
+
+Ids come from ``v1.order_events``. A reconnecting ``EventSource`` sends the
+last id it saw as ``Last-Event-ID`` and the stream resumes after it; the
+first connection can pass ``?last_event_id=`` with the ``X-Last-Event-ID``
+header of the board it loaded. Without either, the stream starts from now.
+A screen resuming from an event that was purged gets a ``reset`` event and
+should reload the board.
+
+An event can commit after one with a higher id (see v1.order_events), so a
+resumed stream also replays the events of the last ``ORDER_EVENT_COMMIT_LAG``
+seconds before its ``Last-Event-ID``. Clients apply events by id and ignore
+ids they have already applied; within one connection no id is sent twice.
+
+Streams do not poll the table: they sleep until the order event bus
+(v1.order_bus) reports an event of their outlet, then read what follows
+their position. Every screen of an outlet sends the same order JSON for an
+``order-created`` event, so it is built once and shared through the cache
+until the order's status changes. A stream sends a comment every
+``ORDER_EVENT_HEARTBEAT`` seconds so proxies keep the connection open, and
+ends after ``ORDER_EVENT_STREAM_TIMEOUT`` seconds; the browser reconnects by
+itself, so no server thread is held forever. Under ASGI it is served as an
+async iterator and holds no thread at all.
+
+``PrintJobStream`` follows the same events for a print agent next to the
+outlet's printers, sending each new order as a ``print-job`` event that
+carries its ESC/POS ticket.
+"""
+import asyncio
+import base64
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from v1.models import Order
+from v1.order_bus import bus
+from v1.order_events import event_ids_after, events_after, is_expired, latest_event_id, settled_event_id
+
+from .escpos import PRINT_KINDS
+from .orders import with_kitchen_details
+from .serializers import OrderSerializer
+
+
+# Milliseconds an EventSource waits before reconnecting
+RETRY_MILLISECONDS = 1000
+
+HEARTBEAT = b': keep-alive\n\n'
+
+
+class InvalidEventId(ValueError):
+    pass
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets ``@api_view`` accept ``text/event-stream``; other responses (errors) become an ``error`` event."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return message('error', data)
+
+
+def message(name, data, event_id=None):
+    lines = [] if event_id is None else [f'id: {event_id}'.encode()]
+    lines.append(f'event: {name}'.encode())
+    # Compact JSON never contains a newline, so one data line carries it
+    lines.append(b'data: ' + JSONRenderer().render(data))
+    return b'\n'.join(lines) + b'\n\n'
+
+
+def parse_last_event_id(request):
+    """The event to resume after, from ``Last-Event-ID`` or ``?last_event_id=``; ``None`` when absent."""
+    value = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+    if value in (None, ''):
+        return None
+    try:
+        event_id = int(value)
+    except ValueError:
+        raise InvalidEventId("Invalid Last-Event-ID")
+    if event_id < 0:
+        raise InvalidEventId("Invalid Last-Event-ID")
+    return event_id
+
+
+def get_cache_timeout():
+    return getattr(settings, 'KOT_ORDER_CACHE_TIMEOUT', 60 * 10)
+
+
+def order_cache_key(order_id):
+    return f"kot-order:{order_id}"
+
+
+def kitchen_documents(order_ids):
+    """``order id -> KOT JSON`` of the orders, from the cache or loaded in two queries."""
+    keys = {order_cache_key(order_id): order_id for order_id in set(order_ids)}
+    documents = {keys[key]: document for key, document in cache.get_many(list(keys)).items()}
+    missing = [order_id for order_id in keys.values() if order_id not in documents]
+    if missing:
+        loaded = {
+            order.id: dict(OrderSerializer(order).data)
+            for order in with_kitchen_details(Order.objects.filter(id__in=missing))
+        }
+        cache.set_many({order_cache_key(order_id): document for order_id, document in loaded.items()}, get_cache_timeout())
+        documents.update(loaded)
+    return documents
+
+
+def forget_orders(events):
+    """Bus subscriber: drop the cached JSON of orders whose status changed."""
+    cache.delete_many([order_cache_key(event['order_id']) for event in events if event['kind'] == 'status'])
+
+
+class OutletNotifier:
+    """Bus subscriber waking the streams of the outlets that had events."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # Outlet id -> number of notifications, and the async streams waiting on it
+        self._sequences = defaultdict(int)
+        self._waiters = defaultdict(set)
+
+    def notify(self, events):
+        woken = []
+        with self._condition:
+            for outlet_id in {event['outlet_id'] for event in events}:
+                self._sequences[outlet_id] += 1
+                woken.extend(self._waiters.pop(outlet_id, ()))
+            self._condition.notify_all()
+        for loop, waiter in woken:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # The stream's event loop has closed
+                pass
+
+    def sequence(self, outlet_id):
+        with self._condition:
+            return self._sequences[outlet_id]
+
+    def wait(self, outlet_id, sequence, timeout):
+        """Block until the outlet is notified after ``sequence``, or ``timeout`` seconds pass."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequences[outlet_id] != sequence, timeout)
+
+    async def async_wait(self, outlet_id, sequence, timeout):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condition:
+            if self._sequences[outlet_id] != sequence:
+                return
+            self._waiters[outlet_id].add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._waiters.get(outlet_id, set()).discard(waiter)
+
+
+notifier = OutletNotifier()
+
+# Forget stale orders before waking the streams that would send them
+bus.subscribe(forget_orders)
+bus.subscribe(notifier.notify)
+
+
+def render_event(event, documents):
+    if event.kind == 'created':
+        return message('order-created', {'order': documents[event.order_id]}, event.id)
+    # The order's current version, which a screen that has applied every event can send back
+    data = {'order_number': event.order.order_number, 'status': event.status, 'version': event.order.version}
+    return message('status-changed', data, event.id)
+
+
+class OrderEventStream:
+    """Position of one stream; ``start`` and ``poll`` return the bytes to send next."""
+
+    def __init__(self, outlet_id, last_event_id):
+        self.outlet_id = outlet_id
+        self.last_event_id = last_event_id
+        # Ids above the settled event id that this stream has sent
+        self.sent = set()
+        self.sequence = None
+        self.heartbeat = getattr(settings, 'ORDER_EVENT_HEARTBEAT', 15)
+        self.deadline = time.monotonic() + getattr(settings, 'ORDER_EVENT_STREAM_TIMEOUT', 300)
+        self.last_sent = time.monotonic()
+
+    def start(self):
+        # Hear of events placed through other processes too
+        bus.listen()
+        chunks = [f'retry: {RETRY_MILLISECONDS}\n\n'.encode()]
+        if self.last_event_id is None:
+            self.start_from_now()
+        elif is_expired(self.last_event_id):
+            self.start_from_now()
+            chunks.append(message('reset', {'detail': 'Events were missed, reload the orders'}))
+        return chunks
+
+    def start_from_now(self):
+        self.last_event_id = latest_event_id()
+        # Events already visible are not replayed; only late commits among them are
+        self.sent = event_ids_after(self.outlet_id, min(settled_event_id(), self.last_event_id))
+
+    def poll(self):
+        # Taken before reading, so an event committed meanwhile still wakes the stream
+        self.sequence = notifier.sequence(self.outlet_id)
+        # Re-read the window where a late commit can still appear, skipping what was sent
+        floor = min(settled_event_id(), self.last_event_id)
+        events = events_after(self.outlet_id, floor, exclude=self.sent)
+        if events:
+            self.last_event_id = max(self.last_event_id, events[-1].id)
+        self.sent = {event_id for event_id in self.sent if event_id > floor} | {event.id for event in events}
+        return self.render(events)
+
+    def render(self, events):
+        documents = kitchen_documents([event.order_id for event in events if event.kind == 'created'])
+        return [render_event(event, documents) for event in events if event.kind != 'created' or event.order_id in documents]
+
+    def alive(self):
+        return time.monotonic() < self.deadline
+
+    def wait_timeout(self):
+        """Seconds to sleep before the next heartbeat or the end of the stream."""
+        now = time.monotonic()
+        return max(0, min(self.last_sent + self.heartbeat, self.deadline) - now)
+
+    def chunks_or_heartbeat(self, chunks):
+        now = time.monotonic()
+        if chunks:
+            self.last_sent = now
+            return chunks
+        if now - self.last_sent >= self.heartbeat:
+            self.last_sent = now
+            return [HEARTBEAT]
+        return []
+
+
+class PrintJobStream(OrderEventStream):
+    """
+    ``print-job`` events for a local print agent: the ESC/POS ``kind`` ticket
+    (kot.escpos) of every new order, base64 encoded, to write to the printer.
+    Agents skip event ids they have printed, as resuming replays a few.
+    """
+
+    def __init__(self, outlet_id, last_event_id, kind):
+        super().__init__(outlet_id, last_event_id)
+        self.kind = kind
+
+    def render(self, events):
+        order_ids = [event.order_id for event in events if event.kind == 'created']
+        if not order_ids:
+            return []
+        orders = with_kitchen_details(Order.objects.filter(id__in=order_ids)).select_related('outlet').in_bulk()
+        render = PRINT_KINDS[self.kind]
+        jobs = []
+        for event in events:
+            order = orders.get(event.order_id) if event.kind == 'created' else None
+            if order is not None:
+                data = {'order_number': order.order_number, 'kind': self.kind, 'data': base64.b64encode(render(order)).decode()}
+                jobs.append(message('print-job', data, event.id))
+        return jobs
+
+
+def stream_events(stream):
+    yield from stream.start()
+    while True:
+        yield from stream.chunks_or_heartbeat(stream.poll())
+        if not stream.alive():
+            return
+        notifier.wait(stream.outlet_id, stream.sequence, stream.wait_timeout())
+
+
+async def astream_events(stream):
+    for chunk in await sync_to_async(stream.start)():
+        yield chunk
+    while True:
+        for chunk in stream.chunks_or_heartbeat(await sync_to_async(stream.poll)()):
+            yield chunk
+        if not stream.alive():
+            return
+        await notifier.async_wait(stream.outlet_id, stream.sequence, stream.wait_timeout())
+
+
+def event_stream_response(request, stream):
+    # Django consumes a sync iterator in full under ASGI (and an async one under WSGI)
+    if isinstance(request._request, ASGIRequest):
+        content = astream_events(stream)
+    else:
+        content = stream_events(stream)
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
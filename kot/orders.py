@@ -0,0 +1,89 @@
+"""
+The kitchen order queue.
+
+A KOT board shows an outlet's orders in a few statuses, oldest first, read
+through the ``(outlet, status, order_date)`` index. Orders come with their
+items, products, variants and customer in two queries whatever the page
+size. Each page returns an ``after`` cursor, the position of its last order;
+passing it back returns only the orders that follow, so a board pages through
+a busy day, or picks up newly placed orders, without reloading everything.
+
+Orders uploaded late with an earlier ``order_date`` sort before a board's
+cursor; the order event stream (kot.events) reports those as they arrive.
+"""
+from django.db.models import Prefetch, Q
+
+from v1.models import Order, OrderItem
+from v1.sync import InvalidCursor, decode_cursor as decode_moment, encode_cursor as encode_moment
+
+
+DEFAULT_STATUSES = ('PENDING',)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidQueueParameter(ValueError):
+    pass
+
+
+def parse_statuses(values):
+    """Statuses from ``?status=`` (repeated or comma separated); defaults to pending orders."""
+    statuses = {status.strip().upper() for value in values for status in value.split(',') if status.strip()}
+    if not statuses:
+        return DEFAULT_STATUSES
+    valid = {choice for choice, _ in Order.STATUS_CHOICES}
+    unknown = statuses - valid
+    if unknown:
+        raise InvalidQueueParameter(f"Unknown status: {', '.join(sorted(unknown))}")
+    return tuple(sorted(statuses))
+
+
+def parse_limit(value):
+    if value in (None, ''):
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidQueueParameter("Invalid limit")
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def encode_cursor(order):
+    return f"{encode_moment(order.order_date)}-{order.id}"
+
+
+def decode_cursor(cursor):
+    """``(order_date, id)`` of the order a cursor points at."""
+    moment, _, order_id = (cursor or '').partition('-')
+    try:
+        return decode_moment(moment), int(order_id)
+    except (InvalidCursor, ValueError):
+        raise InvalidQueueParameter("Invalid cursor")
+
+
+def with_kitchen_details(orders):
+    """``orders`` with the items, products, variants and customer the KOT serializer reads."""
+    return orders.select_related('customer').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product', 'product_variant').order_by('id'))
+    )
+
+
+def kitchen_orders(outlet_id=None, statuses=DEFAULT_STATUSES, after=None, limit=None):
+    """
+    Orders in ``statuses``, oldest first, of one outlet or of all outlets.
+
+    ``after`` is a decoded cursor; only the orders following it are returned.
+    """
+    orders = Order.objects.filter(status__in=statuses)
+    if outlet_id is not None:
+        orders = orders.filter(outlet_id=outlet_id)
+    if after is not None:
+        order_date, order_id = after
+        # The order_date__gte bound lets the index seek straight to the cursor
+        orders = orders.filter(order_date__gte=order_date).filter(Q(order_date__gt=order_date) | Q(id__gt=order_id))
+
+    orders = with_kitchen_details(orders).order_by('order_date', 'id')
+    if limit is not None:
+        orders = orders[:limit]
+    return list(orders)
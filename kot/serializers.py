@@ -19,9 +19,13 @@ class CustomerSerializer(serializers.ModelSerializer):
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
-    customers = CustomerSerializer(many=True, read_only=True)
+    # Kept as a list so existing KOT screens keep working now that an order has one customer
+    customers = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
-        fields = ['order_number', 'order_date', 'total_price', 'gst', 'status', 'address', 'mode', 'items', 'customers']
-        ref_name = 'KotOrderSerializer'
\ No newline at end of file
+        fields = ['order_number', 'order_date', 'total_price', 'gst', 'status', 'version', 'address', 'mode', 'items', 'customers']
+        ref_name = 'KotOrderSerializer'
+
+    def get_customers(self, obj):
+        return [CustomerSerializer(obj.customer).data] if obj.customer else []
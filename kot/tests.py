@@ -1,3 +1,181 @@
-from django.test import TestCase
+import base64
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from v1.models import Company, Order, OrderEvent, OrderItem, Outlet
+from v1.order_events import record_created, record_status_changes
+from v1.order_status import change_status
+
+from .escpos import CUT
+from .events import OrderEventStream, kitchen_documents, notifier
 
 # Create your tests here.
+
+
+# No commit lag: a resumed stream starts right after its Last-Event-ID
+@override_settings(ORDER_EVENT_STREAM_TIMEOUT=0, ORDER_EVENT_BUS='local', ORDER_EVENT_COMMIT_LAG=0, QR_MENU_PUBLISH=False)
+class OrderEventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet = Outlet.objects.create(
+            company=company, logo='logos/outlet.png', gst_number='GST', outlet_name='Outlet', address='Address'
+        )
+        cls.orders = [
+            Order.objects.create(
+                outlet=cls.outlet, order_number=f'1-{index}', total_price=Decimal('100.00'), gst=Decimal('5.00')
+            )
+            for index in range(2)
+        ]
+        record_created(cls.orders)
+        cls.orders[0].status = 'PROCESSING'
+        record_status_changes(cls.orders[:1])
+
+    def setUp(self):
+        cache.clear()
+
+    def stream(self, **headers):
+        response = self.client.get(f'/v1/kot/api/orders/{self.outlet.id}/stream/', HTTP_ACCEPT='text/event-stream', **headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_resumes_after_last_event_id(self):
+        first = self.orders[0].events.get(kind='created').id
+        body = self.stream(HTTP_LAST_EVENT_ID=str(first))
+
+        self.assertNotIn(f'id: {first}\n', body)
+        self.assertIn(f'id: {first + 1}\nevent: order-created\ndata: {{"order":{{"order_number":"1-1"', body)
+        self.assertIn(f'id: {first + 2}\nevent: status-changed\ndata: {{"order_number":"1-0","status":"PROCESSING","version":0}}', body)
+
+    def test_starts_from_the_board_without_last_event_id(self):
+        response = self.client.get('/v1/kot/api/orders/')
+        self.assertEqual(response['X-Last-Event-ID'], str(self.orders[0].events.latest('id').id))
+        self.assertNotIn('event: order-created', self.stream())
+
+    def test_expired_last_event_id_resets_the_board(self):
+        self.assertIn('event: reset', self.stream(HTTP_LAST_EVENT_ID='1000'))
+
+    @override_settings(ORDER_EVENT_COMMIT_LAG=5)
+    def test_events_committing_late_are_sent_once(self):
+        # Resuming replays the commit-lag window before Last-Event-ID; clients skip ids they have
+        first = self.orders[0].events.get(kind='created').id
+        self.assertIn(f'id: {first}\n', self.stream(HTTP_LAST_EVENT_ID=str(first)))
+
+        stream = OrderEventStream(self.outlet.id, None)
+        stream.start()
+        self.assertEqual(stream.poll(), [])
+
+        latest = OrderEvent.objects.latest('id').id
+        OrderEvent.objects.create(id=latest + 10, outlet=self.outlet, order=self.orders[1], kind='status', status='PROCESSING')
+        self.assertIn(f'id: {latest + 10}\n'.encode(), b''.join(stream.poll()))
+        # Drawn before the previous event, committed after it
+        OrderEvent.objects.create(id=latest + 5, outlet=self.outlet, order=self.orders[1], kind='status', status='PROCESSING')
+        self.assertIn(f'id: {latest + 5}\n'.encode(), b''.join(stream.poll()))
+        self.assertEqual(stream.poll(), [])
+
+    def test_print_queue_sends_escpos_tickets_of_new_orders(self):
+        first = self.orders[0].events.get(kind='created').id
+        with self.assertLogs('kot.escpos', 'WARNING'):
+            response = self.client.get(
+                f'/v1/kot/api/orders/{self.outlet.id}/print-queue/?kind=receipt&last_event_id={first}',
+                HTTP_ACCEPT='text/event-stream'
+            )
+            body = b''.join(response.streaming_content).decode()
+
+        # One job for the order created after the cursor; status changes print nothing
+        self.assertEqual(body.count('event: print-job'), 1)
+        job = json.loads(body.split('data: ')[1].split('\n')[0])
+        self.assertEqual(job['order_number'], '1-1')
+        receipt = base64.b64decode(job['data'])
+        self.assertIn(b'GSTIN: GST\n', receipt)
+        self.assertTrue(receipt.endswith(CUT))
+        self.assertEqual(receipt, self.client.get(f'/v1/kot/api/orders/{self.orders[1].id}/print/?kind=receipt').content)
+
+    def test_status_change_wakes_streams_and_refreshes_cached_order(self):
+        order = self.orders[1]
+        self.assertEqual(kitchen_documents([order.id])[order.id]['status'], 'PENDING')
+        sequence = notifier.sequence(self.outlet.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            change_status(order.id, 'PROCESSING')
+
+        self.assertEqual(notifier.sequence(self.outlet.id), sequence + 1)
+        with self.assertNumQueries(0):
+            kitchen_documents([])
+        self.assertEqual(kitchen_documents([order.id])[order.id]['status'], 'PROCESSING')
+
+
+class KitchenQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet = Outlet.objects.create(
+            company=company, logo='logos/outlet.png', gst_number='GST', outlet_name='Outlet', address='Address'
+        )
+        cls.add_orders(3)
+
+    @classmethod
+    def add_orders(cls, count, status='PENDING'):
+        start = Order.objects.count()
+        for index in range(start, start + count):
+            order = Order.objects.create(
+                outlet=cls.outlet, order_number=f'1-{index}', total_price=Decimal('100.00'),
+                gst=Decimal('5.00'), status=status
+            )
+            OrderItem.objects.create(order=order, price=Decimal('50.00'), quantity=2)
+
+    def get(self, **params):
+        return self.client.get(f'/v1/kot/api/orders/{self.outlet.id}/queue/', params).json()
+
+    def test_query_count_does_not_grow_with_the_queue(self):
+        # Outlet check, latest event id, orders with customers, items with products and variants
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.get()['orders']), 3)
+
+        self.add_orders(10)
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.get()['orders']), 13)
+
+    def test_after_cursor_returns_only_following_orders(self):
+        first = self.get(limit=2)
+        self.assertEqual([order['order_number'] for order in first['orders']], ['1-0', '1-1'])
+        self.assertTrue(first['has_more'])
+
+        self.add_orders(1, status='PROCESSING')
+        rest = self.get(after=first['after'], status='PENDING,PROCESSING')
+        self.assertEqual([order['order_number'] for order in rest['orders']], ['1-2', '1-3'])
+        self.assertFalse(rest['has_more'])
+        self.assertEqual(self.get(after=rest['after'])['orders'], [])
+
+    def test_bulk_status_change_skips_orders_that_cannot_move(self):
+        pending, completed = Order.objects.order_by('id')[:2]
+        Order.objects.filter(id=completed.id).update(status='COMPLETED')
+        url = f'/v1/kot/api/orders/{self.outlet.id}/status/'
+
+        # The savepoint, the update and the order events
+        with self.assertNumQueries(4):
+            response = self.client.post(
+                url, {'order_ids': [pending.id, completed.id, 0], 'status': 'PROCESSING'}, content_type='application/json'
+            )
+        self.assertEqual(response.json()['updated'], [pending.id])
+        self.assertEqual(Order.objects.get(id=pending.id).status, 'PROCESSING')
+        self.assertEqual(pending.events.get().status, 'PROCESSING')
+
+    def test_status_change_is_refused_for_a_stale_version_or_a_finished_order(self):
+        order = Order.objects.order_by('id').first()
+        url = f'/v1/kot/api/orders/{order.id}/status/'
+
+        response = self.client.patch(url + 'process/', {'version': 1}, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.json()['status'], response.json()['version']), ('PENDING', 0))
+
+        # One tap completes a pending order
+        response = self.client.patch(url + 'complete/', {'version': 0}, content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['data']['version']), (200, 1))
+
+        response = self.client.patch(url + 'complete/', content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.json()['status'], response.json()['version']), ('COMPLETED', 1))
@@ -5,4 +5,9 @@ urlpatterns = [
     path('orders/', views.get_orders_for_kot, name='get_orders_for_kot'),
     path('orders/<int:order_id>/status/process/', views.change_order_status_to_processing, name='change_order_status_to_processing'),
     path('orders/<int:order_id>/status/complete/', views.change_order_status_to_completed, name='change_order_status_to_completed'),
+    path('orders/<int:outlet_id>/queue/', views.get_outlet_orders_for_kot, name='get_outlet_orders_for_kot'),
+    path('orders/<int:outlet_id>/status/', views.bulk_change_order_status, name='bulk_change_order_status'),
+    path('orders/<int:outlet_id>/stream/', views.order_event_stream, name='order_event_stream'),
+    path('orders/<int:outlet_id>/print-queue/', views.order_print_stream, name='order_print_stream'),
+    path('orders/<int:order_id>/print/', views.print_order, name='print_order'),
 ]
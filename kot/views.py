@@ -1,16 +1,40 @@
+from django.http import HttpResponse
 from django.shortcuts import render
 
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
 
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
 from v1.models import (
-    Order
+    Order,
+    Outlet
 )
+from v1.order_events import latest_event_id
+from v1.order_status import MAX_BULK_ORDERS, InvalidTransition, StatusConflict, change_status, transition_orders
 
+from .escpos import PRINT_KINDS
+from .events import (
+    EventStreamRenderer,
+    InvalidEventId,
+    OrderEventStream,
+    PrintJobStream,
+    event_stream_response,
+    parse_last_event_id
+)
+from .orders import (
+    InvalidQueueParameter,
+    decode_cursor,
+    encode_cursor,
+    kitchen_orders,
+    parse_limit,
+    parse_statuses,
+    with_kitchen_details
+)
 from .serializers import (
     OrderSerializer
 )
@@ -18,55 +42,148 @@ from .serializers import (
 
 @swagger_auto_schema(
     method='get',
-    operation_description="Retrieve orders with PENDING status.",
+    operation_description="Retrieve orders with PENDING status across all outlets. Prefer the outlet-scoped queue.",
     responses={200: OrderSerializer(many=True)}
 )
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_orders_for_kot(request):
-    # You can filter the orders as needed, for example by status or outlet
-    orders = Order.objects.filter(status='PENDING')  # Example filter, adjust as needed
+    # Read before the orders, so a stream resuming from it replays anything that changes meanwhile
+    last_event_id = latest_event_id()
+
+    orders = kitchen_orders(statuses=('PENDING',))
 
     serializer = OrderSerializer(orders, many=True)
-    return Response(serializer.data)
+    return Response(serializer.data, headers={'X-Last-Event-ID': str(last_event_id)})
 
 
 
 
 @swagger_auto_schema(
-    method='patch',
-    operation_description="Change the status of an order to 'PROCESSING'.",
+    method='get',
+    operation_description=(
+        "Kitchen queue of an outlet: orders in the given statuses (default PENDING), oldest first. "
+        "Pass the returned 'after' cursor back to get only the orders that follow."
+    ),
+    manual_parameters=[
+        openapi.Parameter('status', openapi.IN_QUERY, description="Statuses, comma separated (default PENDING)", type=openapi.TYPE_STRING),
+        openapi.Parameter('after', openapi.IN_QUERY, description="Cursor from the previous response", type=openapi.TYPE_STRING),
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Orders per response (default 50, max 200)", type=openapi.TYPE_INTEGER),
+    ],
     responses={
-        200: OrderSerializer(),
-        404: 'Order not found'
+        200: OrderSerializer(many=True),
+        400: 'Invalid status, cursor or limit',
+        404: 'Outlet not found'
     }
 )
-@api_view(['PATCH'])
+@api_view(['GET'])
 @permission_classes([AllowAny])
-def change_order_status_to_processing(request, order_id):
+def get_outlet_orders_for_kot(request, outlet_id):
     try:
-        # Fetch the order by ID
-        order = Order.objects.get(id=order_id)
+        statuses = parse_statuses(request.query_params.getlist('status'))
+        limit = parse_limit(request.query_params.get('limit'))
+        after = request.query_params.get('after')
+        position = decode_cursor(after) if after else None
+    except InvalidQueueParameter as e:
+        return Response({
+            'error': True,
+            'detail': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Outlet.objects.filter(id=outlet_id).exists():
+        return Response({
+            'error': True,
+            'detail': 'Outlet not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # Read before the orders, so a stream resuming from it replays anything that changes meanwhile
+    last_event_id = latest_event_id()
 
-        # Update the status to 'PROCESSING'
-        order.status = 'PROCESSING'
-        order.save()
+    # One extra row says whether another page follows
+    orders = kitchen_orders(outlet_id, statuses, position, limit + 1)
+    has_more = len(orders) > limit
+    orders = orders[:limit]
 
-        # Serialize the updated order
-        serializer = OrderSerializer(order)
+    return Response({
+        'error': False,
+        'detail': 'Orders retrieved successfully',
+        'orders': OrderSerializer(orders, many=True).data,
+        # Unchanged when nothing new came, so the board keeps polling from the same place
+        'after': encode_cursor(orders[-1]) if orders else after,
+        'has_more': has_more
+    }, headers={'X-Last-Event-ID': str(last_event_id)})
 
-        # Return the success response in the desired format
+
+
+
+VERSION_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'version': openapi.Schema(
+            type=openapi.TYPE_INTEGER,
+            description="Version of the order the screen shows; the change is refused with 409 if it moved on"
+        ),
+    }
+)
+
+
+def _change_status(request, order_id, target):
+    version = request.data.get('version')
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
         return Response({
-            'error': False,
-            'detail': 'Order status updated successfully',
-            'data': serializer.data
-        }, status=status.HTTP_200_OK)
+            'error': True,
+            'detail': 'version must be an integer'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # One conditional update; the order is read back with its items for the response
+        order = change_status(order_id, target, version, queryset=with_kitchen_details(Order.objects.all()))
 
     except Order.DoesNotExist:
         return Response({
             'error': True,
             'detail': 'Order not found'
         }, status=status.HTTP_404_NOT_FOUND)
+
+    except StatusConflict as e:
+        if version is not None and version != e.version:
+            detail = 'Order was changed by someone else'
+        else:
+            detail = f'Order cannot move from {e.status} to {target}'
+        return Response({
+            'error': True,
+            'detail': detail,
+            'status': e.status,
+            'version': e.version
+        }, status=status.HTTP_409_CONFLICT)
+
+    # Serialize the updated order
+    serializer = OrderSerializer(order)
+
+    # Return the success response in the desired format
+    return Response({
+        'error': False,
+        'detail': 'Order status updated successfully',
+        'data': serializer.data
+    }, status=status.HTTP_200_OK)
+
+
+
+
+@swagger_auto_schema(
+    method='patch',
+    operation_description="Change the status of an order from PENDING to 'PROCESSING'.",
+    request_body=VERSION_BODY,
+    responses={
+        200: OrderSerializer(),
+        404: 'Order not found',
+        409: 'Order is not pending, or its version moved on'
+    }
+)
+@api_view(['PATCH'])
+@permission_classes([AllowAny])
+def change_order_status_to_processing(request, order_id):
+    return _change_status(request, order_id, 'PROCESSING')
     
     
 
@@ -74,35 +191,220 @@ def change_order_status_to_processing(request, order_id):
 
 @swagger_auto_schema(
     method='patch',
-    operation_description="Change the status of an order to 'COMPLETED'.",
+    operation_description=(
+        "Change the status of an order to 'COMPLETED'. Pending, confirmed and processing orders can be "
+        "completed; completed and cancelled orders cannot."
+    ),
+    request_body=VERSION_BODY,
     responses={
         200: OrderSerializer(),
-        404: 'Order not found'
+        404: 'Order not found',
+        409: 'Order is already completed or cancelled, or its version moved on'
     }
 )
 @api_view(['PATCH'])
 @permission_classes([AllowAny])
 def change_order_status_to_completed(request, order_id):
+    return _change_status(request, order_id, 'COMPLETED')
+
+
+
+
+
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Server-Sent Events stream of an outlet's orders: 'order-created' events carry the order, "
+        "'status-changed' events its order number and new status. Resumes after the Last-Event-ID "
+        "header or the last_event_id parameter (e.g. the X-Last-Event-ID header of the order list)."
+    ),
+    manual_parameters=[
+        openapi.Parameter('last_event_id', openapi.IN_QUERY, description="Resume after this event id", type=openapi.TYPE_INTEGER),
+    ],
+    responses={
+        200: 'text/event-stream',
+        400: 'Invalid Last-Event-ID',
+        404: 'Outlet not found'
+    }
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def order_event_stream(request, outlet_id):
     try:
-        # Fetch the order by ID
-        order = Order.objects.get(id=order_id)
+        last_event_id = parse_last_event_id(request)
+    except InvalidEventId as e:
+        return Response({
+            'error': True,
+            'detail': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Outlet.objects.filter(id=outlet_id).exists():
+        return Response({
+            'error': True,
+            'detail': 'Outlet not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return event_stream_response(request, OrderEventStream(outlet_id, last_event_id))
+
 
-        # Update the status to 'COMPLETED'
-        order.status = 'COMPLETED'
-        order.save()
 
-        # Serialize the updated order
-        serializer = OrderSerializer(order)
 
-        # Return the success response in the desired format
+
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Move many orders of an outlet to one status in a single update. Orders that cannot move to it "
+        "(e.g. already completed), belong to another outlet or do not exist are skipped; "
+        "'updated' lists the ids that changed."
+    ),
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['order_ids', 'status'],
+        properties={
+            'order_ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+            'status': openapi.Schema(type=openapi.TYPE_STRING, enum=['PROCESSING', 'COMPLETED', 'CANCELLED']),
+        }
+    ),
+    responses={
+        200: 'Ids of the orders that changed',
+        400: 'Invalid order ids or status'
+    }
+)
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def bulk_change_order_status(request, outlet_id):
+    order_ids = request.data.get('order_ids')
+    target = request.data.get('status')
+
+    if not isinstance(order_ids, list) or not all(isinstance(order_id, int) and not isinstance(order_id, bool) for order_id in order_ids):
+        return Response({
+            'error': True,
+            'detail': 'order_ids must be a list of order ids'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(order_ids) > MAX_BULK_ORDERS:
+        return Response({
+            'error': True,
+            'detail': f'At most {MAX_BULK_ORDERS} orders can be updated at once'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(target, str):
+        return Response({
+            'error': True,
+            'detail': 'status is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        updated = transition_orders(outlet_id, order_ids, target.upper())
+    except InvalidTransition as e:
         return Response({
-            'error': False,
-            'detail': 'Order status updated successfully',
-            'data': serializer.data
-        }, status=status.HTTP_200_OK)
+            'error': True,
+            'detail': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': True,
+            'detail': f'An error occurred: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({
+        'error': False,
+        'detail': f'{len(updated)} order(s) updated',
+        'status': target.upper(),
+        'updated': updated
+    }, status=status.HTTP_200_OK)
+
+
+
+
+PRINT_KIND_PARAMETER = openapi.Parameter(
+    'kind', openapi.IN_QUERY, description="'kot' (kitchen ticket, default) or 'receipt'", type=openapi.TYPE_STRING
+)
 
+
+def _print_kind(request):
+    kind = request.query_params.get('kind') or 'kot'
+    return kind if kind in PRINT_KINDS else None
+
+
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Server-Sent Events stream of print jobs for a print agent next to the outlet's printers: "
+        "a 'print-job' event per new order whose 'data' is the base64 encoded ESC/POS ticket. "
+        "Resumes after the Last-Event-ID header or the last_event_id parameter."
+    ),
+    manual_parameters=[
+        PRINT_KIND_PARAMETER,
+        openapi.Parameter('last_event_id', openapi.IN_QUERY, description="Resume after this event id", type=openapi.TYPE_INTEGER),
+    ],
+    responses={
+        200: 'text/event-stream',
+        400: 'Invalid kind or Last-Event-ID',
+        404: 'Outlet not found'
+    }
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def order_print_stream(request, outlet_id):
+    kind = _print_kind(request)
+    if kind is None:
+        return Response({
+            'error': True,
+            'detail': 'kind must be kot or receipt'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        last_event_id = parse_last_event_id(request)
+    except InvalidEventId as e:
+        return Response({
+            'error': True,
+            'detail': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Outlet.objects.filter(id=outlet_id).exists():
+        return Response({
+            'error': True,
+            'detail': 'Outlet not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return event_stream_response(request, PrintJobStream(outlet_id, last_event_id, kind))
+
+
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="ESC/POS kitchen ticket or receipt of an order, to send to a thermal printer as is (e.g. to reprint).",
+    manual_parameters=[PRINT_KIND_PARAMETER],
+    responses={
+        200: 'application/octet-stream',
+        400: 'Invalid kind',
+        404: 'Order not found'
+    }
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def print_order(request, order_id):
+    kind = _print_kind(request)
+    if kind is None:
+        return Response({
+            'error': True,
+            'detail': 'kind must be kot or receipt'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        order = with_kitchen_details(Order.objects.select_related('outlet')).get(id=order_id)
     except Order.DoesNotExist:
         return Response({
             'error': True,
             'detail': 'Order not found'
-        }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return HttpResponse(PRINT_KINDS[kind](order), content_type='application/octet-stream')
@@ -87,10 +87,15 @@ WSGI_APPLICATION = 'pos.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# pos.sqlite3 is Django's SQLite backend with write transactions that queue for
+# the lock instead of failing with "database is locked"; see pos/sqlite3/base.py
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'pos.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
@@ -155,10 +160,76 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Cache Configuration
+# Use a shared backend (Redis, Memcached or the database cache) when running several worker processes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Every worker must see every claimed key, so they live in the database rather than in
+    # one process's memory; migration v1 0030 creates the table
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'idempotency_keys',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+        },
+    },
+}
+
+# Idempotency-Key Configuration
+IDEMPOTENCY_CACHE_ALIAS = 'idempotency'
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24  # Seconds a stored order response can be replayed
+
+# Order Ingestion Configuration
+# 'sync' writes each order before responding; 'queued' appends it to ORDER_QUEUE_PATH and
+# returns at once, leaving the write to `python manage.py drain_order_queue`
+ORDER_INGESTION_MODE = 'sync'
+ORDER_QUEUE_PATH = BASE_DIR / 'order_queue.sqlite3'
+ORDER_NUMBER_BLOCK_SIZE = 50
+BULK_ORDER_UPLOAD_LIMIT = 1000  # Orders accepted per bulk upload request
+CATALOG_CACHE_TIMEOUT = 60 * 5
+
+# Menu documents are recompiled on a background thread after catalog changes; see v1/menus.py
+MENU_COMPILE_IN_BACKGROUND = True
+MENU_DOCUMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Delta catalog sync (counterapi catalog_sync); cursors lag the clock so slow commits are not skipped
+CATALOG_SYNC_CURSOR_LAG = 5
+CATALOG_TOMBSTONE_RETENTION_DAYS = 30
+
+# Static public QR menus, republished after catalog changes; see qr/publish.py
+QR_MENU_PUBLISH = True
+QR_MENU_PUBLISH_IN_BACKGROUND = True
+QR_MENU_KEEP_VERSIONS = 3
+
+# Order events streamed to kitchen screens; see v1/order_events.py and kot/events.py
+ORDER_EVENT_RETENTION_HOURS = 48
+ORDER_EVENT_HEARTBEAT = 15
+ORDER_EVENT_STREAM_TIMEOUT = 300  # Streams end after this many seconds and the browser reconnects
+# Order event bus (v1/order_bus.py): 'local' delivers events only within the process that placed the order,
+# 'database' also reads other processes' events back from the event table every ORDER_EVENT_BUS_POLL_INTERVAL seconds
+ORDER_EVENT_BUS = 'database'
+ORDER_EVENT_BUS_POLL_INTERVAL = 0.5
+ORDER_EVENT_COMMIT_LAG = 5  # Seconds an order event may take to commit; readers re-read this window so none is skipped
+KOT_ORDER_CACHE_TIMEOUT = 60 * 10  # Seconds the order JSON sent to kitchen screens is shared through the cache
+
+# ESC/POS kitchen tickets and receipts; see kot/escpos.py
+ESCPOS_COLUMNS = 48  # Characters per line: 48 on 80 mm paper, 32 on 58 mm
+ESCPOS_LOGO_WIDTH = 384  # Dots; receipt logos are scaled to fit a square this wide
+ESCPOS_SEGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# WebP/JPEG thumbnails of uploaded images, generated by a pool of background threads; see v1/images.py
+IMAGE_DERIVATIVE_SIZES = {'small': 160, 'medium': 480}  # Side of the square each size fits in, in pixels
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2
+IMAGE_DERIVATIVES_IN_BACKGROUND = True
+
 # Media Files Configuration
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+QR_MENU_PUBLISH_ROOT = os.path.join(MEDIA_ROOT, 'qr-menus')
 
 
 # Static files (CSS, JavaScript, Images)
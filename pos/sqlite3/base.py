@@ -0,0 +1,22 @@
+"""
+SQLite backend that lets concurrent requests write without "database is locked".
+
+A plain ``BEGIN`` takes a read lock and upgrades it to a write lock at the first
+write. When two transactions do that at once, SQLite cannot wait for the other
+without deadlocking, so it fails one of them straight away whatever the busy
+timeout. ``BEGIN IMMEDIATE`` takes the write lock up front, so a second writer
+waits its turn for up to ``OPTIONS['timeout']`` seconds instead. WAL journaling
+lets reads carry on while a write is in progress.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        # Persistent in the database file; in-memory test databases ignore it
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,47 @@
+"""
+Async QR place-order endpoint, for ASGI deployments.
+
+Returns the same bodies as ``views.place_order``.
+"""
+from asgiref.sync import sync_to_async
+
+from rest_framework.exceptions import ValidationError
+
+from v1.asyncapi import api_response, async_api_view, parse_json_body
+from v1.idempotency import idempotent
+from v1.pricing import OrderError
+from v1.models import Outlet
+
+from .orders import submit_order
+
+
+@async_api_view(['POST'])
+@idempotent
+async def place_order(request, outlet_id):
+    # Fetch the outlet from the URL parameter
+    outlet = await Outlet.objects.filter(id=outlet_id).afirst()
+    if outlet is None:
+        return api_response({'detail': 'Not found.'}, status=404)
+
+    data = parse_json_body(request)
+    if not isinstance(data, dict):
+        return api_response({
+            'error': True,
+            'detail': 'Request body must be a JSON object'
+        }, status=400)
+
+    try:
+        order_details = await sync_to_async(submit_order)(outlet, data)
+    except ValidationError as e:
+        return api_response({
+            'error': True,
+            'detail': 'Validation failed',
+            'errors': e.detail
+        }, status=400)
+    except OrderError as e:
+        return api_response({
+            'error': True,
+            'detail': str(e)
+        }, status=400)
+
+    return api_response(order_details, status=201)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from qr.publish import get_outlet_directory, publish_outlet
+from v1.models import Outlet
+
+
+class Command(BaseCommand):
+    help = "Publish the static public QR menus of outlets under QR_MENU_PUBLISH_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outlet', type=int, nargs='*', default=None, help="Only these outlet ids.")
+
+    def handle(self, *args, **options):
+        outlet_ids = options['outlet'] or Outlet.objects.order_by('id').values_list('id', flat=True)
+
+        published = 0
+        for outlet_id in outlet_ids:
+            version = publish_outlet(outlet_id)
+            if version is not None:
+                published += 1
+                self.stdout.write(f"Outlet {outlet_id}: version {version} in {get_outlet_directory(outlet_id)}")
+        self.stdout.write(self.style.SUCCESS(f"Published {published} menu(s)"))
@@ -0,0 +1,83 @@
+"""
+QR order placement shared by the sync and async place-order views.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from v1.catalog import fetch_price_entries
+from v1.customers import upsert_customer
+from v1.order_events import record_created
+from v1.order_numbers import next_order_number
+from v1.pricing import collect_catalog_ids, price_lines
+from v1.models import Order, OrderItem
+
+from .serializers import OrderSerializer
+
+
+def submit_order(outlet, data):
+    """
+    Validate, price and write one QR order for ``outlet``.
+
+    Returns the response body. Raises ``rest_framework.exceptions.ValidationError``
+    for invalid order data and ``OrderError`` for items that cannot be priced.
+    """
+    # Add the outlet to the request data for the serializer
+    serializer = OrderSerializer(data={**data, 'outlet': outlet.id})
+    serializer.is_valid(raise_exception=True)
+
+    order_data = serializer.validated_data
+    items_data = data.get('items', [])
+    customer_data = data.get('customer', {})
+
+    # Price every line against the outlet catalog with the shared GST rules
+    product_ids, variant_ids = collect_catalog_ids(items_data)
+    products, variants = fetch_price_entries(product_ids=product_ids, variant_ids=variant_ids, outlet_id=outlet.id)
+    lines, total_price, total_gst = price_lines(items_data, products, variants)
+
+    # Allocated before writing so a rollback never re-issues a reserved block
+    order_number = next_order_number(outlet.id)
+
+    with transaction.atomic():
+        # Extract customer data and find the customer in the directory
+        customer = upsert_customer(customer_data.get('name'), customer_data.get('phone'))
+
+        # Handle the creation of the order
+        order = Order.objects.create(
+            order_number=order_number,
+            order_date=order_data.get('order_date', timezone.now()),
+            mode=order_data.get('mode'),
+            total_price=total_price,
+            gst=total_gst,
+            outlet=outlet,  # Associate the outlet with the order
+            customer=customer
+        )
+
+        OrderItem.objects.bulk_create([OrderItem(order=order, **line) for line in lines])
+        record_created([order])
+
+    # Item details for the response
+    items_list = [
+        {
+            'product_name': products[line['product_id']].name if not line['product_variant_id'] else None,
+            'product_variant_name': variants[line['product_variant_id']].name if line['product_variant_id'] else None,
+            'quantity': line['quantity'],
+            'price': line['price'],
+            'total_price': line['total_price'],
+            'gst': line['gst'],
+        }
+        for line in lines
+    ]
+
+    # Serialize the entire order including customer and items
+    return {
+        'error': False,
+        'detail': 'Order placed successfully',
+        'order_number': order.order_number,
+        'total_price': total_price,
+        'gst': total_gst,
+        'customer': {
+            'name': customer.name,
+            'phone_number': customer_data.get('phone')
+        },
+        'items': items_list
+    }
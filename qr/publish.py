@@ -0,0 +1,212 @@
+"""
+Static public QR menus.
+
+Every diner scanning an outlet's QR code gets the same menu, so it is
+published as files the web server sends without running Django.
+``publish_outlet`` renders the outlet's categories, products (variants,
+tax-inclusive prices, image and thumbnail URLs) and menu windows into::
+
+    <QR_MENU_PUBLISH_ROOT>/<outlet_id>/menu.<version>.json   immutable, named by content hash
+    <QR_MENU_PUBLISH_ROOT>/<outlet_id>/menu.json             the current version
+    <QR_MENU_PUBLISH_ROOT>/<outlet_id>/index.html            the current version as a page
+
+each with a ``.gz`` copy (and ``.br`` when the brotli package is installed)
+for the web server's precompressed file support. Files are swapped in
+atomically and the last ``QR_MENU_KEEP_VERSIONS`` versioned files are kept
+for clients still holding an older link.
+
+qr.signals republishes an outlet after every catalog change, once the
+transaction commits, on a background worker; ``publish_qr_menus``
+publishes on demand.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+
+from rest_framework.renderers import JSONRenderer
+
+from v1.background import CoalescingQueue
+from v1.images import derivative_urls, digests_of, get_sizes
+from v1.menus import attach_product_ids
+from v1.models import Category, Menu, Outlet, Product, ProductVariant
+
+from .serializers import ProductSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def get_publish_root():
+    return getattr(settings, 'QR_MENU_PUBLISH_ROOT', os.path.join(settings.MEDIA_ROOT, 'qr-menus'))
+
+
+def get_outlet_directory(outlet_id):
+    return os.path.join(get_publish_root(), str(outlet_id))
+
+
+def public_menu_url(outlet_id, name='index.html'):
+    """URL of a published file, assuming the publish root is served under ``MEDIA_URL``."""
+    return f"{settings.MEDIA_URL}qr-menus/{outlet_id}/{name}"
+
+
+def build_menu(outlet):
+    """The public menu of an outlet as a JSON-ready dict (seven queries)."""
+    categories = Category.objects.filter(outlet=outlet).order_by('id')
+    products = Product.objects.filter(outlet=outlet).prefetch_related(
+        Prefetch('variants', queryset=ProductVariant.objects.order_by('id'))
+    ).order_by('id')
+    menus = attach_product_ids(Menu.objects.filter(outlet=outlet, is_enabled=True).order_by('id'))
+    logo_digest = digests_of([outlet.logo.name]).get(outlet.logo.name) if outlet.logo else None
+
+    return {
+        'outlet': {
+            'id': outlet.id,
+            'name': outlet.outlet_name,
+            'address': outlet.address,
+            'phone_number': outlet.phone_number,
+            'logo': outlet.logo.url if outlet.logo else None,
+            'logo_thumbnails': derivative_urls(logo_digest) if logo_digest else None,
+        },
+        'categories': [{'id': category.id, 'name': category.name} for category in categories],
+        # Without a request in the context, image URLs are relative to the site the files are served from
+        'products': ProductSerializer(products, many=True).data,
+        'menus': [
+            {
+                'id': menu.id,
+                'name': menu.name,
+                'start_date': menu.start_date.isoformat() if menu.start_date else None,
+                'end_date': menu.end_date.isoformat() if menu.end_date else None,
+                'open_time': menu.open_time.isoformat() if menu.open_time else None,
+                'close_time': menu.close_time.isoformat() if menu.close_time else None,
+                'products': menu.product_ids,
+            }
+            for menu in menus
+        ],
+    }
+
+
+def _smallest_thumbnail(thumbnails):
+    # ``{format: url}`` of the smallest thumbnail size, or None
+    if not thumbnails:
+        return None
+    sizes = get_sizes()
+    return thumbnails[min(thumbnails, key=sizes.get)]
+
+
+def render_page(menu):
+    products = {}
+    for product in menu['products']:
+        products.setdefault(product['category'], []).append(
+            {'product': product, 'thumbnail': _smallest_thumbnail(product['image_thumbnails'])}
+        )
+    sections = [
+        {'name': category['name'], 'products': products[category['id']]}
+        for category in menu['categories'] if category['id'] in products
+    ]
+    context = {
+        'outlet': menu['outlet'],
+        'logo': _smallest_thumbnail(menu['outlet']['logo_thumbnails']),
+        'sections': sections,
+    }
+    return render_to_string('qr/public_menu.html', context)
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write(path, content):
+    # Readers always see a complete file: write beside it, then rename over it
+    directory = os.path.dirname(path)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _write_compressed(path, content):
+    # Compressed copies first, so a server preferring them never pairs a new one with an old original
+    _write(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(path + '.br', brotli.compress(content))
+    _write(path, content)
+
+
+def _prune(directory, keep):
+    versions = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.startswith('menu.') and entry.name.endswith('.json')
+         and entry.name != 'menu.json'),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in versions[keep:]:
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.unlink(entry.path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def unpublish_outlet(outlet_id):
+    shutil.rmtree(get_outlet_directory(outlet_id), ignore_errors=True)
+
+
+def publish_outlet(outlet_id):
+    """
+    Publish an outlet's public menu; returns the version, or ``None`` if the outlet no longer exists.
+
+    Publishing an unchanged menu rewrites nothing.
+    """
+    outlet = Outlet.objects.filter(id=outlet_id).first()
+    if outlet is None:
+        unpublish_outlet(outlet_id)
+        return None
+
+    menu = build_menu(outlet)
+    content = JSONRenderer().render(menu)
+    version = hashlib.sha256(content).hexdigest()[:16]
+
+    directory = get_outlet_directory(outlet_id)
+    os.makedirs(directory, exist_ok=True)
+    versioned = os.path.join(directory, f'menu.{version}.json')
+    if os.path.exists(versioned) and _read(os.path.join(directory, 'menu.json')) == content:
+        return version
+
+    _write_compressed(versioned, content)
+    _write_compressed(os.path.join(directory, 'menu.json'), content)
+    _write_compressed(os.path.join(directory, 'index.html'), render_page(menu).encode())
+    _prune(directory, getattr(settings, 'QR_MENU_KEEP_VERSIONS', 3))
+    return version
+
+
+def _publish_outlets(outlet_ids):
+    for outlet_id in outlet_ids:
+        publish_outlet(outlet_id)
+
+
+_queue = CoalescingQueue(
+    'qr-menu-publisher', _publish_outlets, lambda: getattr(settings, 'QR_MENU_PUBLISH_IN_BACKGROUND', True)
+)
+
+
+def schedule_publish(outlet_ids):
+    """Republish ``outlet_ids`` once the current transaction commits, if publishing is enabled."""
+    if getattr(settings, 'QR_MENU_PUBLISH', True):
+        _queue.schedule(outlet_ids)
@@ -9,6 +9,7 @@ from v1.models import (
     OrderItem
     
 )
+from v1.images import ImageDerivativesField
 
 
 
@@ -25,55 +26,30 @@ from v1.models import (
 class ProductVariantSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductVariant
-        fields = ('id', 'name', 'extra_description', 'price', 'is_gst_inclusive', 'variant_image')
-
-    def to_representation(self, instance):
-        """Adjust the variant price based on GST inclusion."""
-        data = super().to_representation(instance)
-        
-        # Check if GST is inclusive and adjust the price accordingly
-        if instance.is_gst_inclusive:
-            gst_amount = instance.price * (instance.product.gst_percentage / 100)
-            data['price_with_gst'] = instance.price  # Price already includes GST
-        else:
-            gst_amount = instance.price * (instance.product.gst_percentage / 100)
-            data['price_with_gst'] = instance.price + gst_amount  # Add GST to price
-        
-        return data
+        fields = ('id', 'name', 'extra_description', 'price', 'is_gst_inclusive', 'price_with_gst')
 
 
 class ProductSerializer(serializers.ModelSerializer):
-    variants = ProductVariantSerializer(many=True, source='variants', read_only=True)  # Nested serializer for variants
+    variants = ProductVariantSerializer(many=True, read_only=True)  # Nested serializer for variants, prefetch 'variants'
+    image = serializers.SerializerMethodField()
+    image_thumbnails = ImageDerivativesField(source='image')
 
     class Meta:
         model = Product
-        fields = ('id', 'name', 'category', 'outlet', 'price', 'image', 'description', 'gst_percentage', 'is_gst_inclusive', 'variants')
-
-    def to_representation(self, instance):
-        """Adjust the product price based on GST inclusion."""
-        data = super().to_representation(instance)
-
-        # Access request object from context
-        request = self.context.get('request')
-
-        # Check if GST is inclusive and adjust the price accordingly
-        if instance.is_gst_inclusive:
-            gst_amount = instance.price * (instance.gst_percentage / 100)
-            data['price_with_gst'] = instance.price  # Price already includes GST
-        else:
-            gst_amount = instance.price * (instance.gst_percentage / 100)
-            data['price_with_gst'] = instance.price + gst_amount  # Add GST to price
-        
-        # Update the product image URL
-        if instance.image:
-            data['image'] = request.build_absolute_uri(instance.image.url)
-        
-        # Update variant image URLs
-        for variant in data.get('variants', []):
-            if variant.get('variant_image'):
-                variant['variant_image'] = request.build_absolute_uri(variant['variant_image'])
+        fields = ('id', 'name', 'category', 'outlet', 'price', 'image', 'description', 'gst_percentage', 'is_gst_inclusive', 'variants', 'price_with_gst', 'image_thumbnails')
+
+    def get_image(self, instance):
+        """Absolute image URL; price_with_gst is precomputed on the model."""
+        if not instance.image:
+            return None
 
-        return data
+        # Resolve the scheme and host once per response rather than once per image
+        if 'base_url' not in self.context:
+            request = self.context.get('request')
+            self.context['base_url'] = request.build_absolute_uri('/')[:-1] if request else ''
+
+        url = instance.image.url
+        return self.context['base_url'] + url if url.startswith('/') else url
 
 
 
@@ -82,9 +58,15 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    # Plain ids: v1.catalog.fetch_price_entries looks up every line of the order in one go,
+    # rather than a related field querying per line
+    product = serializers.IntegerField(source='product_id', min_value=1, required=False, allow_null=True)
+    product_variant = serializers.IntegerField(source='product_variant_id', min_value=1, required=False, allow_null=True)
+
     class Meta:
         model = OrderItem
         fields = ['product', 'product_variant', 'quantity', 'price', 'total_price', 'gst']  # Include price, total_price, and gst if needed
+        read_only_fields = ['price', 'total_price', 'gst']  # Priced on the server by v1.pricing
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)  # List of order items
@@ -93,6 +75,7 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['order_number', 'order_date', 'total_price', 'gst', 'items', 'mode', 'outlet']  # Include outlet field
+        read_only_fields = ['order_number', 'total_price', 'gst']  # Computed on the server
 
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from v1.models import Outlet
+from v1.signals import catalog_updated
+
+from .publish import schedule_publish
+
+
+@receiver(catalog_updated)
+def catalog_updated_handler(sender, outlet_id, **kwargs):
+    schedule_publish([outlet_id])
+
+
+@receiver([post_save, post_delete], sender=Outlet)
+def outlet_changed(sender, instance, **kwargs):
+    # The published page shows the outlet's name, address and logo
+    schedule_publish([instance.id])
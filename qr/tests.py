@@ -1,3 +1,161 @@
-from django.test import TestCase
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from v1.models import Category, Company, ImageDerivative, Outlet, Product, ProductVariant
 
 # Create your tests here.
+
+
+class ProductListQueryCountTests(TestCase):
+    url = '/v1/qr/api/get-products/'
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet = Outlet.objects.create(
+            company=company, logo='logos/outlet.png', gst_number='GST', outlet_name='Outlet', address='Address'
+        )
+        cls.category = Category.objects.create(outlet=cls.outlet, name='Mains')
+        cls.add_products(3)
+
+    @classmethod
+    def add_products(cls, count):
+        for index in range(count):
+            product = Product.objects.create(
+                outlet=cls.outlet,
+                category=cls.category,
+                name=f'Product {index}',
+                price=Decimal('100.00'),
+                gst_percentage=Decimal('5'),
+                image='product_images/product.png',
+            )
+            ProductVariant.objects.create(product=product, name='Regular', price=Decimal('100.00'))
+            ProductVariant.objects.create(product=product, name='Large', price=Decimal('150.00'))
+
+    def test_query_count_does_not_grow_with_the_catalog(self):
+        # One query for products, one for all their variants and one for all their thumbnails
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()['products']), 3)
+
+        self.add_products(10)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()['products']), 13)
+
+    def test_prices_and_image_urls(self):
+        product = self.client.get(self.url).json()['products'][0]
+
+        self.assertEqual(product['image'], 'http://testserver/media/product_images/product.png')
+        self.assertEqual(product['price_with_gst'], '105.00')
+        self.assertEqual([variant['price_with_gst'] for variant in product['variants']], ['105.00', '157.50'])
+
+    def test_thumbnail_urls(self):
+        self.assertIsNone(self.client.get(self.url).json()['products'][0]['image_thumbnails'])
+
+        ImageDerivative.objects.create(source='product_images/product.png', digest='0123456789abcdef')
+        thumbnails = self.client.get(self.url).json()['products'][0]['image_thumbnails']
+        self.assertEqual(thumbnails['small'], {
+            'webp': 'http://testserver/media/derivatives/0123456789abcdef-small.webp',
+            'jpeg': 'http://testserver/media/derivatives/0123456789abcdef-small.jpg',
+        })
+
+
+@override_settings(QR_MENU_PUBLISH=False)
+class PlaceOrderQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet = Outlet.objects.create(
+            company=company, logo='logos/outlet.png', gst_number='GST', outlet_name='Outlet', address='Address'
+        )
+        category = Category.objects.create(outlet=cls.outlet, name='Mains')
+        cls.products = [
+            Product.objects.create(outlet=cls.outlet, category=category, name=f'Product {index}', price=Decimal('100.00'), gst_percentage=Decimal('5'))
+            for index in range(3)
+        ]
+        cls.variants = [ProductVariant.objects.create(product=product, name='Large', price=Decimal('150.00')) for product in cls.products]
+
+    def place(self, items):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                f'/v1/qr/api/{self.outlet.id}/place-order/',
+                {'customer': {'name': 'Asha', 'phone': '9800000000'}, 'items': items, 'mode': 'cash'},
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_the_lines(self):
+        # The first order also reserves a block of order numbers and adds the customer
+        self.place([{'product': self.products[0].id, 'quantity': 1}])
+        two_lines = self.place([{'product': self.products[0].id, 'quantity': 1}, {'product_variant': self.variants[0].id, 'quantity': 1}])
+        six_lines = self.place(
+            [{'product': product.id, 'quantity': 1} for product in self.products]
+            + [{'product_variant': variant.id, 'quantity': 2} for variant in self.variants]
+        )
+        self.assertEqual(six_lines, two_lines)
+
+    def test_unknown_ids_are_refused(self):
+        response = self.client.post(
+            f'/v1/qr/api/{self.outlet.id}/place-order/', {'items': [{'product': 0, 'quantity': 1}]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            f'/v1/qr/api/{self.outlet.id}/place-order/', {'items': [{'product_variant': 999, 'quantity': 1}]}, content_type='application/json'
+        )
+        self.assertEqual(response.json()['detail'], 'Product variant not found')
+
+
+@override_settings(QR_MENU_PUBLISH=False)
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Search documents are written once the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.create_catalog()
+
+    @classmethod
+    def create_catalog(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet, other = [
+            Outlet.objects.create(company=company, logo='logos/outlet.png', gst_number='GST', outlet_name=name, address='Address')
+            for name in ('Outlet', 'Other')
+        ]
+        mains = Category.objects.create(outlet=cls.outlet, name='Mains')
+        drinks = Category.objects.create(outlet=cls.outlet, name='Drinks')
+        for outlet, category, name in [
+            (cls.outlet, mains, 'Chicken Biryani'),
+            (cls.outlet, mains, 'Paneer Tikka'),
+            (cls.outlet, drinks, 'Masala Chai'),
+            (other, Category.objects.create(outlet=other, name='Mains'), 'Chicken Roll'),
+        ]:
+            Product.objects.create(outlet=outlet, category=category, name=name, price=Decimal('100.00'), gst_percentage=Decimal('5'))
+        ProductVariant.objects.create(product=Product.objects.get(name='Paneer Tikka'), name='Jumbo', price=Decimal('150.00'))
+
+    def search(self, query):
+        response = self.client.get(f'/v1/qr/api/{self.outlet.id}/search-products/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.json()['products']]
+
+    def test_prefix_category_and_variant_matches(self):
+        self.assertEqual(self.search('chick'), ['Chicken Biryani'])
+        self.assertEqual(self.search('drin'), ['Masala Chai'])
+        self.assertEqual(self.search('jumbo'), ['Paneer Tikka'])
+
+    def test_typos_are_tolerated(self):
+        self.assertEqual(self.search('biryni'), ['Chicken Biryani'])
+        self.assertEqual(self.search('chikcen'), ['Chicken Biryani'])
+
+    def test_documents_follow_catalog_changes(self):
+        Category.objects.filter(name='Drinks').get().delete()
+        self.assertEqual(self.search('chai'), [])
+
+        category = Category.objects.get(outlet=self.outlet, name='Mains')
+        category.name = 'Specials'
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        self.assertEqual(self.search('special'), ['Chicken Biryani', 'Paneer Tikka'])
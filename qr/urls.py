@@ -2,11 +2,15 @@ from django.urls import path
 from .views import (
     category_list,
     product_list,
+    product_search,
     place_order
 )
+from . import async_views
 
 urlpatterns = [
-    path('get-categories/', category_list, name='category-list'),
+    path('<int:outlet_id>/get-categories/', category_list, name='category-list'),
     path('get-products/', product_list, name='product_list'),
-    path('place-order/', place_order, name='place_order'),
+    path('<int:outlet_id>/search-products/', product_search, name='product_search'),
+    path('<int:outlet_id>/place-order/', place_order, name='place_order'),
+    path('async/<int:outlet_id>/place-order/', async_views.place_order, name='async_place_order'),
 ]
\ No newline at end of file
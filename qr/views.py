@@ -1,19 +1,22 @@
 from django.shortcuts import render
 
-import random
-import string
-
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.pagination import PageNumberPagination
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from django.shortcuts import get_object_or_404
 
+from v1.active_menus import get_active_menu_index, requested_moment
+from v1.conditional import catalog_validators, conditional
+from v1.idempotency import idempotent
+from v1.pricing import OrderError
+from v1.search import parse_limit, search_products
 from v1.models import (
     Outlet,
     Category,
@@ -30,11 +33,22 @@ from .serializers import (
     OrderItemSerializer,
     OrderSerializer
 )
+from .orders import submit_order
 
 
 
 # Create your views here.
 
+def get_outlet_filter(request):
+    outlet_id = request.query_params.get('outlet_id')
+    return int(outlet_id) if outlet_id and outlet_id.isdigit() else None
+
+
+def product_list_validators(request):
+    # Only an outlet's catalog has a cheap version to compare against
+    return catalog_validators(request, get_outlet_filter(request))
+
+
 @swagger_auto_schema(
     method='get',
     operation_description="Fetch categories for a specific outlet.",
@@ -50,11 +64,13 @@ from .serializers import (
                 }
             }
         ),
+        304: "Not modified since the version in If-None-Match / If-Modified-Since.",
         404: "Outlet not found."
     }
 )
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional(catalog_validators)
 def category_list(request,outlet_id):
     try:
         # Check if the outlet exists
@@ -86,7 +102,17 @@ def category_list(request,outlet_id):
 @api_view(['GET'])
 @swagger_auto_schema(
     operation_summary="List all products",
-    operation_description="Retrieve a list of all products with their details and associated variants. Optionally filter by category name using case-insensitive containment.",
+    operation_description="Retrieve a list of all products with their details and associated variants. Optionally filter by outlet, and by category name using case-insensitive containment. Responses for an outlet carry an ETag and Last-Modified for conditional requests.",
+    manual_parameters=[
+        openapi.Parameter('outlet_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False,
+                          description='Only products of this outlet'),
+        openapi.Parameter('category_name', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                          description='Case-insensitive category name filter'),
+        openapi.Parameter('active', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, required=False,
+                          description='If true, only products on a menu of the outlet active now (requires outlet_id)'),
+        openapi.Parameter('at', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                          description='ISO 8601 datetime; only products on a menu active at that moment (requires outlet_id)'),
+    ],
     responses={
         200: openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -100,19 +126,42 @@ def category_list(request,outlet_id):
                     items=openapi.Items(type=openapi.TYPE_OBJECT, properties=ProductSerializer().get_fields())
                 ),
             },
-        )
+        ),
+        304: "Not modified since the version in If-None-Match / If-Modified-Since.",
+        400: "Invalid 'at' datetime, or active filtering without outlet_id."
     }
 )
 @permission_classes([AllowAny])
+@conditional(product_list_validators)
 def product_list(request):
     try:
+        outlet_id = get_outlet_filter(request)
         category_name = request.query_params.get('category_name', None)
-        products = Product.objects.all()
+
+        # Variants of every product are loaded with one extra query
+        products = Product.objects.prefetch_related('variants')
+
+        if outlet_id is not None:
+            products = products.filter(outlet_id=outlet_id)
 
         # Apply category filter if present
         if category_name:
             products = products.filter(category__name__icontains=category_name)
 
+        # Keep only products on a menu active at the requested moment, if any
+        try:
+            moment = requested_moment(request)
+        except ValueError as e:
+            return Response({'error': True, 'detail': str(e), 'products': []}, status=400)
+        if moment is not None:
+            if outlet_id is None:
+                return Response({
+                    'error': True,
+                    'detail': 'outlet_id is required to filter by active menus.',
+                    'products': []
+                }, status=400)
+            products = products.filter(id__in=get_active_menu_index(outlet_id).products_at(moment))
+
         # Serialize the products without pagination
         serializer = ProductSerializer(products, many=True, context={'request': request})
 
@@ -140,16 +189,67 @@ def product_list(request):
 
 
 
-def generate_order_number(length=12):
-    """Generate a random order number with uppercase letters and digits."""
-    characters = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(characters) for _ in range(length))
+@api_view(['GET'])
+@swagger_auto_schema(
+    operation_summary="Search products",
+    operation_description="Search an outlet's products by name, description, category and variant names. Every word matches as a prefix, close misspellings are tolerated, and the best matches come first.",
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                          description='Words to search for'),
+        openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False,
+                          description='Maximum number of results (default 20, at most 100)'),
+    ],
+    responses={
+        200: openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'error': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Indicates if there was an error'),
+                'detail': openapi.Schema(type=openapi.TYPE_STRING, description='Detailed error message'),
+                'products': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Items(type=openapi.TYPE_OBJECT, properties=ProductSerializer().get_fields())
+                ),
+            },
+        ),
+        400: "Missing search query."
+    }
+)
+@permission_classes([AllowAny])
+def product_search(request, outlet_id):
+    try:
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': True, 'detail': "Query parameter 'q' is required.", 'products': []}, status=400)
+
+        # Ranked ids come from the search index; variants are loaded with one extra query
+        products = search_products(
+            outlet_id,
+            query,
+            parse_limit(request.query_params.get('limit')),
+            queryset=Product.objects.prefetch_related('variants'),
+        )
+        serializer = ProductSerializer(products, many=True, context={'request': request})
+
+        return Response({
+            'error': False,
+            'detail': 'Products retrieved successfully',
+            'products': serializer.data
+        }, status=200)
+    except Exception as e:
+        return Response({'error': True, 'detail': str(e), 'products': []}, status=500)
+
+
+
+
+
+
+
+
+
 
 # {
 #     "order_date": "2024-09-18T12:00:00Z",
-#     "total_price": "150.00",
-#     "gst": "18.00",
-#     "status": "PENDING",
+#     "mode": "upi",
 #     "address": "123 Main St, Anytown, AT 12345",
 #     "customer": {
 #         "name": "John Doe",
@@ -173,8 +273,12 @@ def generate_order_number(length=12):
 @api_view(['POST'])
 @swagger_auto_schema(
     operation_summary="Place an order",
-    operation_description="Create a new order with the provided details and items. Order number is generated randomly.",
+    operation_description="Create a new order with the provided details and items. Order number is the next number in the outlet's sequence.",
     request_body=OrderSerializer,
+    manual_parameters=[
+        openapi.Parameter('Idempotency-Key', openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False,
+                          description='Optional client-generated key; retries with the same key return the original response')
+    ],
     responses={
         201: OrderSerializer,
         400: openapi.Response('Bad Request', openapi.Schema(type=openapi.TYPE_OBJECT, properties={
@@ -184,124 +288,24 @@ def generate_order_number(length=12):
     }
 )
 @permission_classes([AllowAny])
+@idempotent
 def place_order(request, outlet_id):
     # Fetch the outlet from the URL parameter
     outlet = get_object_or_404(Outlet, id=outlet_id)
 
-    # Add the outlet to the request data for the serializer
-    request.data['outlet'] = outlet.id
-
-    # Initialize the serializer with the data and validate
-    serializer = OrderSerializer(data=request.data)
-
-    if serializer.is_valid():
-        order_data = serializer.validated_data
-        order_data['order_number'] = generate_order_number()
-
-        # Remove items from order_data, as they should be handled separately
-        items_data = request.data.get('items', [])
-        
-        # Handle the creation of the order
-        order = Order.objects.create(
-            order_number=order_data['order_number'],
-            order_date=order_data['order_date'],
-            mode=order_data['mode'],
-            total_price=order_data['total_price'],
-            gst=order_data['gst'],
-            outlet=outlet  # Associate the outlet with the order
-        )
-
-        # Extract customer data and create a Customer associated with the created order
-        customer_data = request.data.get('customer', {})
-        customer = Customer.objects.create(
-            name=customer_data.get('name'),
-            phone_number=customer_data.get('phone'),
-            order=order  # Associate the customer with the created order
-        )
-
-        # Process the order items
-        items_list = []  # To store item details for the response
-        for item_data in items_data:
-            product = None
-            product_variant = None
-            price = 0.0
-            gst_percent = 0.0
-            total_price = 0.0
-            gst_amount = 0.0
-            product_name = None
-            product_variant_name = None
-
-            # Fetch product or product variant
-            if 'product' in item_data:
-                product = get_object_or_404(Product, id=item_data['product'])
-                price = product.price
-                gst_percent = product.gst_percentage
-                product_name = product.name  # Get the product name
-                
-                # If GST is not inclusive, calculate the price including GST
-                if not product.is_gst_inclusive:
-                    gst_amount = (gst_percent / 100) * price
-                    total_price = price + gst_amount  # Add GST to price
-                else:
-                    total_price = price  # Price already includes GST
-
-            elif 'product_variant' in item_data:
-                product_variant = get_object_or_404(ProductVariant, id=item_data['product_variant'])
-                product = product_variant.product
-                price = product_variant.price
-                gst_percent = product.gst_percentage
-                product_variant_name = product_variant.name  # Get the product variant name
-                
-                # If GST is not inclusive, calculate the price including GST
-                if not product_variant.is_gst_inclusive:
-                    gst_amount = (gst_percent / 100) * price
-                    total_price = price + gst_amount  # Add GST to price
-                else:
-                    total_price = price  # Price already includes GST
-
-            # Calculate total price for the quantity and GST for the item
-            quantity = item_data['quantity']
-            total_price = total_price * quantity
-            gst_amount = (gst_percent / 100) * total_price if not product.is_gst_inclusive else 0
-
-            # Create the order item associated with the order
-            order_item = OrderItem.objects.create(
-                order=order,
-                product=product,
-                product_variant=product_variant,
-                quantity=quantity,
-                price=price,
-                total_price=total_price,
-                gst=gst_amount
-            )
-
-            # Append item details for the response
-            items_list.append({
-                'product_name': product_name,
-                'product_variant_name': product_variant_name,
-                'quantity': item_data['quantity'],
-                'price': price,
-                'total_price': total_price,
-                'gst': gst_amount,
-            })
-
-        # Serialize the entire order including customer and items
-        order_details = {
-            'error': False,
-            'detail': 'Order placed successfully',
-            'order_number': order.order_number,
-            'customer': {
-                'name': customer.name,
-                'phone_number': customer.phone_number
-            },
-            'items': items_list
-        }
-
-        return Response(order_details, status=status.HTTP_201_CREATED)
+    try:
+        order_details = submit_order(outlet, request.data)
+    except ValidationError as e:
+        # Return detailed validation errors if the serializer is invalid
+        return Response({
+            'error': True,
+            'detail': 'Validation failed',
+            'errors': e.detail
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except OrderError as e:
+        return Response({
+            'error': True,
+            'detail': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    # Return detailed validation errors if the serializer is invalid
-    return Response({
-        'error': True,
-        'detail': 'Validation failed',
-        'errors': serializer.errors
-    }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    return Response(order_details, status=status.HTTP_201_CREATED)
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Which menus, and so which products, an outlet can sell at a given moment.
+
+A menu is active while it is enabled, the local date lies within
+``start_date``..``end_date`` and the local time within
+``open_time``..``close_time`` (a window whose close is before its open runs
+past midnight; missing bounds are open-ended). Date and time are checked
+independently, in the ``TIME_ZONE`` of the deployment.
+
+``ActiveMenuIndex`` precomputes the answer: the bounds of all windows cut
+the calendar into date segments and the day into time segments, each
+holding a bitmask of the menus active throughout it. A lookup is two
+bisections and an AND, and the product set of each distinct combination of
+menus is built once. Indexes are cached per outlet and catalog version.
+"""
+from bisect import bisect_right
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .catalog import cached_catalog
+from .menus import attach_product_ids
+from .models import Menu
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _open_on(menu, day):
+    return (menu.start_date is None or menu.start_date.toordinal() <= day) and \
+        (menu.end_date is None or day <= menu.end_date.toordinal())
+
+
+def _open_at(menu, second):
+    open_at = _seconds(menu.open_time) if menu.open_time is not None else None
+    close_at = _seconds(menu.close_time) if menu.close_time is not None else None
+    if open_at is None and close_at is None:
+        return True
+    if open_at is None:
+        return second < close_at
+    if close_at is None:
+        return second >= open_at
+    if open_at < close_at:
+        return open_at <= second < close_at
+    if open_at > close_at:
+        # Runs past midnight
+        return second >= open_at or second < close_at
+    return True
+
+
+class ActiveMenuIndex:
+    def __init__(self, menus):
+        """``menus`` are ``Menu`` instances carrying a ``product_ids`` list."""
+        menus = [menu for menu in menus if menu.is_enabled]
+        self.menu_ids = [menu.id for menu in menus]
+        self.product_ids = [frozenset(menu.product_ids) for menu in menus]
+
+        days = set()
+        for menu in menus:
+            if menu.start_date is not None:
+                days.add(menu.start_date.toordinal())
+            if menu.end_date is not None:
+                days.add(menu.end_date.toordinal() + 1)
+        self.day_bounds = sorted(days)
+
+        seconds = set()
+        for menu in menus:
+            for bound in (menu.open_time, menu.close_time):
+                if bound is not None:
+                    seconds.add(_seconds(bound))
+        self.second_bounds = sorted(seconds)
+
+        # Segment k starts at bounds[k - 1]; segment 0 is everything before bounds[0]
+        day_points = [self.day_bounds[0] - 1 if self.day_bounds else 0, *self.day_bounds]
+        second_points = [0, *self.second_bounds]
+        self.day_masks = [self._mask(menus, lambda menu: _open_on(menu, day)) for day in day_points]
+        self.second_masks = [self._mask(menus, lambda menu: _open_at(menu, second)) for second in second_points]
+
+        self._products = {}
+
+    @staticmethod
+    def _mask(menus, is_open):
+        mask = 0
+        for bit, menu in enumerate(menus):
+            if is_open(menu):
+                mask |= 1 << bit
+        return mask
+
+    def segment(self, moment):
+        """Return ``(day_segment, time_segment)`` of a moment; equal segments mean equal answers."""
+        local = timezone.localtime(moment)
+        return (
+            bisect_right(self.day_bounds, local.date().toordinal()),
+            bisect_right(self.second_bounds, _seconds(local.time())),
+        )
+
+    def _active_mask(self, moment):
+        day_segment, time_segment = self.segment(moment)
+        return self.day_masks[day_segment] & self.second_masks[time_segment]
+
+    def menus_at(self, moment):
+        mask = self._active_mask(moment)
+        return frozenset(menu_id for bit, menu_id in enumerate(self.menu_ids) if mask >> bit & 1)
+
+    def products_at(self, moment):
+        """Ids of the products orderable at ``moment``."""
+        mask = self._active_mask(moment)
+        products = self._products.get(mask)
+        if products is None:
+            products = frozenset().union(*(ids for bit, ids in enumerate(self.product_ids) if mask >> bit & 1))
+            self._products[mask] = products
+        return products
+
+
+def build_index(outlet_id):
+    return ActiveMenuIndex(attach_product_ids(Menu.objects.filter(outlet_id=outlet_id).order_by('id')))
+
+
+def get_active_menu_index(outlet_id):
+    return cached_catalog(outlet_id, 'active-menus', lambda: build_index(outlet_id))
+
+
+def requested_moment(request):
+    """
+    Return the moment a request asks the catalog to be filtered at, or ``None``.
+
+    ``?at=<ISO 8601 datetime>`` picks a moment (naive values are local time);
+    ``?active=true`` means now. Raises ``ValueError`` for an unreadable ``at``.
+    """
+    at = request.query_params.get('at')
+    if at:
+        try:
+            moment = parse_datetime(at)
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise ValueError("'at' must be an ISO 8601 datetime.")
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+    if request.query_params.get('active', '').lower() in ('1', 'true', 'yes'):
+        return timezone.now()
+    return None
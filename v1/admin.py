@@ -175,8 +175,9 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('order_number', 'order_date', 'total_price', 'gst', 'status')
-    search_fields = ('order_number',)
+    list_display = ('order_number', 'order_date', 'total_price', 'gst', 'status', 'customer')
+    search_fields = ('order_number', 'customer__normalized_phone')
+    raw_id_fields = ('customer',)
     list_filter = ('status', 'order_date')
     ordering = ('-order_date',)
 
@@ -191,9 +192,8 @@ class OrderItemAdmin(admin.ModelAdmin):
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display = ('name', 'phone_number', 'order')
-    search_fields = ('name', 'phone_number', 'order__order_number')
-    list_filter = ('order',)
+    list_display = ('name', 'phone_number', 'normalized_phone')
+    search_fields = ('name', 'phone_number', 'normalized_phone', 'orders__order_number')
     ordering = ('name',)
 
 
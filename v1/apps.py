@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class V1Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'v1'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,49 @@
+"""
+Helpers for native async views served under ASGI.
+
+DRF's ``@api_view`` only wraps sync functions, so the async endpoints are plain
+Django coroutine views. ``api_response`` encodes bodies with DRF's renderer so
+they match the ``@api_view`` responses. See "ASGI deployment" in the README.
+"""
+import functools
+import json
+
+from django.http import HttpResponse
+
+from rest_framework.renderers import JSONRenderer
+
+
+def async_api_view(methods):
+    """
+    Restrict an async view to ``methods`` and exempt it from CSRF checks.
+
+    Django 4.2's ``csrf_exempt`` and ``require_http_methods`` return sync
+    wrappers, which would turn the coroutine view back into a sync one.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return api_response({
+                    "error": True,
+                    "details": f'Method "{request.method}" not allowed.'
+                }, status=405)
+            return await view(request, *args, **kwargs)
+
+        # These endpoints are AllowAny like their @api_view counterparts, which DRF exempts from CSRF
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+def api_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def parse_json_body(request):
+    """Return the decoded JSON body, or ``None`` when it is not valid JSON."""
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
@@ -0,0 +1,96 @@
+"""
+Deferred, coalesced work that runs after the current transaction commits.
+
+Catalog edits arrive in bursts (an import saves hundreds of rows), while the
+work they trigger, such as recompiling a menu, only needs to run once per
+burst. A ``CoalescingQueue`` collects the keys a thread schedules during a
+transaction and hands them over together when it commits, and a single
+background worker handles all keys queued so far each time it wakes, so a
+key scheduled again before its turn is handled once. Keys scheduled in a
+transaction that rolls back are handed over with the next commit of the
+thread instead, which costs some needless work but never loses a key.
+
+Slow, independent work (such as resizing images) can use a pool of workers
+instead, each job taking one key; a key scheduled again while it is being
+handled may then be handled twice at once, so the handler must tolerate it.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+
+
+class CoalescingQueue:
+    def __init__(self, name, handle, in_background, workers=1):
+        """
+        ``handle(keys)`` receives a sorted list of keys. ``in_background()``
+        says whether to use the worker threads; when false, keys are handled
+        inline once the transaction commits.
+        """
+        self.name = name
+        self.handle = handle
+        self.in_background = in_background
+        self.workers = workers
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        # Keys this thread scheduled that no commit has handed over yet
+        self._local = threading.local()
+
+    def _run_pending(self, one=False):
+        with self._lock:
+            if one:
+                keys = [self._pending.pop()] if self._pending else []
+            else:
+                keys = sorted(self._pending)
+                self._pending.clear()
+        if keys:
+            self.handle(keys)
+
+    def _run_in_background(self):
+        # The worker thread keeps its own connection; drop it if it went stale
+        close_old_connections()
+        try:
+            # A pool shares the pending keys out; a single worker takes them all
+            self._run_pending(one=self.workers > 1)
+        finally:
+            close_old_connections()
+
+    def _submit(self, jobs):
+        with self._lock:
+            if self._executor is None:
+                # With one worker, the same key is never handled twice at once
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        for _ in range(jobs):
+            self._executor.submit(self._run_in_background)
+
+    def _enqueue(self):
+        keys = getattr(self._local, 'keys', None)
+        if not keys:
+            # An earlier callback of the same commit took them
+            return
+        self._local.keys = set()
+        with self._lock:
+            # Keys already waiting are handled by the job that is already queued
+            new = keys - self._pending
+            self._pending.update(keys)
+        if not new:
+            return
+        if self.in_background():
+            # Every new key gets a job of its own when there are several workers
+            self._submit(len(new) if self.workers > 1 else 1)
+        else:
+            self._run_pending()
+
+    def schedule(self, keys):
+        """Handle ``keys`` once the current transaction commits."""
+        keys = set(keys)
+        if not keys:
+            return
+
+        if getattr(self._local, 'keys', None) is None:
+            self._local.keys = set()
+        self._local.keys.update(keys)
+        # Every call registers a callback, so a rolled back savepoint cannot take the others' keys
+        # with it; the first to run after the commit hands them all over
+        transaction.on_commit(self._enqueue)
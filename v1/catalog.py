@@ -0,0 +1,149 @@
+"""
+Compact catalog lookups used by the order paths, and per-outlet catalog caching.
+
+A price table maps product and variant ids to ``PriceEntry`` rows holding the
+few values needed to price an order line, so order placement never loads full
+model instances.
+
+Everything cached about an outlet's catalog (the price table, serialized
+product lists) is keyed by the outlet's catalog version. The signal handlers
+in v1.signals bump the version whenever a category, product, variant or menu
+of the outlet changes, which retires every cached document at once. The bump
+waits for the change to commit: bumped earlier, a reader could rebuild a
+document from the old rows and cache it under the new version.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from .models import CatalogTombstone, Category, Menu, Outlet, Product, ProductVariant
+from .pricing import PriceEntry
+
+
+def get_cache_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 5)
+
+
+def catalog_version_key(outlet_id):
+    return f"catalog:version:{outlet_id}"
+
+
+def get_catalog_version(outlet_id):
+    key = catalog_version_key(outlet_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version evicted from the cache never comes back with an old value
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def cached_catalog(outlet_id, name, build):
+    """
+    Return the cached ``name`` document of an outlet, building it on a miss.
+
+    ``build`` is called without arguments and must return a picklable value.
+    """
+    key = f"catalog:{name}:{outlet_id}:{get_catalog_version(outlet_id)}"
+    document = cache.get(key)
+    if document is None:
+        document = build()
+        cache.set(key, document, get_cache_timeout())
+    return document
+
+
+def fetch_price_entries(product_ids=None, variant_ids=None, outlet_id=None):
+    """
+    Load price entries with one query per table.
+
+    Returns ``(products, variants)``, both mapping ids to ``PriceEntry``
+    rows. A variant's entry carries its product's id and GST rate.
+    """
+    products = Product.objects.all()
+    variants = ProductVariant.objects.all()
+    if outlet_id is not None:
+        products = products.filter(outlet_id=outlet_id)
+        variants = variants.filter(product__outlet_id=outlet_id)
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids) if product_ids else products.none()
+    if variant_ids is not None:
+        variants = variants.filter(id__in=variant_ids) if variant_ids else variants.none()
+
+    product_entries = {
+        product_id: PriceEntry(product_id, name, price, gst_percentage, is_gst_inclusive)
+        for product_id, name, price, gst_percentage, is_gst_inclusive
+        in products.values_list('id', 'name', 'price', 'gst_percentage', 'is_gst_inclusive')
+    }
+    variant_entries = {
+        variant_id: PriceEntry(product_id, name, price, gst_percentage, is_gst_inclusive)
+        for variant_id, product_id, name, price, gst_percentage, is_gst_inclusive
+        in variants.values_list('id', 'product_id', 'name', 'price', 'product__gst_percentage', 'is_gst_inclusive')
+    }
+    return product_entries, variant_entries
+
+
+def get_price_table(outlet_id):
+    """Return the cached ``(products, variants)`` price entries of an outlet."""
+    return cached_catalog(outlet_id, 'price-table', lambda: fetch_price_entries(outlet_id=outlet_id))
+
+
+def invalidate_outlet(outlet_id):
+    """Retire the outlet's cached catalog once the current transaction commits."""
+    key = catalog_version_key(outlet_id)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            # No version yet, so nothing cached under one either
+            pass
+
+    transaction.on_commit(bump)
+
+
+def _latest_and_count(queryset, outlet_field):
+    rows = queryset.filter(**{outlet_field: OuterRef('pk')}).order_by().values(outlet_field)
+    return (
+        Subquery(rows.annotate(latest=Max('updated_at')).values('latest')),
+        Subquery(rows.annotate(total=Count('pk')).values('total')),
+    )
+
+
+def catalog_state(outlet_id):
+    """
+    Return ``(state, last_modified)`` for an outlet's catalog, or ``None``.
+
+    One statement reads the newest ``updated_at`` and the row count of the
+    outlet's categories, products, variants and menus, each from an
+    ``(outlet, updated_at)``-style index, plus the newest deletion among
+    them. ``state`` changes whenever one of them is created, saved or
+    deleted, so it serves as an ETag source.
+    """
+    product_latest, product_count = _latest_and_count(Product.objects.all(), 'outlet')
+    variant_latest, variant_count = _latest_and_count(ProductVariant.objects.all(), 'product__outlet')
+    category_latest, category_count = _latest_and_count(Category.objects.all(), 'outlet')
+    menu_latest, menu_count = _latest_and_count(Menu.objects.all(), 'outlet')
+    tombstones = CatalogTombstone.objects.filter(outlet_id=OuterRef('pk')).order_by('-deleted_at')
+
+    state = Outlet.objects.filter(id=outlet_id).annotate(
+        product_latest=product_latest,
+        product_count=product_count,
+        variant_latest=variant_latest,
+        variant_count=variant_count,
+        category_latest=category_latest,
+        category_count=category_count,
+        menu_latest=menu_latest,
+        menu_count=menu_count,
+        deleted_latest=Subquery(tombstones.values('deleted_at')[:1]),
+    ).values_list(
+        'product_latest', 'product_count', 'variant_latest', 'variant_count', 'category_latest', 'category_count',
+        'menu_latest', 'menu_count', 'deleted_latest',
+    ).first()
+    if state is None:
+        return None
+
+    timestamps = [value for value in state[::2] if value is not None]
+    return state, max(timestamps) if timestamps else None
@@ -0,0 +1,77 @@
+"""
+Conditional GET support (ETag / Last-Modified) for read-only endpoints.
+
+``conditional`` asks a validators function for the current ETag and
+last-modified time before the view runs. A client that already holds that
+version gets ``304 Not Modified`` without the view serializing anything.
+"""
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .active_menus import get_active_menu_index, requested_moment
+from .catalog import catalog_state
+
+
+def make_etag(request, *parts):
+    # The query string is part of the tag so filtered and paginated responses never share one
+    digest = hashlib.md5(repr((request.get_full_path(), parts)).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def conditional(validators):
+    """
+    Decorator for GET views; place it below ``@permission_classes``.
+
+    ``validators(request, *args, **kwargs)`` returns ``(etag, last_modified)``
+    (``last_modified`` may be ``None``), or ``None`` to run the view without
+    validators, e.g. when the object does not exist.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            found = validators(request, *args, **kwargs)
+            if found is None:
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = found
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            # Clients may keep the body but must revalidate before using it
+            response['Cache-Control'] = 'no-cache'
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def catalog_validators(request, outlet_id=None, **kwargs):
+    """Validators for endpoints serving an outlet's categories, products and variants."""
+    found = catalog_state(outlet_id) if outlet_id is not None else None
+    if found is None:
+        return None
+    state, last_modified = found
+
+    try:
+        moment = requested_moment(request)
+    except ValueError:
+        # The view reports the bad parameter
+        return None
+    if moment is not None:
+        # Filtering by active menus changes as windows open and close, so the
+        # segment goes into the tag and there is no meaningful Last-Modified
+        state = (state, get_active_menu_index(outlet_id).segment(moment))
+        last_modified = None
+    return make_etag(request, state), last_modified
@@ -0,0 +1,113 @@
+"""
+Customer directory keyed by normalized phone number.
+
+A customer is identified by the digits of their phone number, so "98765 43210"
+and "+91 9876543210" are the same person. ``upsert_customers`` resolves the
+customers of any number of orders with a handful of queries, and a cache of
+``normalized phone -> (id, name)`` lets repeat customers skip the database.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Customer
+
+
+def normalize_phone(phone_number):
+    """Reduce a phone number to its national digits, or ``None`` if it has none."""
+    digits = re.sub(r'\D', '', phone_number or '')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits[:15] or None
+
+
+def get_cache_timeout():
+    return getattr(settings, 'CUSTOMER_CACHE_TIMEOUT', 60 * 60)
+
+
+def customer_cache_key(normalized_phone):
+    return f"customer:{normalized_phone}"
+
+
+def forget_customer(normalized_phone):
+    if normalized_phone:
+        cache.delete(customer_cache_key(normalized_phone))
+
+
+def upsert_customers(contacts):
+    """
+    Find or create the customers for ``(name, phone_number)`` pairs.
+
+    Returns a list of ``Customer`` instances in input order. Known phone
+    numbers are matched through the cache or one indexed query; new ones are
+    bulk-inserted. A customer's name is updated when a later order gives a
+    different one. Contacts without a phone number each get their own row.
+    """
+    contacts = [(name, phone_number, normalize_phone(phone_number)) for name, phone_number in contacts]
+    normalized_phones = {normalized for _, _, normalized in contacts if normalized}
+
+    customers = {}
+    cached = cache.get_many([customer_cache_key(normalized) for normalized in normalized_phones])
+    for normalized in normalized_phones:
+        entry = cached.get(customer_cache_key(normalized))
+        if entry:
+            customers[normalized] = Customer(id=entry[0], name=entry[1], normalized_phone=normalized)
+
+    missing = normalized_phones - customers.keys()
+    if missing:
+        for customer in Customer.objects.filter(normalized_phone__in=missing):
+            customers[customer.normalized_phone] = customer
+
+    # The latest name given for each phone number wins
+    latest = {}
+    for name, phone_number, normalized in contacts:
+        if normalized:
+            previous_name = latest[normalized][0] if normalized in latest else None
+            latest[normalized] = (name or previous_name, phone_number)
+
+    new = normalized_phones - customers.keys()
+    if new:
+        # ignore_conflicts lets concurrent orders for the same new customer both succeed
+        Customer.objects.bulk_create(
+            [Customer(name=latest[normalized][0] or '', phone_number=latest[normalized][1], normalized_phone=normalized)
+             for normalized in new],
+            ignore_conflicts=True,
+        )
+        for customer in Customer.objects.filter(normalized_phone__in=new):
+            customers[customer.normalized_phone] = customer
+
+    renamed = [
+        customer for normalized, customer in customers.items()
+        if latest[normalized][0] and customer.name != latest[normalized][0]
+    ]
+    for customer in renamed:
+        customer.name = latest[customer.normalized_phone][0]
+    if renamed:
+        Customer.objects.bulk_update(renamed, ['name'])
+
+    # Only cache rows that were actually committed
+    entries = {customer_cache_key(normalized): (customer.id, customer.name) for normalized, customer in customers.items()}
+    transaction.on_commit(lambda: cache.set_many(entries, get_cache_timeout()))
+
+    anonymous = [
+        Customer(name=name or '', phone_number=phone_number or '')
+        for name, phone_number, normalized in contacts if not normalized
+    ]
+    if anonymous:
+        Customer.objects.bulk_create(anonymous)
+
+    anonymous_customers = iter(anonymous)
+    return [
+        customers[normalized] if normalized else next(anonymous_customers)
+        for _, _, normalized in contacts
+    ]
+
+
+def upsert_customer(name, phone_number):
+    return upsert_customers([(name, phone_number)])[0]
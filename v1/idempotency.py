@@ -0,0 +1,158 @@
+"""
+Idempotency-Key handling for order submission endpoints.
+
+A client that retries a POST with the same ``Idempotency-Key`` header gets the
+stored response back instead of a second order. Keys live in the Django cache,
+so the cache backend enforces the TTL and evicts expired keys.
+"""
+import functools
+import hashlib
+import inspect
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+from rest_framework import status
+from rest_framework.response import Response
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Marker stored while the first request for a key is still running
+IN_FLIGHT = 'in-flight'
+
+
+def get_store():
+    return caches[getattr(settings, 'IDEMPOTENCY_CACHE_ALIAS', 'default')]
+
+
+def get_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+
+
+def make_cache_key(path, key):
+    # Keys are scoped to the endpoint so two views never share a stored response
+    digest = hashlib.sha256(f"{path}|{key}".encode()).hexdigest()
+    return f"idempotency:{digest}"
+
+
+def fingerprint(body):
+    return hashlib.sha256(body or b'').hexdigest()
+
+
+def idempotent(view):
+    """
+    Decorator for ``@api_view`` functions that create resources.
+
+    Requests without the header run as before. The first request for a key
+    claims it with an atomic ``cache.add``; replays of a finished request get
+    the stored response without touching the database. Async views are
+    handled by ``async_idempotent``.
+    """
+    if inspect.iscoroutinefunction(view):
+        return async_idempotent(view)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+
+        store = get_store()
+        ttl = get_ttl()
+        cache_key = make_cache_key(request.path, key)
+        request_fingerprint = fingerprint(request.body)
+
+        if not store.add(cache_key, IN_FLIGHT, ttl):
+            stored = store.get(cache_key)
+            if stored == IN_FLIGHT:
+                return Response({
+                    "error": True,
+                    "details": "A request with this Idempotency-Key is still being processed"
+                }, status=status.HTTP_409_CONFLICT)
+
+            if stored is not None:
+                stored_fingerprint, data, status_code = stored
+                if stored_fingerprint != request_fingerprint:
+                    return Response({
+                        "error": True,
+                        "details": "Idempotency-Key was already used with a different request body"
+                    }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+                response = Response(data, status=status_code)
+                response[REPLAYED_HEADER] = 'true'
+                return response
+
+            # The key expired between add() and get(); claim it again
+            store.add(cache_key, IN_FLIGHT, ttl)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            store.delete(cache_key)
+            raise
+
+        # Server errors are not stored so the client can retry them
+        if response.status_code >= 500:
+            store.delete(cache_key)
+        else:
+            store.set(cache_key, (request_fingerprint, response.data, response.status_code), ttl)
+        return response
+
+    return wrapper
+
+
+def async_idempotent(view):
+    """
+    Same contract as ``idempotent`` for async views returning ``JsonResponse``.
+
+    The rendered body is stored instead of ``response.data``.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return await view(request, *args, **kwargs)
+
+        store = get_store()
+        ttl = get_ttl()
+        cache_key = make_cache_key(request.path, key)
+        request_fingerprint = fingerprint(request.body)
+
+        if not await store.aadd(cache_key, IN_FLIGHT, ttl):
+            stored = await store.aget(cache_key)
+            if stored == IN_FLIGHT:
+                return JsonResponse({
+                    "error": True,
+                    "details": "A request with this Idempotency-Key is still being processed"
+                }, status=status.HTTP_409_CONFLICT)
+
+            if stored is not None:
+                stored_fingerprint, content, status_code = stored
+                if stored_fingerprint != request_fingerprint:
+                    return JsonResponse({
+                        "error": True,
+                        "details": "Idempotency-Key was already used with a different request body"
+                    }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+                response = HttpResponse(content, status=status_code, content_type='application/json')
+                response[REPLAYED_HEADER] = 'true'
+                return response
+
+            await store.aadd(cache_key, IN_FLIGHT, ttl)
+
+        try:
+            response = await view(request, *args, **kwargs)
+        except Exception:
+            await store.adelete(cache_key)
+            raise
+
+        if response.status_code >= 500:
+            await store.adelete(cache_key)
+        else:
+            await store.aset(cache_key, (request_fingerprint, response.content, response.status_code), ttl)
+        return response
+
+    return wrapper
@@ -0,0 +1,214 @@
+"""
+Thumbnails of uploaded images.
+
+Product images, outlet logos and employee photos arrive straight off a phone
+camera, often several megabytes, while menu grids show them a few hundred
+pixels wide. ``generate_derivatives`` scales an upload to fit inside each
+square of ``IMAGE_DERIVATIVE_SIZES`` (never enlarging it) and encodes every
+size as WebP and JPEG::
+
+    <MEDIA_ROOT>/derivatives/<digest>-<size>.webp
+    <MEDIA_ROOT>/derivatives/<digest>-<size>.jpg
+
+The digest hashes the upload's content, so the files never change and can be
+cached forever, and identical uploads share them. An ``ImageDerivative`` row
+records the digest of each upload; ``ImageDerivativesField`` turns it into
+URLs for serializers and is null until the thumbnails exist, so clients fall
+back to the original.
+
+v1.signals queues every saved upload for a pool of ``IMAGE_DERIVATIVE_WORKERS``
+background threads once the transaction commits;
+``generate_image_derivatives`` backfills existing media.
+"""
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.dispatch import Signal
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from .background import CoalescingQueue
+from .models import Employee, ImageDerivative, Outlet, Product
+
+
+logger = logging.getLogger(__name__)
+
+# Model image fields whose uploads get thumbnails
+IMAGE_FIELDS = (
+    (Product, 'image'),
+    (Outlet, 'logo'),
+    (Employee, 'profile_image'),
+)
+
+DERIVATIVE_DIRECTORY = 'derivatives'
+
+# Format key in the serialized URLs: (Pillow format, file extension)
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+# Sent with ``source``, the storage name of an upload, once its thumbnails exist
+derivatives_generated = Signal()
+
+
+def get_sizes():
+    """Size name to the side, in pixels, of the square each thumbnail fits in."""
+    return getattr(settings, 'IMAGE_DERIVATIVE_SIZES', {'small': 160, 'medium': 480})
+
+
+def derivative_name(digest, size, format):
+    return f"{DERIVATIVE_DIRECTORY}/{digest}-{size}.{FORMATS[format][1]}"
+
+
+def derivative_urls(digest, base_url=''):
+    """``{size: {format: url}}`` of the thumbnails named by ``digest``."""
+    urls = {}
+    for size in get_sizes():
+        urls[size] = {}
+        for format in FORMATS:
+            url = default_storage.url(derivative_name(digest, size, format))
+            urls[size][format] = base_url + url if url.startswith('/') else url
+    return urls
+
+
+def _normalize(image):
+    # Work in RGB, keeping transparency (palette and greyscale images included) as RGBA
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _encode(image, format):
+    quality = getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+    buffer = io.BytesIO()
+    if format == 'JPEG':
+        if image.mode == 'RGBA':
+            # JPEG has no transparency: lay the image over white
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, format, quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def _store(name, content):
+    # Names are content hashes: a file that exists already holds these bytes
+    if default_storage.exists(name):
+        return
+    saved = default_storage.save(name, ContentFile(content))
+    if saved != name:
+        # Another worker stored the same file meanwhile and the storage picked a new name
+        default_storage.delete(saved)
+
+
+def generate_derivatives(source, force=False):
+    """
+    Create the thumbnails of the upload stored as ``source``.
+
+    Returns its ``ImageDerivative``, or ``None`` if the file is missing or not
+    an image. Uploads with thumbnails already are skipped unless ``force``,
+    which also fills in sizes added since.
+    """
+    if not force:
+        derivative = ImageDerivative.objects.filter(source=source).first()
+        if derivative is not None:
+            return derivative
+
+    try:
+        with default_storage.open(source, 'rb') as file:
+            content = file.read()
+    except OSError:
+        logger.warning("Image %s not found, no thumbnails generated", source)
+        return None
+    digest = hashlib.sha256(content).hexdigest()[:16]
+
+    sizes = sorted(get_sizes().items(), key=lambda item: item[1], reverse=True)
+    try:
+        image = Image.open(io.BytesIO(content))
+        # JPEGs decode straight at a reduced scale, still no smaller than the largest thumbnail
+        image.draft('RGB', (sizes[0][1], sizes[0][1]))
+        image = _normalize(ImageOps.exif_transpose(image))
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        logger.warning("Image %s could not be read, no thumbnails generated: %s", source, e)
+        return None
+
+    # Largest first, each size scaled down from the one before
+    for size, side in sizes:
+        image.thumbnail((side, side), Image.LANCZOS)
+        for format, (pillow_format, _) in FORMATS.items():
+            _store(derivative_name(digest, size, format), _encode(image, pillow_format))
+
+    derivative, created = ImageDerivative.objects.get_or_create(source=source, defaults={'digest': digest})
+    if not created and derivative.digest != digest:
+        derivative.digest = digest
+        derivative.save(update_fields=['digest'])
+    derivatives_generated.send(sender=ImageDerivative, source=source)
+    return derivative
+
+
+def _generate(sources):
+    for source in sources:
+        generate_derivatives(source)
+
+
+_queue = CoalescingQueue(
+    'image-derivatives',
+    _generate,
+    lambda: getattr(settings, 'IMAGE_DERIVATIVES_IN_BACKGROUND', True),
+    # Pillow releases the GIL while decoding and resizing, so threads run in parallel
+    workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+)
+
+
+def schedule_derivatives(sources):
+    """Generate thumbnails of the uploads stored as ``sources`` once the current transaction commits."""
+    _queue.schedule(source for source in sources if source)
+
+
+def digests_of(sources):
+    """Map each of ``sources`` with thumbnails to their digest (one query)."""
+    return dict(ImageDerivative.objects.filter(source__in=set(sources)).values_list('source', 'digest'))
+
+
+class ImageDerivativesField(serializers.ReadOnlyField):
+    """
+    Thumbnail URLs of an image field, ``{size: {"webp": url, "jpeg": url}}``,
+    or null while there are none. URLs are absolute when the context has a
+    request. Serializing a list looks up the digests of all its images at once.
+    """
+
+    def _list_sources(self):
+        # The objects of a top-level ``many=True`` serializer, already loaded by the time fields render
+        parent = self.parent.parent if self.parent is not None else None
+        if not isinstance(parent, serializers.ListSerializer) or parent.instance is None:
+            return []
+        sources = []
+        for instance in parent.instance:
+            file = self.get_attribute(instance)
+            if file:
+                sources.append(file.name)
+        return sources
+
+    def to_representation(self, value):
+        if not value:
+            return None
+
+        digests = self.context.setdefault('image_digests', {})
+        if value.name not in digests:
+            sources = {value.name, *self._list_sources()} - digests.keys()
+            digests.update(dict.fromkeys(sources))
+            digests.update(digests_of(sources))
+        if digests[value.name] is None:
+            return None
+
+        if 'base_url' not in self.context:
+            request = self.context.get('request')
+            self.context['base_url'] = request.build_absolute_uri('/')[:-1] if request else ''
+        return derivative_urls(digests[value.name], self.context['base_url'])
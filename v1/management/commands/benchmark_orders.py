@@ -0,0 +1,393 @@
+"""
+Load benchmark for the order placement endpoints.
+
+Seeds a throwaway database with a realistic outlet catalog, drives the counter
+and QR place-order endpoints from concurrent clients through the full URL and
+middleware stack, and reports latency percentiles, throughput and SQL queries
+per order. Results can be saved as a baseline and later runs checked against
+it, e.g.::
+
+    python manage.py benchmark_orders --save-baseline
+    python manage.py benchmark_orders --check
+
+Latency and throughput only compare on the same machine and database; the
+query count per order is the portable number. In queued ingestion mode the
+counter endpoints write orders later, so each round is drained afterwards and
+the drain's queries are shared out over the orders it wrote. Every order sent
+is valid, so any failed order fails ``--check`` and cannot be saved as a
+baseline.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import AsyncClient, Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from v1 import pricing
+from v1.models import Category, Company, Order, Outlet, Product, ProductVariant
+
+
+ENDPOINTS = {
+    'counter': '/v1/counter/api/orders/{outlet_id}/place-order/',
+    'qr': '/v1/qr/api/{outlet_id}/place-order/',
+    'counter-async': '/v1/counter/api/async/orders/{outlet_id}/place-order/',
+    'qr-async': '/v1/qr/api/async/{outlet_id}/place-order/',
+}
+
+GST_RATES = [Decimal('5'), Decimal('5'), Decimal('5'), Decimal('12'), Decimal('18')]
+VARIANT_NAMES = ['Regular', 'Large', 'Family', 'Half', 'Full']
+
+
+def default_baseline_path():
+    return settings.BASE_DIR / 'benchmarks' / 'order_placement.json'
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def seed_catalog(rng, categories, products):
+    """Create one outlet with a menu shaped like a busy restaurant's."""
+    company = Company.objects.create(name='Benchmark Foods')
+    outlet = Outlet.objects.create(
+        company=company, logo='', gst_number='BENCHMARK', outlet_name='Benchmark Outlet', address='-'
+    )
+    category_objects = Category.objects.bulk_create([
+        Category(outlet=outlet, name=f'Category {index + 1}') for index in range(categories)
+    ])
+
+    product_objects = []
+    for index in range(products):
+        price = Decimal(rng.randrange(40, 400, 5))
+        gst_percentage = rng.choice(GST_RATES)
+        is_gst_inclusive = rng.random() < 0.5
+        product_objects.append(Product(
+            outlet=outlet,
+            category=rng.choice(category_objects),
+            name=f'Item {index + 1}',
+            price=price,
+            gst_percentage=gst_percentage,
+            is_gst_inclusive=is_gst_inclusive,
+            price_with_gst=pricing.price_with_gst(price, gst_percentage, is_gst_inclusive),
+        ))
+    product_objects = Product.objects.bulk_create(product_objects)
+
+    # About a third of the menu comes in sizes
+    variant_objects = []
+    for product in product_objects:
+        if rng.random() < 0.35:
+            for step, name in enumerate(rng.sample(VARIANT_NAMES, rng.randint(1, 3))):
+                price = product.price + 20 * step
+                variant_objects.append(ProductVariant(
+                    product=product,
+                    name=name,
+                    price=price,
+                    is_gst_inclusive=product.is_gst_inclusive,
+                    price_with_gst=pricing.price_with_gst(price, product.gst_percentage, product.is_gst_inclusive),
+                ))
+    variant_objects = ProductVariant.objects.bulk_create(variant_objects)
+
+    return outlet, [product.id for product in product_objects], [variant.id for variant in variant_objects]
+
+
+def build_bodies(rng, endpoint, count, product_ids, variant_ids, customers):
+    """Pre-generate order bodies so every run sends the same orders."""
+    phone_key = 'phone' if endpoint.startswith('qr') else 'phone_number'
+    bodies = []
+    for _ in range(count):
+        items = []
+        for _ in range(rng.randint(1, 6)):
+            if variant_ids and rng.random() < 0.3:
+                items.append({'product_variant': rng.choice(variant_ids), 'quantity': rng.randint(1, 3)})
+            else:
+                items.append({'product': rng.choice(product_ids), 'quantity': rng.randint(1, 3)})
+        customer = rng.randrange(customers)
+        bodies.append(json.dumps({
+            'customer': {'name': f'Customer {customer}', phone_key: f'98{customer:08d}'},
+            'items': items,
+            'mode': rng.choice(['cash', 'upi']),
+        }))
+    return bodies
+
+
+class Command(BaseCommand):
+    help = "Benchmark order placement at a given concurrency and optionally save or check a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=['counter', 'qr'],
+                            help="Endpoints to benchmark.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients per endpoint.")
+        parser.add_argument('--orders', type=int, default=400, help="Measured orders per endpoint.")
+        parser.add_argument('--warmup', type=int, default=20, help="Orders sent per endpoint before measuring.")
+        parser.add_argument('--rounds', type=int, default=3,
+                            help="Measured rounds per endpoint; each figure is the median across rounds.")
+        parser.add_argument('--products', type=int, default=300, help="Products in the seeded catalog.")
+        parser.add_argument('--categories', type=int, default=12, help="Categories in the seeded catalog.")
+        parser.add_argument('--customers', type=int, default=500, help="Distinct customers placing orders.")
+        parser.add_argument('--mode', choices=['sync', 'queued'], default=None,
+                            help="ORDER_INGESTION_MODE for the counter endpoints (default: current setting).")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed for the catalog and orders.")
+        parser.add_argument('--baseline', default=None, help="Baseline file (default: benchmarks/order_placement.json).")
+        parser.add_argument('--save-baseline', action='store_true', help="Write the results to the baseline file.")
+        parser.add_argument('--check', action='store_true', help="Fail if results regress against the baseline.")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed relative p95 latency and throughput regression for --check.")
+        parser.add_argument('--output', default=None, help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['orders'] < 1 or options['rounds'] < 1:
+            raise CommandError("--concurrency, --orders and --rounds must be at least 1")
+
+        mode = options['mode'] or getattr(settings, 'ORDER_INGESTION_MODE', 'sync')
+        baseline_path = options['baseline'] or default_baseline_path()
+
+        with tempfile.TemporaryDirectory(prefix='pos-benchmark-') as workdir:
+            # Never touch the real database, queue, shared cache or media, and keep
+            # background workers from writing after the run has torn its database down
+            overrides = override_settings(
+                DEBUG=False,
+                ORDER_INGESTION_MODE=mode,
+                ORDER_QUEUE_PATH=os.path.join(workdir, 'order_queue.sqlite3'),
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': workdir}},
+                IDEMPOTENCY_CACHE_ALIAS='default',
+                MEDIA_ROOT=os.path.join(workdir, 'media'),
+                QR_MENU_PUBLISH=False,
+                QR_MENU_PUBLISH_ROOT=os.path.join(workdir, 'media', 'qr-menus'),
+                MENU_COMPILE_IN_BACKGROUND=False,
+                IMAGE_DERIVATIVES_IN_BACKGROUND=False,
+            )
+            setup_test_environment()
+            overrides.enable()
+            old_name = self.create_database(workdir)
+            try:
+                results = self.run_benchmark(options, mode)
+            finally:
+                connections.close_all()
+                connections[DEFAULT_DB_ALIAS].creation.destroy_test_db(old_name, verbosity=0)
+                overrides.disable()
+                teardown_test_environment()
+
+        self.print_results(results)
+
+        if options['output']:
+            self.write_json(options['output'], results)
+        if options['check']:
+            self.check_baseline(baseline_path, results, options['tolerance'])
+        if options['save_baseline']:
+            self.save_baseline(baseline_path, results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}"))
+
+    def create_database(self, workdir):
+        connection = connections[DEFAULT_DB_ALIAS]
+        old_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            # A file database so concurrent clients contend for locks as they would in production
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        return old_name
+
+    def run_benchmark(self, options, mode):
+        rng = random.Random(options['seed'])
+        outlet, product_ids, variant_ids = seed_catalog(rng, options['categories'], options['products'])
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'settings': {
+                'database': connections[DEFAULT_DB_ALIAS].vendor,
+                'ingestion_mode': mode,
+                'concurrency': options['concurrency'],
+                'orders': options['orders'],
+                'rounds': options['rounds'],
+                'products': len(product_ids),
+                'variants': len(variant_ids),
+                'customers': options['customers'],
+                'seed': options['seed'],
+            },
+            'endpoints': {},
+        }
+
+        for endpoint in options['endpoints']:
+            path = ENDPOINTS[endpoint].format(outlet_id=outlet.id)
+            bodies = build_bodies(
+                rng, endpoint, options['warmup'] + options['orders'], product_ids, variant_ids, options['customers']
+            )
+            self.stdout.write(
+                f"Benchmarking {endpoint} ({options['rounds']} x {options['orders']} orders, "
+                f"{options['concurrency']} clients)..."
+            )
+
+            queued = endpoint.startswith('counter') and mode == 'queued'
+            self.drive(endpoint, path, bodies[:options['warmup']], options['concurrency'])
+            if queued:
+                self.drain()
+
+            rounds = []
+            for _ in range(options['rounds']):
+                summary = self.summarize(*self.drive(endpoint, path, bodies[options['warmup']:], options['concurrency']))
+                if queued:
+                    self.add_drain(summary, *self.drain())
+                rounds.append(summary)
+            # The median round per figure keeps one noisy round from moving the result
+            results['endpoints'][endpoint] = {
+                key: None if rounds[0][key] is None else statistics.median_low(summary[key] for summary in rounds)
+                for key in rounds[0]
+            }
+
+        return results
+
+    def drive(self, endpoint, path, bodies, concurrency):
+        """Send ``bodies`` from ``concurrency`` clients; return ``(samples, elapsed)``."""
+        samples = []
+        lock = threading.Lock()
+        chunks = [bodies[index::concurrency] for index in range(concurrency)]
+
+        def record(started, status_code, queries):
+            with lock:
+                samples.append((time.perf_counter() - started, status_code, queries))
+
+        def sync_client(chunk):
+            client = Client(raise_request_exception=False)
+            try:
+                for body in chunk:
+                    with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+                        started = time.perf_counter()
+                        response = client.post(path, body, content_type='application/json')
+                    record(started, response.status_code, len(context.captured_queries))
+            finally:
+                connections.close_all()
+
+        async def async_client(chunk):
+            client = AsyncClient(raise_request_exception=False)
+            for body in chunk:
+                started = time.perf_counter()
+                response = await client.post(path, body, content_type='application/json')
+                # Async views run their queries on other threads, so they are not counted
+                record(started, response.status_code, None)
+
+        async def run_async():
+            await asyncio.gather(*(async_client(chunk) for chunk in chunks))
+
+        started = time.perf_counter()
+        if endpoint.endswith('-async'):
+            asyncio.run(run_async())
+        else:
+            threads = [threading.Thread(target=sync_client, args=(chunk,)) for chunk in chunks]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return samples, time.perf_counter() - started
+
+    def drain(self):
+        """Write the queued orders; return ``(orders written, queries, seconds)``."""
+        written = Order.objects.count()
+        with open(os.devnull, 'w') as devnull, CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+            started = time.perf_counter()
+            call_command('drain_order_queue', once=True, stdout=devnull)
+            elapsed = time.perf_counter() - started
+        return Order.objects.count() - written, len(context.captured_queries), elapsed
+
+    def add_drain(self, summary, written, queries, elapsed):
+        # An accepted order is not placed until the drain writes it, so its share counts too
+        drain_queries = queries / written if written else 0
+        summary['drain_seconds'] = round(elapsed, 3)
+        summary['drain_queries_per_order'] = round(drain_queries, 2)
+        if summary['queries_per_order'] is not None:
+            summary['queries_per_order'] = round(summary['queries_per_order'] + drain_queries, 2)
+
+    def summarize(self, samples, elapsed):
+        latencies = sorted(latency * 1000 for latency, _, _ in samples)
+        errors = sum(1 for _, status_code, _ in samples if status_code >= 300)
+        server_errors = sum(1 for _, status_code, _ in samples if status_code >= 500)
+        queries = [count for _, status_code, count in samples if count is not None and status_code < 300]
+        return {
+            'orders': len(samples),
+            'errors': errors,
+            'server_errors': server_errors,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2),
+            'throughput_per_s': round(len(samples) / elapsed, 1),
+            'queries_per_order': round(sum(queries) / len(queries), 2) if queries else None,
+            'max_queries_per_order': max(queries) if queries else None,
+        }
+
+    def print_results(self, results):
+        columns = ['orders', 'errors', 'p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s', 'queries_per_order']
+        self.stdout.write("")
+        self.stdout.write(f"{'endpoint':<15}" + ''.join(f"{column:>18}" for column in columns))
+        for endpoint, summary in results['endpoints'].items():
+            values = ['-' if summary[column] is None else str(summary[column]) for column in columns]
+            self.stdout.write(f"{endpoint:<15}" + ''.join(f"{value:>18}" for value in values))
+        self.stdout.write("")
+
+    def write_json(self, path, results):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as handle:
+            json.dump(results, handle, indent=2)
+            handle.write('\n')
+
+    def failures(self, results):
+        return [
+            f"{endpoint}: {summary['errors']} of {summary['orders']} orders failed "
+            f"({summary.get('server_errors', 0)} server errors)"
+            for endpoint, summary in results['endpoints'].items() if summary['errors']
+        ]
+
+    def save_baseline(self, path, results):
+        failed = self.failures(results)
+        if failed:
+            raise CommandError("Not saving a baseline with failed orders:\n  " + "\n  ".join(failed))
+        self.write_json(path, results)
+
+    def check_baseline(self, path, results, tolerance):
+        if not os.path.exists(path):
+            raise CommandError(f"No baseline at {path}; run with --save-baseline first")
+        with open(path) as handle:
+            baseline = json.load(handle)
+
+        # Every order sent is valid, so any failure is a regression whatever the baseline says
+        regressions = self.failures(results)
+        for endpoint, summary in results['endpoints'].items():
+            previous = baseline['endpoints'].get(endpoint)
+            if previous is None:
+                continue
+            if summary['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{endpoint}: p95 {summary['p95_ms']}ms (baseline {previous['p95_ms']}ms)")
+            if summary['throughput_per_s'] < previous['throughput_per_s'] * (1 - tolerance):
+                regressions.append(
+                    f"{endpoint}: {summary['throughput_per_s']} orders/s (baseline {previous['throughput_per_s']})"
+                )
+            # Query counts do not depend on the machine, so any real increase is a regression
+            if (summary['queries_per_order'] is not None and previous.get('queries_per_order') is not None
+                    and summary['queries_per_order'] > previous['queries_per_order'] + 0.5):
+                regressions.append(
+                    f"{endpoint}: {summary['queries_per_order']} queries/order (baseline {previous['queries_per_order']})"
+                )
+
+        if regressions:
+            raise CommandError("Order placement regressed against the baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {path}"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from v1.menus import compile_menu
+from v1.models import Menu
+
+
+class Command(BaseCommand):
+    help = "Compile the stored menu documents served by get_menu_details."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu', type=int, nargs='*', default=None, help="Only these menu ids.")
+        parser.add_argument('--outlet', type=int, default=None, help="Only menus of this outlet.")
+
+    def handle(self, *args, **options):
+        menus = Menu.objects.all()
+        if options['menu']:
+            menus = menus.filter(id__in=options['menu'])
+        if options['outlet'] is not None:
+            menus = menus.filter(outlet_id=options['outlet'])
+
+        compiled = 0
+        for menu_id in menus.order_by('id').values_list('id', flat=True):
+            document = compile_menu(menu_id)
+            if document is not None:
+                compiled += 1
+                self.stdout.write(f"Menu {menu_id}: version {document[0]}")
+        self.stdout.write(self.style.SUCCESS(f"Compiled {compiled} menu(s)"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from v1.images import IMAGE_FIELDS, generate_derivatives
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails of existing product images, outlet logos and employee photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Process images that have thumbnails already, e.g. to add new IMAGE_DERIVATIVE_SIZES.",
+        )
+
+    def handle(self, *args, **options):
+        sources = set()
+        for model, field in IMAGE_FIELDS:
+            sources.update(model.objects.exclude(**{field: ''}).exclude(**{field: None}).values_list(field, flat=True))
+
+        generated = 0
+        for source in sorted(sources):
+            if generate_derivatives(source, force=options['force']) is not None:
+                generated += 1
+            else:
+                self.stderr.write(f"Skipped {source}: missing or not an image")
+        self.stdout.write(self.style.SUCCESS(f"Thumbnails ready for {generated} of {len(sources)} image(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from v1.order_events import purge_order_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete order events older than ORDER_EVENT_RETENTION_HOURS. "
+        "Kitchen screens resuming from an older event reload their board instead."
+    )
+
+    def handle(self, *args, **options):
+        deleted = purge_order_events()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} order event(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from v1.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete catalog tombstones older than CATALOG_TOMBSTONE_RETENTION_DAYS. "
+        "Counters syncing from an older cursor get a full snapshot instead."
+    )
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstone(s)"))
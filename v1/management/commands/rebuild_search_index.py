@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from v1.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rewrite the product search documents, e.g. after bulk imports that bypass model signals."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outlet', type=int, default=None, help="Only products of this outlet.")
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(outlet_id=options['outlet'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} product(s)"))
@@ -0,0 +1,124 @@
+"""
+Precompiled menu documents.
+
+``get_menu_details`` serves a menu's full JSON (products, variants, category
+names) from a ``MenuDocument`` compiled ahead of time, so a read is a version
+check and a cache hit instead of a nested serialization. Changes to a menu, its products,
+variants or categories schedule a recompile through the signal handlers in
+v1.signals. Recompiles run after the transaction commits on a background
+worker; readers get the previous version until the new one is stored.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from .background import CoalescingQueue
+from .models import Menu, MenuDocument, Product
+from .serializers import MenuDetailSerializer
+
+
+def get_cache_timeout():
+    return getattr(settings, 'MENU_DOCUMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def menu_cache_key(menu_id):
+    return f"menu-document:{menu_id}"
+
+
+def attach_product_ids(menus):
+    """Set ``product_ids`` on each menu with one query; returns the menus as a list."""
+    menus = list(menus)
+    product_ids = {menu.id: [] for menu in menus}
+    links = Menu.products.through.objects.filter(menu_id__in=product_ids)
+    for menu_id, product_id in links.order_by('product_id').values_list('menu_id', 'product_id'):
+        product_ids[menu_id].append(product_id)
+    for menu in menus:
+        menu.product_ids = product_ids[menu.id]
+    return menus
+
+
+def build_menu_content(menu_id):
+    """Serialize a menu with three queries, or return ``None`` if it does not exist."""
+    products = Product.objects.select_related('category').prefetch_related('variants')
+    menu = Menu.objects.prefetch_related(Prefetch('products', queryset=products)).filter(id=menu_id).first()
+    if menu is None:
+        return None
+    return JSONRenderer().render(MenuDetailSerializer(menu).data).decode()
+
+
+def compile_menu(menu_id):
+    """
+    Compile and store the document of one menu.
+
+    Returns ``(version, compiled_at, content)``, or ``None`` if the menu no longer exists.
+    """
+    content = build_menu_content(menu_id)
+    if content is None:
+        cache.delete(menu_cache_key(menu_id))
+        return None
+
+    updated = MenuDocument.objects.filter(menu_id=menu_id).update(
+        content=content, version=F('version') + 1, compiled_at=timezone.now()
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                MenuDocument.objects.create(menu_id=menu_id, content=content)
+        except IntegrityError:
+            # Another worker stored the first version meanwhile
+            MenuDocument.objects.filter(menu_id=menu_id).update(
+                content=content, version=F('version') + 1, compiled_at=timezone.now()
+            )
+
+    document = MenuDocument.objects.filter(menu_id=menu_id).values_list('version', 'compiled_at', 'content').first()
+    if document is not None:
+        cache.set(menu_cache_key(menu_id), document, get_cache_timeout())
+    return document
+
+
+def get_menu_document(menu_id):
+    """
+    Return ``(version, compiled_at, content)`` for a menu, or ``None`` if it does not exist.
+
+    The cache may be local to this process while another worker recompiles, so
+    a cached document is only served while its version matches the stored one.
+    That check reads the version alone; the content comes from the cache. A menu
+    is compiled in place only the first time it is read.
+    """
+    documents = MenuDocument.objects.filter(menu_id=menu_id)
+    version = documents.values_list('version', flat=True).first()
+    if version is None:
+        return compile_menu(menu_id)
+
+    document = cache.get(menu_cache_key(menu_id))
+    if document is not None and document[0] == version:
+        return document
+
+    document = documents.values_list('version', 'compiled_at', 'content').first()
+    if document is None:
+        return compile_menu(menu_id)
+    cache.set(menu_cache_key(menu_id), document, get_cache_timeout())
+    return document
+
+
+def _compile_menus(menu_ids):
+    for menu_id in menu_ids:
+        compile_menu(menu_id)
+
+
+_queue = CoalescingQueue(
+    'menu-compiler', _compile_menus, lambda: getattr(settings, 'MENU_COMPILE_IN_BACKGROUND', True)
+)
+
+
+def schedule_compile(menu_ids):
+    """Recompile ``menu_ids`` once the current transaction commits."""
+    _queue.schedule(menu_ids)
+
+
+def schedule_outlet_menus(outlet_id):
+    schedule_compile(Menu.objects.filter(outlet_id=outlet_id).values_list('id', flat=True))
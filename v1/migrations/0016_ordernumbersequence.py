@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0015_remove_stockrequest_requested_quantity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+                ('outlet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='order_number_sequence', to='v1.outlet')),
+            ],
+        ),
+    ]
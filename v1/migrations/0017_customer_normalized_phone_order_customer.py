@@ -0,0 +1,24 @@
+# Generated by Django 4.2.5 on 2026-10-18 16:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0016_ordernumbersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='normalized_phone',
+            field=models.CharField(blank=True, help_text='Digits-only phone number used to identify the customer; see v1.customers.', max_length=15, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='v1.customer'),
+        ),
+    ]
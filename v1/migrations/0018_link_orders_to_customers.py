@@ -0,0 +1,60 @@
+# Generated by Django 4.2.5 on 2026-10-18 16:46
+
+import re
+
+from django.db import migrations
+
+
+def normalize_phone(phone_number):
+    # Frozen copy of v1.customers.normalize_phone
+    digits = re.sub(r'\D', '', phone_number or '')
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits[:15] or None
+
+
+def link_orders_to_customers(apps, schema_editor):
+    Customer = apps.get_model('v1', 'Customer')
+    Order = apps.get_model('v1', 'Order')
+
+    # The oldest row for each phone number becomes the directory entry; every
+    # order linked through a duplicate row is moved onto it
+    canonical = {}
+    duplicates = []
+    for customer in Customer.objects.order_by('id'):
+        normalized = normalize_phone(customer.phone_number)
+        target = canonical.get(normalized) if normalized else None
+        if target is None:
+            target = customer
+            if normalized:
+                canonical[normalized] = customer
+                Customer.objects.filter(id=customer.id).update(normalized_phone=normalized)
+        else:
+            duplicates.append(customer.id)
+
+        if customer.order_id:
+            Order.objects.filter(id=customer.order_id).update(customer_id=target.id)
+
+    Customer.objects.filter(id__in=duplicates).delete()
+
+
+def unlink_orders_from_customers(apps, schema_editor):
+    Customer = apps.get_model('v1', 'Customer')
+    Order = apps.get_model('v1', 'Order')
+    for order in Order.objects.exclude(customer_id=None).order_by('id'):
+        Customer.objects.filter(id=order.customer_id).update(order_id=order.id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0017_customer_normalized_phone_order_customer'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_orders_to_customers, unlink_orders_from_customers),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.5 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0018_link_orders_to_customers'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customer',
+            name='order',
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='normalized_phone',
+            field=models.CharField(blank=True, help_text='Digits-only phone number used to identify the customer; see v1.customers.', max_length=15, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.5 on 2026-10-18 16:47
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def price_with_gst(price, gst_percentage, is_gst_inclusive):
+    # Frozen copy of v1.pricing.price_with_gst
+    if not is_gst_inclusive:
+        price = price + price * gst_percentage / Decimal('100')
+    return price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def fill_price_with_gst(apps, schema_editor):
+    Product = apps.get_model('v1', 'Product')
+    ProductVariant = apps.get_model('v1', 'ProductVariant')
+
+    products = list(Product.objects.all())
+    for product in products:
+        product.price_with_gst = price_with_gst(product.price, product.gst_percentage, product.is_gst_inclusive)
+    Product.objects.bulk_update(products, ['price_with_gst'], batch_size=500)
+
+    variants = list(ProductVariant.objects.select_related('product'))
+    for variant in variants:
+        variant.price_with_gst = price_with_gst(variant.price, variant.product.gst_percentage, variant.is_gst_inclusive)
+    ProductVariant.objects.bulk_update(variants, ['price_with_gst'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0019_remove_customer_order_alter_customer_normalized_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='price_with_gst',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Tax-inclusive price, kept in sync on save.', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='price_with_gst',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Tax-inclusive price, kept in sync on save.', max_digits=10),
+        ),
+        migrations.RunPython(fill_price_with_gst, migrations.RunPython.noop),
+    ]
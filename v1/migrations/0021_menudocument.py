@@ -0,0 +1,24 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0020_price_with_gst'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1, help_text='Incremented every time the menu is recompiled.')),
+                ('content', models.TextField(help_text='Menu JSON exactly as served.')),
+                ('compiled_at', models.DateTimeField(auto_now=True)),
+                ('menu', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='document', to='v1.menu')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0021_menudocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['outlet', 'updated_at'], name='v1_category_outlet__7b8f9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['outlet', 'updated_at'], name='v1_product_outlet__aa942d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productvariant',
+            index=models.Index(fields=['product', 'updated_at'], name='v1_productv_product_c1741c_idx'),
+        ),
+    ]
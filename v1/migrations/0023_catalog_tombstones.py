@@ -0,0 +1,37 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:06
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0022_catalog_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outlet_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('category', 'Category'), ('product', 'Product'), ('variant', 'Product variant'), ('menu', 'Menu')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text="Also touched when the menu's products change."),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['outlet', 'updated_at'], name='v1_menu_outlet__7107ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogtombstone',
+            index=models.Index(fields=['outlet_id', 'deleted_at'], name='v1_catalogt_outlet__ec1814_idx'),
+        ),
+    ]
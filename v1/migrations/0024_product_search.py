@@ -0,0 +1,104 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE v1_productsearch_fts USING fts5("
+    "name, description, category, variants, outlet_id, "
+    "content='v1_productsearchdocument', content_rowid='product_id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    "CREATE VIRTUAL TABLE v1_productsearch_vocab USING fts5vocab(v1_productsearch_fts, 'row')",
+    "CREATE TRIGGER v1_productsearch_ai AFTER INSERT ON v1_productsearchdocument BEGIN "
+    "INSERT INTO v1_productsearch_fts(rowid, name, description, category, variants, outlet_id) "
+    "VALUES (new.product_id, new.name, new.description, new.category, new.variants, new.outlet_id); END",
+    "CREATE TRIGGER v1_productsearch_ad AFTER DELETE ON v1_productsearchdocument BEGIN "
+    "INSERT INTO v1_productsearch_fts(v1_productsearch_fts, rowid, name, description, category, variants, outlet_id) "
+    "VALUES ('delete', old.product_id, old.name, old.description, old.category, old.variants, old.outlet_id); END",
+    "CREATE TRIGGER v1_productsearch_au AFTER UPDATE ON v1_productsearchdocument BEGIN "
+    "INSERT INTO v1_productsearch_fts(v1_productsearch_fts, rowid, name, description, category, variants, outlet_id) "
+    "VALUES ('delete', old.product_id, old.name, old.description, old.category, old.variants, old.outlet_id); "
+    "INSERT INTO v1_productsearch_fts(rowid, name, description, category, variants, outlet_id) "
+    "VALUES (new.product_id, new.name, new.description, new.category, new.variants, new.outlet_id); END",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS v1_productsearch_au",
+    "DROP TRIGGER IF EXISTS v1_productsearch_ad",
+    "DROP TRIGGER IF EXISTS v1_productsearch_ai",
+    "DROP TABLE IF EXISTS v1_productsearch_vocab",
+    "DROP TABLE IF EXISTS v1_productsearch_fts",
+]
+
+# Must match v1.search.PG_VECTOR for the planner to use the index
+POSTGRESQL_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX v1_productsearch_vector ON v1_productsearchdocument USING GIN (("
+    "setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', category), 'B') || "
+    "setweight(to_tsvector('simple', variants), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C')))",
+    "CREATE INDEX v1_productsearch_name_trgm ON v1_productsearchdocument USING GIN (name gin_trgm_ops)",
+]
+
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS v1_productsearch_name_trgm",
+    "DROP INDEX IF EXISTS v1_productsearch_vector",
+]
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+def index_existing_products(apps, schema_editor):
+    Product = apps.get_model('v1', 'Product')
+    ProductVariant = apps.get_model('v1', 'ProductVariant')
+    ProductSearchDocument = apps.get_model('v1', 'ProductSearchDocument')
+
+    variants = {}
+    for product_id, name in ProductVariant.objects.order_by('id').values_list('product_id', 'name'):
+        variants.setdefault(product_id, []).append(name)
+
+    ProductSearchDocument.objects.bulk_create([
+        ProductSearchDocument(
+            product_id=product_id,
+            outlet_id=outlet_id,
+            name=name,
+            description=description or '',
+            category=category or '',
+            variants=' '.join(variants.get(product_id, [])),
+        )
+        for product_id, outlet_id, name, description, category
+        in Product.objects.values_list('id', 'outlet_id', 'name', 'description', 'category__name')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0023_catalog_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='v1.product')),
+                ('outlet_id', models.BigIntegerField(db_index=True)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, default='')),
+                ('category', models.CharField(blank=True, default='', max_length=255)),
+                ('variants', models.TextField(blank=True, default='', help_text="Names of the product's variants.")),
+            ],
+        ),
+        migrations.RunPython(
+            run({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE}),
+            run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+        migrations.RunPython(index_existing_products, migrations.RunPython.noop),
+    ]
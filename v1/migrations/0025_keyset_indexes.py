@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0024_product_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['outlet', 'id'], name='v1_product_outlet__0f7e1e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockrequest',
+            index=models.Index(fields=['outlet', 'status', 'id'], name='v1_stockreq_outlet__0ca614_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0025_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
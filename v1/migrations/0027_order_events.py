@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0026_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'Order created'), ('status', 'Status changed')], max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='v1.order')),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_events', to='v1.outlet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['outlet', 'id'], name='v1_ordereve_outlet__5fa386_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0027_order_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['outlet', 'status', 'order_date'], name='v1_order_outlet__0a0750_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('v1', '0028_kot_queue_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
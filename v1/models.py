@@ -5,6 +5,8 @@ from django.contrib.auth import get_user_model
 from datetime import date
 from django.conf import settings
 from django.utils import timezone
+
+from . import pricing
 # Create your models here.
 
 
@@ -144,6 +146,13 @@ class Employee(models.Model):
 class Category(models.Model):
     outlet = models.ForeignKey('Outlet', on_delete=models.CASCADE, related_name='categories')
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Catalog version and change lookups per outlet; see v1.catalog
+            models.Index(fields=['outlet', 'updated_at']),
+        ]
 
     def __str__(self):
         return self.name
@@ -168,10 +177,42 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     category = models.ForeignKey('Category', on_delete=models.CASCADE, related_name='products')  # Add category field
+    price_with_gst = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False, help_text="Tax-inclusive price, kept in sync on save.")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet', 'updated_at']),
+            # Products of an outlet, paginated by id
+            models.Index(fields=['outlet', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.price_with_gst = pricing.price_with_gst(self.price, self.gst_percentage, self.is_gst_inclusive)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'price_with_gst'}
+
+        # Variant prices depend on the product's GST rate, so only a new rate touches them
+        gst_changed = (
+            not self._state.adding
+            and (update_fields is None or 'gst_percentage' in update_fields)
+            and Product.objects.filter(pk=self.pk).values_list('gst_percentage', flat=True).first() != self.gst_percentage
+        )
+        super().save(*args, **kwargs)
+        if not gst_changed:
+            return
+
+        variants = list(self.variants.all())
+        for variant in variants:
+            variant.price_with_gst = pricing.price_with_gst(variant.price, self.gst_percentage, variant.is_gst_inclusive)
+            # bulk_update skips auto_now; delta syncs rely on updated_at moving
+            variant.updated_at = self.updated_at
+        if variants:
+            ProductVariant.objects.bulk_update(variants, ['price_with_gst', 'updated_at'])
+
 
 
 
@@ -190,9 +231,21 @@ class ProductVariant(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    price_with_gst = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False, help_text="Tax-inclusive price, kept in sync on save.")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'updated_at']),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.name}"
+
+    def save(self, *args, **kwargs):
+        self.price_with_gst = pricing.price_with_gst(self.price, self.product.gst_percentage, self.is_gst_inclusive)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'price_with_gst'}
+        super().save(*args, **kwargs)
     
 
 
@@ -209,9 +262,74 @@ class Menu(models.Model):
     open_time = models.TimeField(blank=True, null=True)
     close_time = models.TimeField(blank=True, null=True)
     products = models.ManyToManyField(Product, blank=True, related_name='menus')
+    updated_at = models.DateTimeField(auto_now=True, help_text="Also touched when the menu's products change.")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet', 'updated_at']),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.outlet.name}"
+
+
+class ProductSearchDocument(models.Model):
+    """Searchable text of a product, kept in sync by v1.signals and indexed per database; see v1.search."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    outlet_id = models.BigIntegerField(db_index=True)
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True, default='')
+    category = models.CharField(max_length=255, blank=True, default='')
+    variants = models.TextField(blank=True, default='', help_text="Names of the product's variants.")
+
+    def __str__(self):
+        return self.name
+
+
+class CatalogTombstone(models.Model):
+    """Record of a deleted catalog row, so delta syncs can report deletions; see v1.sync."""
+    KIND_CHOICES = [
+        ('category', 'Category'),
+        ('product', 'Product'),
+        ('variant', 'Product variant'),
+        ('menu', 'Menu'),
+    ]
+
+    # Plain id rather than a foreign key: rows are written while an outlet itself may be deleting
+    outlet_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet_id', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
+
+
+class ImageDerivative(models.Model):
+    """Content hash naming the thumbnails of an uploaded image; see v1.images."""
+    # Storage name of the upload, e.g. product_images/pizza.jpg
+    source = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=16)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Thumbnails of {self.source}"
+
+
+class MenuDocument(models.Model):
+    """Compiled ``get_menu_details`` payload of a menu; see v1.menus."""
+    menu = models.OneToOneField(Menu, on_delete=models.CASCADE, related_name='document')
+    version = models.PositiveIntegerField(default=1, help_text="Incremented every time the menu is recompiled.")
+    content = models.TextField(help_text="Menu JSON exactly as served.")
+    compiled_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.menu_id} v{self.version}"
     
 
 
@@ -252,7 +370,16 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     address = models.TextField(blank=True, null=True)  # New optional address field
     mode = models.CharField(max_length=10, choices=MODE_CHOICES, blank=True, null=True)  # New mode field
+    customer = models.ForeignKey('Customer', on_delete=models.SET_NULL, related_name='orders', null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every status change; see v1.order_status
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Kitchen queue: an outlet's orders in some statuses, oldest first
+            models.Index(fields=['outlet', 'status', 'order_date']),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number}"
@@ -264,6 +391,49 @@ class Order(models.Model):
     
     
     
+class OrderEvent(models.Model):
+    """An order placed or moved to a new status, streamed to kitchen screens; see v1.order_events."""
+    KIND_CHOICES = [
+        ('created', 'Order created'),
+        ('status', 'Status changed'),
+    ]
+
+    outlet = models.ForeignKey('Outlet', on_delete=models.CASCADE, related_name='order_events')
+    order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Events of an outlet after the last one a screen has seen
+            models.Index(fields=['outlet', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: order {self.order_id} {self.status}"
+
+
+
+
+
+
+
+class OrderNumberSequence(models.Model):
+    # Next unreserved order sequence number for an outlet; see v1.order_numbers
+    outlet = models.OneToOneField('Outlet', on_delete=models.CASCADE, related_name='order_number_sequence')
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.outlet} - next {self.next_value}"
+
+
+
+
+
+
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey('Product', on_delete=models.SET_NULL, null=True, blank=True)  # Optional ForeignKey to Product
@@ -288,7 +458,7 @@ class OrderItem(models.Model):
 class Customer(models.Model):
     name = models.CharField(max_length=255)
     phone_number = models.CharField(max_length=15)  # Assuming a max length for phone numbers
-    order = models.ForeignKey('Order', on_delete=models.CASCADE, related_name='customers',null=True, blank=True)
+    normalized_phone = models.CharField(max_length=15, unique=True, null=True, blank=True, help_text="Digits-only phone number used to identify the customer; see v1.customers.")
 
     def __str__(self):
         return f"{self.name} ({self.phone_number})"
@@ -332,6 +502,12 @@ class StockRequest(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     outlet = models.ForeignKey('Outlet', on_delete=models.CASCADE, related_name='stock')
 
+    class Meta:
+        indexes = [
+            # Pending requests of an outlet, paginated by id
+            models.Index(fields=['outlet', 'status', 'id']),
+        ]
+
     def __str__(self):
         return f"Stock Request for {'Variant' if self.product_variant else 'Product'} {self.product_variant.name if self.product_variant else self.product.name}, Status: {self.status}"
 
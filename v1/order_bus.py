@@ -0,0 +1,189 @@
+"""
+In-process bus for order events.
+
+Kitchen screens, caches and printers all want to hear about orders as they
+are placed or change status, without each of them scanning the orders table.
+``v1.order_events`` publishes every event it records once its transaction
+commits; ``bus.subscribe(callback)`` registers a callback that receives lists
+of events as dicts with ``id``, ``outlet_id``, ``order_id``, ``kind``
+(``'created'`` or ``'status'``) and ``status``.
+
+Callbacks run on the publishing thread (or the listener thread below), so
+they should be quick: wake something up, drop a cache entry, queue work.
+An exception in one is logged and does not reach the order path.
+
+``ORDER_EVENT_BUS`` picks how events reach other processes:
+
+* ``'local'``: only the subscribers of the process that published an event
+  hear it. Enough for a single worker.
+* ``'database'`` (default): events are delivered locally at once, and each
+  process that consumers asked to ``listen()`` also runs one thread reading
+  new ``OrderEvent`` rows every ``ORDER_EVENT_BUS_POLL_INTERVAL`` seconds,
+  delivering those published elsewhere, including late commits within
+  ``ORDER_EVENT_COMMIT_LAG`` seconds. Two small queries per interval serve every
+  stream of the process, whatever the number of outlets and screens.
+
+A dotted path to another backend class with the same interface also works.
+Each event is delivered once per process.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from .models import OrderEvent
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = ('id', 'outlet_id', 'order_id', 'kind', 'status')
+
+
+class LocalBackend:
+    """Delivers events to the subscribers of the publishing process."""
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, events):
+        self.deliver(events)
+
+    def listen(self):
+        pass
+
+
+class DatabaseBackend(LocalBackend):
+    """
+    Also delivers events published by other processes, read back from the ``OrderEvent`` table.
+
+    Each read starts again from the settled event id (see v1.order_events),
+    so an event that commits after one with a higher id is still delivered;
+    ids delivered since are remembered and skipped.
+    """
+
+    def __init__(self, deliver):
+        super().__init__(deliver)
+        self.poll_interval = getattr(settings, 'ORDER_EVENT_BUS_POLL_INTERVAL', 0.5)
+        self._lock = threading.Lock()
+        self._thread = None
+        # Every event at or below the floor has been delivered; above it, the ids in _delivered have
+        self._floor = None
+        self._delivered = set()
+
+    def publish(self, events):
+        with self._lock:
+            if self._floor is not None:
+                # The listener may have read a row before its transaction's on_commit callbacks ran
+                events = [
+                    event for event in events
+                    if event['id'] is None or (event['id'] > self._floor and event['id'] not in self._delivered)
+                ]
+                self._delivered.update(event['id'] for event in events if event['id'] is not None)
+        if events:
+            self.deliver(events)
+
+    def listen(self):
+        # Imported here: v1.order_events publishes through this module
+        from .order_events import settled_event_id
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Events already visible were published before anyone listened
+            self._floor = settled_event_id()
+            self._delivered = set(OrderEvent.objects.filter(id__gt=self._floor).values_list('id', flat=True))
+            self._thread = threading.Thread(target=self._run, name='order-event-bus', daemon=True)
+            self._thread.start()
+
+    def _read(self):
+        from .order_events import settled_event_id
+
+        # Taken before reading, so every event up to it is among the rows read below
+        floor = settled_event_id()
+        after = self._floor
+        rows = []
+        while True:
+            batch = list(OrderEvent.objects.filter(id__gt=after).order_by('id').values(*EVENT_FIELDS)[:1000])
+            rows += batch
+            if len(batch) < 1000:
+                break
+            after = batch[-1]['id']
+
+        with self._lock:
+            events = [row for row in rows if row['id'] not in self._delivered]
+            self._delivered.update(row['id'] for row in events)
+            self._floor = max(self._floor, floor)
+            self._delivered = {event_id for event_id in self._delivered if event_id > self._floor}
+        return events
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                events = self._read()
+            except Exception:
+                logger.exception("Reading order events failed")
+                # Drop a broken connection; the next read opens a new one
+                close_old_connections()
+                continue
+            if events:
+                self.deliver(events)
+
+
+BACKENDS = {
+    'local': LocalBackend,
+    'database': DatabaseBackend,
+}
+
+
+class OrderEventBus:
+    def __init__(self):
+        self._subscribers = []
+        self._backend = None
+        self._backend_name = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        name = getattr(settings, 'ORDER_EVENT_BUS', 'database')
+        with self._lock:
+            if self._backend is None or name != self._backend_name:
+                backend_class = BACKENDS[name] if name in BACKENDS else import_string(name)
+                self._backend, self._backend_name = backend_class(self.deliver), name
+            return self._backend
+
+    def subscribe(self, callback):
+        """Call ``callback(events)`` for every batch of events this process hears of."""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def listen(self):
+        """Also hear events published by other processes, where the backend can."""
+        self.backend.listen()
+
+    def publish(self, events):
+        self.backend.publish(events)
+
+    def publish_on_commit(self, events):
+        events = list(events)
+        if events:
+            transaction.on_commit(lambda: self.publish(events))
+
+    def deliver(self, events):
+        for callback in list(self._subscribers):
+            try:
+                callback(events)
+            except Exception:
+                logger.exception("Order event subscriber %r failed", callback)
+
+
+bus = OrderEventBus()
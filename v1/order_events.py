@@ -0,0 +1,102 @@
+"""
+Order events for kitchen screens.
+
+Placing an order and moving it to a new status each append an ``OrderEvent``
+row in the same transaction. Event ids only grow, so a reader that remembers
+the last id it handled picks up exactly what happened since with one indexed
+query; kot.events streams them to KOT screens. Once the transaction commits,
+the events are also published on ``v1.order_bus`` for subscribers in this
+and other processes.
+
+Ids are drawn when an event is written, not when it commits, so on
+PostgreSQL an event can become visible after one with a higher id. Readers
+therefore re-read from ``settled_event_id()``, the newest event written more
+than ``ORDER_EVENT_COMMIT_LAG`` seconds ago, and skip the ids they already
+handled; below it no new event can appear.
+
+Events older than ``ORDER_EVENT_RETENTION_HOURS`` are deleted by
+``purge_order_events``. A reader resuming from a deleted event cannot know
+what it missed and has to reload instead (see ``is_expired``).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import OrderEvent
+from .order_bus import bus
+
+
+def get_retention():
+    return timedelta(hours=getattr(settings, 'ORDER_EVENT_RETENTION_HOURS', 48))
+
+
+def get_commit_lag():
+    return timedelta(seconds=getattr(settings, 'ORDER_EVENT_COMMIT_LAG', 5))
+
+
+def record_created(orders):
+    """Record that ``orders`` were placed; call inside the transaction writing them."""
+    _record([
+        OrderEvent(outlet_id=order.outlet_id, order_id=order.id, kind='created', status=order.status)
+        for order in orders
+    ])
+
+
+def record_status_changes(orders):
+    """Record the new ``status`` of each of ``orders``; call inside the transaction changing them."""
+    _record([
+        OrderEvent(outlet_id=order.outlet_id, order_id=order.id, kind='status', status=order.status)
+        for order in orders
+    ])
+
+
+def _record(events):
+    OrderEvent.objects.bulk_create(events)
+    bus.publish_on_commit(
+        {'id': event.id, 'outlet_id': event.outlet_id, 'order_id': event.order_id, 'kind': event.kind, 'status': event.status}
+        for event in events
+    )
+
+
+def latest_event_id():
+    return OrderEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def settled_event_id():
+    """Id at or below which every event that will ever be visible already is."""
+    horizon = timezone.now() - get_commit_lag()
+    # Walks back from the newest event, so it only reads the events of the lag window
+    return OrderEvent.objects.filter(created_at__lt=horizon).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def event_ids_after(outlet_id, event_id):
+    return set(OrderEvent.objects.filter(outlet_id=outlet_id, id__gt=event_id).values_list('id', flat=True))
+
+
+def is_expired(event_id):
+    """Whether events after ``event_id`` may have been purged, or it was never issued."""
+    bounds = OrderEvent.objects.aggregate(oldest=Min('id'), latest=Max('id'))
+    if bounds['latest'] is None:
+        return event_id > 0
+    # Ids are never reused, so a gap before the oldest remaining event means events were purged
+    return event_id > bounds['latest'] or event_id < bounds['oldest'] - 1
+
+
+def events_after(outlet_id, event_id, exclude=(), limit=100):
+    """
+    The outlet's next events after ``event_id``, oldest first, with their
+    orders (not their items), leaving out the ids in ``exclude``.
+    """
+    events = OrderEvent.objects.filter(outlet_id=outlet_id, id__gt=event_id)
+    if exclude:
+        events = events.exclude(id__in=exclude)
+    return list(events.select_related('order').order_by('id')[:limit])
+
+
+def purge_order_events(now=None):
+    """Delete events older than the retention period; returns how many were removed."""
+    horizon = (now or timezone.now()) - get_retention()
+    deleted, _ = OrderEvent.objects.filter(created_at__lt=horizon).delete()
+    return deleted
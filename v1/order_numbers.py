@@ -0,0 +1,71 @@
+"""
+Per-outlet order number allocation.
+
+Order numbers are ``<outlet_id>-<sequence>`` (e.g. ``12-000457``). Each process
+reserves a block of sequence numbers from ``OrderNumberSequence`` with a single
+UPDATE and hands them out from memory, so most orders need no round-trip at all
+and several worker processes never hand out the same number. Numbers left in a
+block when a process exits are skipped, so sequences can have gaps.
+
+Allocate numbers *before* opening the transaction that writes the order: a
+block reserved inside a transaction that later rolls back would be handed out
+again by another process.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import OrderNumberSequence
+
+
+_lock = threading.Lock()
+_blocks = {}  # outlet_id -> [next_value, end_value)
+_owner_pid = os.getpid()
+
+
+def get_block_size():
+    return getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 50)
+
+
+def format_order_number(outlet_id, sequence):
+    return f"{outlet_id}-{sequence:06d}"
+
+
+def reserve_block(outlet_id, size):
+    """Reserve ``size`` sequence numbers for the outlet and return ``(start, end)``."""
+    with transaction.atomic():
+        OrderNumberSequence.objects.get_or_create(outlet_id=outlet_id)
+        OrderNumberSequence.objects.filter(outlet_id=outlet_id).update(next_value=F('next_value') + size)
+        end = OrderNumberSequence.objects.filter(outlet_id=outlet_id).values_list('next_value', flat=True).get()
+    return end - size, end
+
+
+def allocate_order_numbers(outlet_id, count):
+    """Return ``count`` new order numbers for the outlet, in increasing order."""
+    global _owner_pid
+
+    numbers = []
+    with _lock:
+        # Blocks inherited from a parent process would be handed out twice
+        if _owner_pid != os.getpid():
+            _blocks.clear()
+            _owner_pid = os.getpid()
+
+        while len(numbers) < count:
+            block = _blocks.get(outlet_id)
+            if block is None or block[0] >= block[1]:
+                block = list(reserve_block(outlet_id, max(get_block_size(), count - len(numbers))))
+                _blocks[outlet_id] = block
+
+            take = min(block[1] - block[0], count - len(numbers))
+            numbers.extend(format_order_number(outlet_id, value) for value in range(block[0], block[0] + take))
+            block[0] += take
+
+    return numbers
+
+
+def next_order_number(outlet_id):
+    return allocate_order_numbers(outlet_id, 1)[0]
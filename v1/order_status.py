@@ -0,0 +1,124 @@
+"""
+Order status transitions.
+
+Kitchens move orders along ``PENDING`` (or ``CONFIRMED``) -> ``PROCESSING``
+-> ``COMPLETED``, may complete a waiting order in one step, and may cancel
+orders before they are completed. Every change
+is a conditional ``UPDATE`` that only matches orders in a status allowed to
+move to the target, and bumps ``Order.version``; there is no read before the
+write for a concurrent screen to slip between.
+
+* ``change_status`` moves one order. Given the version a screen last saw,
+  it also refuses if anyone changed the order since (compare-and-swap), and
+  ``StatusConflict`` reports the order's current status and version.
+* ``transition_orders`` moves many orders of an outlet in one statement.
+  Orders that cannot move, belong to another outlet or do not exist are
+  left alone, and only the ids that changed are returned.
+
+Each change is recorded as an order event in the same transaction.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Order
+from .order_events import record_status_changes
+
+
+# Status -> statuses it may move to
+TRANSITIONS = {
+    # Screens that complete an order in one tap skip PROCESSING
+    'PENDING': ('PROCESSING', 'COMPLETED', 'CANCELLED'),
+    'CONFIRMED': ('PROCESSING', 'COMPLETED', 'CANCELLED'),
+    'PROCESSING': ('COMPLETED', 'CANCELLED'),
+    'COMPLETED': (),
+    'CANCELLED': (),
+}
+
+MAX_BULK_ORDERS = 500
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+class StatusConflict(Exception):
+    """The order is not in a status that may move to the target, or its version moved on."""
+
+    def __init__(self, status, version):
+        super().__init__(f"Order is {status} at version {version}")
+        self.status = status
+        self.version = version
+
+
+def sources_of(status):
+    """Statuses an order may move to ``status`` from."""
+    sources = tuple(source for source, targets in TRANSITIONS.items() if status in targets)
+    if not sources:
+        raise InvalidTransition(f"Orders cannot be moved to {status}")
+    return sources
+
+
+def _can_update_returning():
+    # UPDATE ... RETURNING: PostgreSQL, and SQLite from 3.35 (the version that added RETURNING to INSERT too)
+    return connection.vendor == 'postgresql' or (
+        connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+    )
+
+
+def _update_returning(outlet_id, order_ids, status, sources, now):
+    table = connection.ops.quote_name(Order._meta.db_table)
+    sql = (
+        f"UPDATE {table} SET status = %s, updated_at = %s, version = version + 1 "
+        f"WHERE outlet_id = %s AND id IN ({', '.join(['%s'] * len(order_ids))}) "
+        f"AND status IN ({', '.join(['%s'] * len(sources))}) RETURNING id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [status, connection.ops.adapt_datetimefield_value(now), outlet_id, *order_ids, *sources])
+        return [order_id for order_id, in cursor.fetchall()]
+
+
+def transition_orders(outlet_id, order_ids, status):
+    """Move the outlet's ``order_ids`` to ``status`` where allowed; returns the ids that changed, sorted."""
+    sources = sources_of(status)
+    order_ids = sorted(set(order_ids))
+    if not order_ids:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        if _can_update_returning():
+            changed = _update_returning(outlet_id, order_ids, status, sources, now)
+        else:
+            # Lock the matching rows so the ids read are exactly the ones updated
+            orders = Order.objects.select_for_update().filter(outlet_id=outlet_id, id__in=order_ids, status__in=sources)
+            changed = list(orders.values_list('id', flat=True))
+            Order.objects.filter(id__in=changed).update(status=status, updated_at=now, version=F('version') + 1)
+
+        changed.sort()
+        record_status_changes([Order(id=order_id, outlet_id=outlet_id, status=status) for order_id in changed])
+    return changed
+
+
+def change_status(order_id, status, version=None, queryset=None):
+    """
+    Move one order to ``status``, only from ``version`` when given.
+
+    Returns the updated order, loaded from ``queryset`` (default: all
+    orders). Raises ``Order.DoesNotExist``, ``InvalidTransition`` for a
+    status nothing moves to, and ``StatusConflict``.
+    """
+    sources = sources_of(status)
+    orders = Order.objects.filter(id=order_id, status__in=sources)
+    if version is not None:
+        orders = orders.filter(version=version)
+
+    with transaction.atomic():
+        if not orders.update(status=status, updated_at=timezone.now(), version=F('version') + 1):
+            current = Order.objects.filter(id=order_id).values_list('status', 'version').first()
+            if current is None:
+                raise Order.DoesNotExist
+            raise StatusConflict(*current)
+        order = (queryset if queryset is not None else Order.objects.all()).get(id=order_id)
+        record_status_changes([order])
+    return order
@@ -0,0 +1,40 @@
+"""
+Keyset (cursor) pagination for list endpoints that grow with an outlet.
+
+Page-number pagination counts every row and skips ``OFFSET`` rows, so page
+100 costs far more than page one. ``KeysetPagination`` orders by the primary
+key and resumes after the last id of the previous page, which an index
+answers directly at any depth. Clients opt in with ``?pagination=cursor`` and
+then follow the ``next`` / ``previous`` links; the total is counted only
+when asked for with ``?count=true``.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def wants_cursor(request):
+    return 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor'
+
+
+def wants_count(request):
+    return request.query_params.get('count', '').lower() in TRUE_VALUES
+
+
+class KeysetPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # Unique and never changes, as cursor pagination requires
+    ordering = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = queryset.count() if wants_count(request) else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+        return response
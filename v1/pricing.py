@@ -0,0 +1,113 @@
+"""
+Pricing and GST rules shared by every order path and catalog read.
+
+An inclusive price already contains GST, so its GST is extracted
+(``amount * rate / (100 + rate)``); an exclusive price gets GST added on top.
+A variant's own ``is_gst_inclusive`` flag decides how its price is read and
+the GST rate always comes from the product. Amounts are rounded half-up to
+paise per line, and order totals are the sum of the rounded lines.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+
+HUNDRED = Decimal('100')
+PAISE = Decimal('0.01')
+
+# One row of the compact price table built by v1.catalog
+PriceEntry = namedtuple('PriceEntry', ['product_id', 'name', 'price', 'gst_percentage', 'is_gst_inclusive'])
+
+
+class OrderError(Exception):
+    """Raised when an order cannot be built from the submitted data."""
+
+
+def round_amount(amount):
+    return Decimal(amount).quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def price_with_gst(price, gst_percentage, is_gst_inclusive):
+    """Tax-inclusive unit price shown on menus."""
+    price = Decimal(str(price))
+    gst_percentage = Decimal(str(gst_percentage))
+    if is_gst_inclusive:
+        return round_amount(price)
+    return round_amount(price + price * gst_percentage / HUNDRED)
+
+
+def line_amounts(price, quantity, gst_percentage, is_gst_inclusive):
+    """Return ``(total_price, gst)`` for ``quantity`` units at ``price``."""
+    amount = price * quantity
+    if is_gst_inclusive:
+        gst = amount * gst_percentage / (HUNDRED + gst_percentage)
+        total = amount
+    else:
+        gst = amount * gst_percentage / HUNDRED
+        total = amount + gst
+    return round_amount(total), round_amount(gst)
+
+
+def collect_catalog_ids(items_data):
+    """Return the product and variant ids referenced by the order lines."""
+    if not items_data:
+        raise OrderError("At least one item must be provided")
+
+    product_ids = set()
+    variant_ids = set()
+    for item_data in items_data:
+        if item_data.get('product'):
+            product_ids.add(item_data.get('product'))
+        elif item_data.get('product_variant'):
+            variant_ids.add(item_data.get('product_variant'))
+        else:
+            raise OrderError("Either product or variant ID must be provided")
+    return product_ids, variant_ids
+
+
+def price_lines(items_data, products, variants):
+    """
+    Price all order lines in one pass over a price table.
+
+    ``products`` and ``variants`` map ids to ``PriceEntry`` rows. Returns
+    ``(lines, total_price, total_gst)`` where each line holds the OrderItem
+    column values.
+    """
+    total_price = Decimal('0.00')
+    total_gst = Decimal('0.00')
+    lines = []
+
+    for item_data in items_data:
+        product_id = item_data.get('product')
+        variant_id = item_data.get('product_variant')
+        quantity = item_data.get('quantity')
+
+        # No default: a missing or zero quantity is a client bug, never one unit (booleans are ints too)
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            raise OrderError("Quantity must be a positive whole number")
+
+        if product_id:
+            entry = products.get(product_id)
+            if entry is None:
+                raise OrderError("Product not found")
+            variant_id = None
+        else:
+            entry = variants.get(variant_id)
+            if entry is None:
+                raise OrderError("Product variant not found")
+            # Variant lines also reference their product so kitchen tickets can show both names
+            product_id = entry.product_id
+
+        line_total, line_gst = line_amounts(entry.price, quantity, entry.gst_percentage, entry.is_gst_inclusive)
+        lines.append({
+            'product_id': product_id,
+            'product_variant_id': variant_id,
+            'quantity': quantity,
+            'price': entry.price,
+            'total_price': line_total,
+            'gst': line_gst,
+        })
+
+        total_price += line_total
+        total_gst += line_gst
+
+    return lines, total_price, total_gst
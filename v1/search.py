@@ -0,0 +1,239 @@
+"""
+Ranked product search over name, description, category and variant names.
+
+Each product has a ``ProductSearchDocument`` row holding its searchable text,
+refreshed by the signal handlers in v1.signals (``rebuild_search_index``
+refreshes them in bulk). Migration 0024 indexes those rows for the database
+in use:
+
+* SQLite: an external-content FTS5 table kept current by triggers, plus an
+  ``fts5vocab`` table listing every indexed term. Matches are ranked with
+  bm25, weighting the name highest.
+* PostgreSQL: a GIN index over a weighted ``tsvector`` of the same columns
+  and a ``pg_trgm`` index on the name. Matches are ranked with ``ts_rank``.
+
+Every word of a query matches as a prefix, so results narrow while the
+cashier types. When nothing matches, words of four letters or more are
+retried with typo tolerance: on SQLite against indexed terms within one
+edit (two for words of eight letters or more) that share the first letter,
+on PostgreSQL by trigram word similarity on the name. Other databases fall
+back to unranked substring matching.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Product, ProductSearchDocument, ProductVariant
+
+
+FTS_TABLE = 'v1_productsearch_fts'
+VOCAB_TABLE = 'v1_productsearch_vocab'
+
+# bm25 weights of the FTS columns name, description, category and variants
+FTS_WEIGHTS = (10.0, 1.0, 4.0, 3.0)
+
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', category), 'B') || "
+    "setweight(to_tsvector('simple', variants), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C')"
+)
+
+MIN_FUZZY_LENGTH = 4
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+_fts_available = None
+
+
+def parse_limit(value):
+    """``?limit=`` of the search endpoints, clamped to ``MAX_LIMIT``."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def refresh_documents(product_ids):
+    """Rewrite the search documents of ``product_ids``; documents of deleted products are dropped."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    products = Product.objects.filter(id__in=product_ids).values_list(
+        'id', 'outlet_id', 'name', 'description', 'category__name'
+    )
+    variants = {}
+    rows = ProductVariant.objects.filter(product_id__in=product_ids).order_by('id').values_list('product_id', 'name')
+    for product_id, name in rows:
+        variants.setdefault(product_id, []).append(name)
+
+    documents = [
+        ProductSearchDocument(
+            product_id=product_id,
+            outlet_id=outlet_id,
+            name=name,
+            description=description or '',
+            category=category or '',
+            variants=' '.join(variants.get(product_id, [])),
+        )
+        for product_id, outlet_id, name, description, category in products
+    ]
+    with transaction.atomic():
+        ProductSearchDocument.objects.filter(product_id__in=product_ids).delete()
+        ProductSearchDocument.objects.bulk_create(documents)
+
+
+def schedule_refresh(product_ids):
+    """
+    Refresh documents once the current transaction commits.
+
+    Deferred because a variant's delete signal fires while its product may be
+    deleting in the same transaction.
+    """
+    product_ids = set(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_documents(product_ids))
+
+
+def rebuild_index(outlet_id=None, batch_size=1000):
+    """Refresh every document, or those of one outlet; returns the number of products indexed."""
+    products = Product.objects.order_by('id')
+    stale = ProductSearchDocument.objects.exclude(product__in=Product.objects.all())
+    if outlet_id is not None:
+        products = products.filter(outlet_id=outlet_id)
+        stale = stale.filter(outlet_id=outlet_id)
+    stale.delete()
+
+    product_ids = list(products.values_list('id', flat=True))
+    for start in range(0, len(product_ids), batch_size):
+        refresh_documents(product_ids[start:start + batch_size])
+    return len(product_ids)
+
+
+def _has_fts():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def _edit_distance(a, b, limit):
+    # Levenshtein distance counting a swap of neighbouring letters as one edit;
+    # gives up once every path exceeds ``limit``
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _fts_phrase(term, prefix):
+    return '"%s"%s' % (term.replace('"', '""'), '*' if prefix else '')
+
+
+def _fts_typo_terms(cursor, word):
+    limit = 1 if len(word) < 8 else 2
+    cursor.execute(
+        f"SELECT term FROM {VOCAB_TABLE} WHERE term >= %s AND term < %s AND length(term) BETWEEN %s AND %s",
+        [word[0], word[0] + '\uffff', len(word) - limit, len(word) + limit],
+    )
+    return [term for term, in cursor.fetchall() if term != word and _edit_distance(word, term, limit) <= limit]
+
+
+def _fts_match(outlet_id, groups):
+    # The outlet is an indexed column too, so FTS5 narrows to it before ranking
+    return 'outlet_id : "%d" AND {name description category variants} : (%s)' % (outlet_id, ' AND '.join(groups))
+
+
+def _fts_search(outlet_id, words, limit):
+    sql = (
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+        f"ORDER BY bm25({FTS_TABLE}, {', '.join(map(str, FTS_WEIGHTS))}, 0.0) LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_fts_match(outlet_id, [_fts_phrase(word, True) for word in words]), limit])
+        found = [product_id for product_id, in cursor.fetchall()]
+        if found:
+            return found
+
+        groups, fuzzy = [], False
+        for word in words:
+            alternatives = [_fts_phrase(word, True)]
+            if len(word) >= MIN_FUZZY_LENGTH:
+                typos = _fts_typo_terms(cursor, word)
+                alternatives += [_fts_phrase(term, False) for term in typos]
+                fuzzy = fuzzy or bool(typos)
+            groups.append('(%s)' % ' OR '.join(alternatives))
+        if not fuzzy:
+            return []
+        cursor.execute(sql, [_fts_match(outlet_id, groups), limit])
+        return [product_id for product_id, in cursor.fetchall()]
+
+
+def _postgresql_search(outlet_id, words, limit):
+    with connection.cursor() as cursor:
+        query = ' & '.join(f'{word}:*' for word in words)
+        cursor.execute(
+            f"SELECT product_id FROM v1_productsearchdocument "
+            f"WHERE outlet_id = %s AND ({PG_VECTOR}) @@ to_tsquery('simple', %s) "
+            f"ORDER BY ts_rank({PG_VECTOR}, to_tsquery('simple', %s)) DESC, product_id LIMIT %s",
+            [outlet_id, query, query, limit],
+        )
+        found = [product_id for product_id, in cursor.fetchall()]
+        if found or not any(len(word) >= MIN_FUZZY_LENGTH for word in words):
+            return found
+
+        text = ' '.join(words)
+        cursor.execute(
+            "SELECT product_id FROM v1_productsearchdocument "
+            "WHERE outlet_id = %s AND %s <%% name "
+            "ORDER BY word_similarity(%s, name) DESC, product_id LIMIT %s",
+            [outlet_id, text, text, limit],
+        )
+        return [product_id for product_id, in cursor.fetchall()]
+
+
+def _basic_search(outlet_id, words, limit):
+    documents = ProductSearchDocument.objects.filter(outlet_id=outlet_id)
+    for word in words:
+        documents = documents.filter(
+            Q(name__icontains=word) | Q(category__icontains=word)
+            | Q(variants__icontains=word) | Q(description__icontains=word)
+        )
+    return list(documents.order_by('name', 'product_id').values_list('product_id', flat=True)[:limit])
+
+
+def search_product_ids(outlet_id, query, limit=DEFAULT_LIMIT):
+    """Ids of the outlet's products matching ``query``, best match first."""
+    words = tokenize(query)
+    if not words:
+        return []
+    if connection.vendor == 'sqlite' and _has_fts():
+        return _fts_search(outlet_id, words, limit)
+    if connection.vendor == 'postgresql':
+        return _postgresql_search(outlet_id, words, limit)
+    return _basic_search(outlet_id, words, limit)
+
+
+def search_products(outlet_id, query, limit=DEFAULT_LIMIT, queryset=None):
+    """Matching products in rank order, loaded from ``queryset`` (default: all products)."""
+    product_ids = search_product_ids(outlet_id, query, limit)
+    if queryset is None:
+        queryset = Product.objects.all()
+    products = queryset.in_bulk(product_ids)
+    return [products[product_id] for product_id in product_ids if product_id in products]
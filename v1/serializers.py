@@ -12,8 +12,11 @@ from .models import (
     StockRequest
 )
 from users.models import CustomUser
+from .images import ImageDerivativesField
 
 class OutletSerializer(serializers.ModelSerializer):
+    logo_thumbnails = ImageDerivativesField(source='logo')
+
     class Meta:
         model = Outlet
         fields = '__all__'
@@ -62,9 +65,10 @@ class EmployeeCreateSerializer(serializers.Serializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())  # Add category field
+    image_thumbnails = ImageDerivativesField(source='image')
     class Meta:
         model = Product
-        fields = ['id', 'name', 'price', 'image', 'description', 'outlet', 'is_gst_inclusive','category']
+        fields = ['id', 'name', 'price', 'image', 'image_thumbnails', 'description', 'outlet', 'is_gst_inclusive','category']
         
     def create(self, validated_data):
         # Create and return a new Product instance
@@ -128,7 +132,7 @@ class MenuListSerializer(serializers.ModelSerializer):
 class ProductVariantListSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductVariant
-        fields = ['id', 'name', 'price', 'is_gst_inclusive', 'extra_description']
+        fields = ['id', 'name', 'price', 'price_with_gst', 'is_gst_inclusive', 'extra_description']
         
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -139,10 +143,11 @@ class ProductVariantListSerializer(serializers.ModelSerializer):
 class ProductListSerializer(serializers.ModelSerializer):
     variants = ProductVariantListSerializer(many=True, read_only=True)
     category = serializers.CharField(source='category.name', read_only=True)
+    image_thumbnails = ImageDerivativesField(source='image')
     
     class Meta:
         model = Product
-        fields = ['id', 'name', 'price', 'image', 'description', 'is_gst_inclusive', 'variants','category']
+        fields = ['id', 'name', 'price', 'price_with_gst', 'image', 'image_thumbnails', 'description', 'is_gst_inclusive', 'variants','category']
         
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -179,9 +184,11 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class EmployeeSerializer(serializers.ModelSerializer):
+    profile_image_thumbnails = ImageDerivativesField(source='profile_image')
+
     class Meta:
         model = Employee
-        fields = ['first_name', 'last_name', 'email', 'phone_number', 'address', 'profile_image', 'date_of_birth', 'role', 'is_active', 'employee_code']
+        fields = ['first_name', 'last_name', 'email', 'phone_number', 'address', 'profile_image', 'profile_image_thumbnails', 'date_of_birth', 'role', 'is_active', 'employee_code']
 
 
 
@@ -0,0 +1,163 @@
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .catalog import invalidate_outlet
+from .customers import forget_customer
+from .images import IMAGE_FIELDS, derivatives_generated, schedule_derivatives
+from .menus import menu_cache_key, schedule_compile, schedule_outlet_menus
+from .models import Category, Customer, Employee, Menu, Outlet, Product, ProductVariant
+from .search import schedule_refresh
+from .sync import record_deletion
+
+
+# Sent with ``outlet_id`` whenever a category, product, variant or menu of an
+# outlet is saved or deleted, for consumers outside v1 (e.g. qr.publish)
+catalog_updated = Signal()
+
+
+def catalog_changed(outlet_id, menus):
+    """``menus`` are those whose documents show the change; only they are recompiled."""
+    invalidate_outlet(outlet_id)
+    schedule_compile(menus.values_list('id', flat=True))
+    catalog_updated.send(sender=Outlet, outlet_id=outlet_id)
+
+
+def touch_menus(menus):
+    # Menu rows do not change when their products do; delta syncs still need to see them
+    menus.update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # Menu documents show the category names of their products; a deleted category's
+    # products went first, see product_deleting
+    catalog_changed(instance.outlet_id, Menu.objects.filter(products__category=instance))
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    # Product search documents carry the category name
+    schedule_refresh(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    record_deletion(instance.outlet_id, 'category', instance.id)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    catalog_changed(instance.outlet_id, Menu.objects.filter(products=instance))
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    schedule_refresh([instance.id])
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    # The menu links are gone by post_delete
+    menus = Menu.objects.filter(products=instance)
+    schedule_compile(menus.values_list('id', flat=True))
+    touch_menus(menus)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    record_deletion(instance.outlet_id, 'product', instance.id)
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+def product_variant_changed(sender, instance, **kwargs):
+    outlet_id = Product.objects.filter(id=instance.product_id).values_list('outlet_id', flat=True).first()
+    if outlet_id is not None:
+        catalog_changed(outlet_id, Menu.objects.filter(products=instance.product_id))
+        if kwargs['signal'] is post_delete:
+            record_deletion(outlet_id, 'variant', instance.id)
+        # Product search documents carry the variant names
+        schedule_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=Menu)
+def menu_saved(sender, instance, **kwargs):
+    # Active-menu indexes are cached with the catalog
+    invalidate_outlet(instance.outlet_id)
+    schedule_compile([instance.id])
+    catalog_updated.send(sender=Outlet, outlet_id=instance.outlet_id)
+
+
+@receiver(post_delete, sender=Menu)
+def menu_deleted(sender, instance, **kwargs):
+    invalidate_outlet(instance.outlet_id)
+    cache.delete(menu_cache_key(instance.id))
+    record_deletion(instance.outlet_id, 'menu', instance.id)
+    catalog_updated.send(sender=Outlet, outlet_id=instance.outlet_id)
+
+
+@receiver(m2m_changed, sender=Menu.products.through)
+def menu_products_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    invalidate_outlet(instance.outlet_id)
+    if not reverse:
+        touch_menus(Menu.objects.filter(id=instance.id))
+        schedule_compile([instance.id])
+    elif pk_set:
+        # product.menus.add(...) / remove(...)
+        touch_menus(Menu.objects.filter(id__in=pk_set))
+        schedule_compile(pk_set)
+    else:
+        # product.menus.clear() does not say which menus were affected
+        touch_menus(Menu.objects.filter(outlet_id=instance.outlet_id))
+        schedule_outlet_menus(instance.outlet_id)
+    catalog_updated.send(sender=Outlet, outlet_id=instance.outlet_id)
+
+
+@receiver([post_save, post_delete], sender=Customer)
+def customer_changed(sender, instance, **kwargs):
+    forget_customer(instance.normalized_phone)
+
+
+def saved_image_fields(sender, update_fields):
+    return [field for model, field in IMAGE_FIELDS if model is sender and (update_fields is None or field in update_fields)]
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Outlet)
+@receiver(pre_save, sender=Employee)
+def image_saving(sender, instance, update_fields=None, **kwargs):
+    # The stored names, to tell in post_save whether an image changed; a new upload only
+    # gets its final name while the row is saved
+    fields = saved_image_fields(sender, update_fields)
+    stored = None
+    if fields and not instance._state.adding:
+        stored = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._stored_image_names = stored or {}
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Outlet)
+@receiver(post_save, sender=Employee)
+def image_saved(sender, instance, update_fields=None, **kwargs):
+    stored = instance.__dict__.pop('_stored_image_names', {})
+    # Saving a row for its other fields leaves the thumbnails alone
+    changed = [
+        getattr(instance, field).name for field in saved_image_fields(sender, update_fields)
+        if getattr(instance, field).name != stored.get(field)
+    ]
+    schedule_derivatives(changed)
+
+
+@receiver(derivatives_generated)
+def derivatives_ready(sender, source, **kwargs):
+    # Cached catalogs, compiled menus and published QR menus carry thumbnail URLs;
+    # bumping updated_at hands them to delta syncs too
+    products = Product.objects.filter(image=source)
+    outlet_ids = set(products.values_list('outlet_id', flat=True))
+    outlet_ids.update(Outlet.objects.filter(logo=source).values_list('id', flat=True))
+    products.update(updated_at=timezone.now())
+    for outlet_id in outlet_ids:
+        catalog_changed(outlet_id, Menu.objects.filter(outlet_id=outlet_id, products__image=source))
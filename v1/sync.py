@@ -0,0 +1,99 @@
+"""
+Delta catalog sync.
+
+A counter keeps a local copy of its outlet's catalog and asks only for what
+changed since its last sync. Changes are found through the ``updated_at``
+columns of categories, products, variants and menus, and deletions through
+``CatalogTombstone`` rows written by the signal handlers in v1.signals.
+
+The cursor handed back to clients is opaque to them. It lags the clock by
+``CATALOG_SYNC_CURSOR_LAG`` seconds: ``updated_at`` is stamped before a
+transaction commits, so a row may become visible after a sync that ran past
+its timestamp. Re-reading that window costs a few repeated rows, which
+clients apply idempotently, instead of a missed change.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .menus import attach_product_ids
+from .models import CatalogTombstone, Category, Menu, Product, ProductVariant
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_cursor_lag():
+    return timedelta(seconds=getattr(settings, 'CATALOG_SYNC_CURSOR_LAG', 5))
+
+
+def get_tombstone_retention():
+    return timedelta(days=getattr(settings, 'CATALOG_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def encode_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_cursor(cursor):
+    try:
+        micros = int(cursor)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid sync cursor.")
+    if micros < 0:
+        raise InvalidCursor("Invalid sync cursor.")
+    return datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(microseconds=micros)
+
+
+def record_deletion(outlet_id, kind, object_id):
+    CatalogTombstone.objects.create(outlet_id=outlet_id, kind=kind, object_id=object_id)
+
+
+def purge_tombstones(now=None):
+    """Delete tombstones older than the retention period; returns how many were removed."""
+    horizon = (now or timezone.now()) - get_tombstone_retention()
+    deleted, _ = CatalogTombstone.objects.filter(deleted_at__lt=horizon).delete()
+    return deleted
+
+
+def catalog_changes(outlet_id, since=None):
+    """
+    Collect the catalog rows of an outlet changed after ``since``.
+
+    Returns a dict with ``categories``, ``products``, ``variants`` and
+    ``menus`` (model instances; menus carry ``product_ids``), ``deleted``
+    (ids per kind), ``full`` and the next ``cursor``. Without ``since``, or
+    when ``since`` is older than the tombstones kept, every row is returned
+    with ``full`` set and the client must replace its copy.
+    """
+    now = timezone.now()
+    full = since is None or since < now - get_tombstone_retention()
+
+    categories = Category.objects.filter(outlet_id=outlet_id)
+    products = Product.objects.filter(outlet_id=outlet_id)
+    variants = ProductVariant.objects.filter(product__outlet_id=outlet_id)
+    menus = Menu.objects.filter(outlet_id=outlet_id)
+    deleted = {'categories': [], 'products': [], 'variants': [], 'menus': []}
+
+    if not full:
+        categories = categories.filter(updated_at__gt=since)
+        products = products.filter(updated_at__gt=since)
+        variants = variants.filter(updated_at__gt=since)
+        menus = menus.filter(updated_at__gt=since)
+
+        plural = {'category': 'categories', 'product': 'products', 'variant': 'variants', 'menu': 'menus'}
+        tombstones = CatalogTombstone.objects.filter(outlet_id=outlet_id, deleted_at__gt=since)
+        for kind, object_id in tombstones.order_by('deleted_at').values_list('kind', 'object_id'):
+            deleted[plural[kind]].append(object_id)
+
+    return {
+        'full': full,
+        'cursor': encode_cursor(now - get_cursor_lag()),
+        'categories': list(categories.order_by('id')),
+        'products': list(products.order_by('id')),
+        'variants': list(variants.order_by('id')),
+        'menus': attach_product_ids(menus.order_by('id')),
+        'deleted': deleted,
+    }
@@ -1,3 +1,459 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from pos.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+
+from . import order_numbers
+from .background import CoalescingQueue
+from .catalog import get_catalog_version, get_price_table
+from .customers import normalize_phone, upsert_customers
+from .management.commands.benchmark_orders import Command as BenchmarkCommand
+from .menus import get_menu_document
+from .models import (
+    Category, Company, Customer, Menu, MenuDocument, Order, OrderEvent, Outlet, Product, ProductVariant,
+)
+from .order_bus import DatabaseBackend
+from .order_numbers import allocate_order_numbers, next_order_number, reserve_block
+from .pricing import OrderError, PriceEntry, line_amounts, price_lines, price_with_gst
 
 # Create your tests here.
+
+
+class PricingTests(SimpleTestCase):
+    products = {1: PriceEntry(1, 'Tea', Decimal('105.00'), Decimal('5'), True)}
+    variants = {7: PriceEntry(1, 'Large', Decimal('100.00'), Decimal('5'), False)}
+
+    def test_inclusive_price_contains_gst(self):
+        self.assertEqual(price_with_gst(Decimal('105.00'), Decimal('5'), True), Decimal('105.00'))
+        self.assertEqual(line_amounts(Decimal('105.00'), 2, Decimal('5'), True), (Decimal('210.00'), Decimal('10.00')))
+
+    def test_exclusive_price_gets_gst_on_top(self):
+        self.assertEqual(price_with_gst(Decimal('100.00'), Decimal('18'), False), Decimal('118.00'))
+        self.assertEqual(line_amounts(Decimal('100.00'), 3, Decimal('5'), False), (Decimal('315.00'), Decimal('15.00')))
+
+    def test_amounts_round_half_up_per_line(self):
+        # 0.10 * 5% = 0.005, which rounds up to a paisa
+        self.assertEqual(line_amounts(Decimal('0.10'), 1, Decimal('5'), False), (Decimal('0.11'), Decimal('0.01')))
+
+    def test_order_totals_are_the_sum_of_lines(self):
+        lines, total_price, total_gst = price_lines(
+            [{'product': 1, 'quantity': 1}, {'product_variant': 7, 'quantity': 2}], self.products, self.variants
+        )
+        self.assertEqual([line['total_price'] for line in lines], [Decimal('105.00'), Decimal('210.00')])
+        # Variant lines reference their product too
+        self.assertEqual(lines[1]['product_id'], 1)
+        self.assertEqual((total_price, total_gst), (Decimal('315.00'), Decimal('15.00')))
+
+    def test_quantity_must_be_given_as_a_positive_whole_number(self):
+        for quantity in (0, -1, 1.5, '2', True, None):
+            with self.subTest(quantity=quantity), self.assertRaises(OrderError):
+                price_lines([{'product': 1, 'quantity': quantity}], self.products, self.variants)
+        with self.assertRaises(OrderError):
+            price_lines([{'product': 1}], self.products, self.variants)
+
+
+@override_settings(MENU_COMPILE_IN_BACKGROUND=False, QR_MENU_PUBLISH=False)
+class VariantPriceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        outlet = Outlet.objects.create(
+            company=company, logo='logos/outlet.png', gst_number='GST', outlet_name='Outlet', address='Address'
+        )
+        cls.product = Product.objects.create(
+            outlet=outlet, category=Category.objects.create(outlet=outlet, name='Mains'), name='Thali',
+            price=Decimal('100.00'), gst_percentage=Decimal('5'), is_gst_inclusive=False
+        )
+        cls.variant = ProductVariant.objects.create(product=cls.product, name='Large', price=Decimal('150.00'))
+
+    def test_a_new_gst_rate_reprices_the_variants(self):
+        self.product.gst_percentage = Decimal('12')
+        self.product.save()
+
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.price_with_gst, Decimal('168.00'))
+        self.assertEqual(self.variant.updated_at, Product.objects.get().updated_at)
+
+    def test_other_edits_leave_the_variants_alone(self):
+        updated_at = self.variant.updated_at
+        self.product.price = Decimal('110.00')
+        self.product.save()
+        self.product.save(update_fields=['name'])
+
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.price_with_gst, self.variant.updated_at), (Decimal('157.50'), updated_at))
+
+
+@override_settings(ORDER_NUMBER_BLOCK_SIZE=3, QR_MENU_PUBLISH=False)
+class OrderNumberTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet = Outlet.objects.create(
+            company=company, logo='logos/outlet.png', gst_number='GST', outlet_name='Outlet', address='Address'
+        )
+
+    def setUp(self):
+        # Blocks reserved by other tests were rolled back with them
+        order_numbers._blocks.clear()
+
+    def test_numbers_are_handed_out_in_order_from_a_block(self):
+        numbers = [next_order_number(self.outlet.id) for _ in range(5)]
+
+        self.assertEqual(numbers, [f'{self.outlet.id}-{value:06d}' for value in range(1, 6)])
+
+    def test_a_large_request_reserves_a_block_big_enough(self):
+        numbers = allocate_order_numbers(self.outlet.id, 10)
+
+        self.assertEqual(len(set(numbers)), 10)
+        self.assertEqual(next_order_number(self.outlet.id), f'{self.outlet.id}-000011')
+
+    def test_allocations_never_overlap_between_processes(self):
+        first = allocate_order_numbers(self.outlet.id, 2)
+        # Another process reserves from the shared sequence while this one still holds part of its block
+        start, end = reserve_block(self.outlet.id, 3)
+        rest = allocate_order_numbers(self.outlet.id, 4)
+
+        other = {order_numbers.format_order_number(self.outlet.id, value) for value in range(start, end)}
+        self.assertFalse(other & set(first + rest))
+        self.assertEqual(len(set(first + rest)), 6)
+
+
+
+@override_settings(MENU_COMPILE_IN_BACKGROUND=False, IMAGE_DERIVATIVES_IN_BACKGROUND=False, QR_MENU_PUBLISH=False)
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet = Outlet.objects.create(
+            company=company, logo='logos/outlet.png', gst_number='GST', outlet_name='Outlet', address='Address'
+        )
+        cls.product = Product.objects.create(
+            outlet=cls.outlet, category=Category.objects.create(outlet=cls.outlet, name='Mains'), name='Thali',
+            price=Decimal('100.00'), gst_percentage=Decimal('5'), is_gst_inclusive=False
+        )
+        # Compile the menus now, so the tests only see the work their own changes schedule
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.lunch, cls.drinks = Menu.objects.create(outlet=cls.outlet, name='Lunch'), Menu.objects.create(outlet=cls.outlet, name='Drinks')
+            cls.lunch.products.add(cls.product)
+
+    def setUp(self):
+        cache.clear()
+
+    def menu_versions(self):
+        return [get_menu_document(menu.id)[0] for menu in (self.lunch, self.drinks)]
+
+    def test_only_menus_showing_a_product_are_recompiled_once_per_transaction(self):
+        self.assertEqual(self.menu_versions(), [1, 1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for price in ('110.00', '120.00', '130.00'):
+                self.product.price = Decimal(price)
+                self.product.save()
+
+        self.assertEqual(self.menu_versions(), [2, 1])
+
+    def test_a_menu_recompiled_by_another_worker_is_not_served_from_this_cache(self):
+        version, _, _ = get_menu_document(self.lunch.id)
+        with self.assertNumQueries(1):
+            get_menu_document(self.lunch.id)
+
+        # Another worker's compile stores a new version without touching this process's cache
+        MenuDocument.objects.filter(menu=self.lunch).update(version=F('version') + 1, content='{"name":"Lunch"}')
+        self.assertEqual(get_menu_document(self.lunch.id)[::2], (version + 1, '{"name":"Lunch"}'))
+
+    @override_settings(QR_MENU_PUBLISH=True, QR_MENU_PUBLISH_IN_BACKGROUND=False)
+    def test_qr_menu_is_republished_once_per_transaction(self):
+        with mock.patch('qr.publish.publish_outlet') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save()
+                Category.objects.get().save()
+
+        # Outlets left over by rolled back tests may come along; this one is published once
+        self.assertEqual(publish.call_args_list.count(mock.call(self.outlet.id)), 1)
+
+    def test_version_is_bumped_once_the_edit_commits(self):
+        version = get_catalog_version(self.outlet.id)
+        get_price_table(self.outlet.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('120.00')
+            self.product.save()
+            # Until the edit commits, other readers still see the old rows under the old version
+            self.assertEqual(get_catalog_version(self.outlet.id), version)
+
+        self.assertGreater(get_catalog_version(self.outlet.id), version)
+        products, _ = get_price_table(self.outlet.id)
+        self.assertEqual(products[self.product.id].price, Decimal('120.00'))
+
+
+@override_settings(MENU_COMPILE_IN_BACKGROUND=False, QR_MENU_PUBLISH=False)
+class ImageDerivativeSignalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.outlet = Outlet.objects.create(
+            company=Company.objects.create(name='Company'), logo='logos/outlet.png', gst_number='GST',
+            outlet_name='Outlet', address='Address'
+        )
+        cls.category = Category.objects.create(outlet=cls.outlet, name='Mains')
+
+    def test_thumbnails_are_scheduled_only_when_the_image_changes(self):
+        with mock.patch('v1.signals.schedule_derivatives') as schedule:
+            product = Product.objects.create(
+                outlet=self.outlet, category=self.category, name='Thali', price=Decimal('100.00'),
+                gst_percentage=Decimal('5'), image='product_images/thali.png'
+            )
+            product.price = Decimal('120.00')
+            product.save()
+            product.image = 'product_images/thali-new.png'
+            product.save()
+
+        self.assertEqual(
+            [call.args[0] for call in schedule.call_args_list],
+            [['product_images/thali.png'], [], ['product_images/thali-new.png']]
+        )
+
+
+class CoalescingQueueTests(TestCase):
+    def setUp(self):
+        self.handled = []
+        self.queue = CoalescingQueue('test', self.handled.append, lambda: False)
+
+    def test_keys_of_a_transaction_are_handled_together_after_it_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue.schedule([2])
+            self.queue.schedule([1, 2])
+            self.assertEqual(self.handled, [])
+
+        self.assertEqual(self.handled, [[1, 2]])
+
+    def test_a_rolled_back_savepoint_loses_no_keys(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue.schedule([1])
+            try:
+                with transaction.atomic():
+                    # Its callback goes with the savepoint
+                    self.queue.schedule([2])
+                    raise ValueError
+            except ValueError:
+                pass
+
+        # Handling a key needlessly is harmless; losing one is not
+        self.assertEqual(self.handled, [[1, 2]])
+
+    def test_keys_of_a_rolled_back_block_go_with_the_next_commit(self):
+        try:
+            with transaction.atomic():
+                self.queue.schedule([1])
+                raise ValueError
+        except ValueError:
+            pass
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue.schedule([2])
+
+        self.assertEqual(self.handled, [[1, 2]])
+
+
+class CustomerDirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_phone_numbers_are_normalized(self):
+        for phone_number in ('98765 43210', '+91 98765-43210', '09876543210', '0091 9876543210'):
+            with self.subTest(phone_number=phone_number):
+                self.assertEqual(normalize_phone(phone_number), '9876543210')
+        self.assertIsNone(normalize_phone('n/a'))
+
+    def test_same_number_in_any_format_is_one_customer(self):
+        first, second, third = upsert_customers([('Asha', '98765 43210'), ('', '+91 9876543210'), ('Ravi', '12345')])
+
+        self.assertEqual(first.id, second.id)
+        self.assertNotEqual(first.id, third.id)
+        self.assertEqual(Customer.objects.count(), 2)
+
+    def test_later_name_wins_and_blank_names_keep_it(self):
+        customer = upsert_customers([('Asha', '9876543210')])[0]
+        upsert_customers([('Asha K', '9876543210')])
+        upsert_customers([('', '9876543210')])
+
+        self.assertEqual(Customer.objects.get(id=customer.id).name, 'Asha K')
+
+    def test_contacts_without_a_number_each_get_their_own_row(self):
+        first, second = upsert_customers([('Walk-in', ''), ('Walk-in', None)])
+
+        self.assertNotEqual(first.id, second.id)
+
+
+class LinkOrdersToCustomersMigrationTests(TransactionTestCase):
+    migrate_from = [('v1', '0017_customer_normalized_phone_order_customer')]
+    migrate_to = [('v1', '0018_link_orders_to_customers')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged_onto_the_oldest_customer(self):
+        apps = self.migrate(self.migrate_from)
+        Company = apps.get_model('v1', 'Company')
+        Outlet = apps.get_model('v1', 'Outlet')
+        Order = apps.get_model('v1', 'Order')
+        Customer = apps.get_model('v1', 'Customer')
+        outlet = Outlet.objects.create(
+            company=Company.objects.create(name='Company'), logo='logos/outlet.png', gst_number='GST',
+            outlet_name='Outlet', address='Address'
+        )
+        orders = [
+            Order.objects.create(outlet=outlet, order_number=f'1-{index}', total_price=Decimal('1.00'), gst=Decimal('0.00'))
+            for index in range(3)
+        ]
+        # Before 0018 every order had its own customer row
+        oldest = Customer.objects.create(name='Asha', phone_number='98765 43210', order=orders[0])
+        Customer.objects.create(name='Asha', phone_number='+91 9876543210', order=orders[1])
+        other = Customer.objects.create(name='Ravi', phone_number='12345', order=orders[2])
+
+        apps = self.migrate(self.migrate_to)
+        Order = apps.get_model('v1', 'Order')
+        Customer = apps.get_model('v1', 'Customer')
+
+        self.assertEqual(
+            list(Order.objects.order_by('id').values_list('customer_id', flat=True)), [oldest.id, oldest.id, other.id]
+        )
+        self.assertEqual(
+            list(Customer.objects.order_by('id').values_list('id', 'normalized_phone')),
+            [(oldest.id, '9876543210'), (other.id, '12345')]
+        )
+
+
+@override_settings(ORDER_EVENT_COMMIT_LAG=5, QR_MENU_PUBLISH=False)
+class DatabaseBusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Company')
+        cls.outlet = Outlet.objects.create(
+            company=company, logo='logos/outlet.png', gst_number='GST', outlet_name='Outlet', address='Address'
+        )
+        cls.order = Order.objects.create(outlet=cls.outlet, order_number='1-1', total_price=Decimal('1.00'), gst=Decimal('0.00'))
+
+    def event(self, event_id, **fields):
+        return OrderEvent.objects.create(id=event_id, outlet=self.outlet, order=self.order, kind='status', status='PROCESSING', **fields)
+
+    def test_an_event_committing_after_a_higher_id_is_still_delivered(self):
+        delivered = []
+        backend = DatabaseBackend(delivered.extend)
+        # Where listen() starts on an empty table, without its thread
+        backend._floor = 0
+
+        self.event(10)
+        self.assertEqual([event['id'] for event in backend._read()], [10])
+        # Id 5 was drawn earlier but its transaction committed later
+        self.event(5)
+        self.assertEqual([event['id'] for event in backend._read()], [5])
+        self.assertEqual(backend._read(), [])
+
+        # Published here once its transaction's on_commit ran: already delivered
+        backend.publish([{'id': 5, 'outlet_id': self.outlet.id, 'order_id': self.order.id, 'kind': 'status', 'status': 'PROCESSING'}])
+        self.assertEqual(delivered, [])
+
+    def test_settled_events_are_no_longer_remembered(self):
+        backend = DatabaseBackend(lambda events: None)
+        backend._floor = 0
+        self.event(3, created_at=timezone.now() - timedelta(minutes=1))
+        self.event(4)
+
+        backend._read()
+
+        self.assertEqual((backend._floor, backend._delivered), (3, {4}))
+
+
+class BenchmarkBaselineTests(SimpleTestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.path = os.path.join(workdir.name, 'baseline.json')
+        self.command = BenchmarkCommand()
+
+    def results(self, errors=0, server_errors=0, p95_ms=10.0, throughput_per_s=100.0, queries_per_order=8.0):
+        summary = {
+            'orders': 400, 'errors': errors, 'server_errors': server_errors, 'p95_ms': p95_ms,
+            'throughput_per_s': throughput_per_s, 'queries_per_order': queries_per_order,
+        }
+        return {'endpoints': {'counter': summary}}
+
+    def save(self, results):
+        with open(self.path, 'w') as handle:
+            json.dump(results, handle)
+
+    def test_check_passes_within_tolerance(self):
+        self.save(self.results())
+        self.command.check_baseline(self.path, self.results(p95_ms=12.0, throughput_per_s=80.0), 0.25)
+
+    def test_check_fails_on_failed_orders_even_if_the_baseline_had_them(self):
+        self.save(self.results(errors=75, server_errors=75))
+        with self.assertRaisesMessage(CommandError, "counter: 1 of 400 orders failed (1 server errors)"):
+            self.command.check_baseline(self.path, self.results(errors=1, server_errors=1), 0.25)
+
+    def test_check_fails_on_more_queries_per_order(self):
+        self.save(self.results())
+        with self.assertRaisesMessage(CommandError, "counter: 9.0 queries/order (baseline 8.0)"):
+            self.command.check_baseline(self.path, self.results(queries_per_order=9.0), 0.25)
+
+    def test_queued_orders_carry_their_share_of_the_drain(self):
+        summary = self.results(queries_per_order=0.2)['endpoints']['counter']
+        self.command.add_drain(summary, 100, 9, 0.5)
+        self.assertEqual(summary['drain_queries_per_order'], 0.09)
+        self.assertEqual(summary['queries_per_order'], 0.29)
+
+    def test_a_baseline_with_failed_orders_is_not_saved(self):
+        with self.assertRaisesMessage(CommandError, "Not saving a baseline with failed orders"):
+            self.command.save_baseline(self.path, self.results(errors=2, server_errors=2))
+        self.assertFalse(os.path.exists(self.path))
+
+        self.command.save_baseline(self.path, self.results())
+        with open(self.path) as handle:
+            self.assertEqual(json.load(handle), self.results())
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.path = os.path.join(workdir.name, 'db.sqlite3')
+
+    def connect(self):
+        settings_dict = {**connection.settings_dict, 'NAME': self.path, 'OPTIONS': {'timeout': 0}}
+        wrapper = SQLiteDatabaseWrapper(settings_dict, alias='lock-test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_file_databases_use_wal(self):
+        with self.connect().cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_transactions_take_the_write_lock_when_they_begin(self):
+        first, second = self.connect(), self.connect()
+        first._start_transaction_under_autocommit()
+        # A deferred BEGIN would succeed here and fail at the first write instead
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            second._start_transaction_under_autocommit()
+        first.cursor().execute('ROLLBACK')
+        second._start_transaction_under_autocommit()
+        second.cursor().execute('ROLLBACK')
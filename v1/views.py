@@ -3,7 +3,7 @@ import string
 
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -33,6 +33,10 @@ from .models import (
     StockRequest
 )
 
+from .active_menus import get_active_menu_index, requested_moment
+from .conditional import conditional, make_etag
+from .menus import get_menu_document
+from .pagination import KeysetPagination, wants_cursor
 from .serializers import (
     OutletSerializer,
     EmployeeCreateSerializer,
@@ -40,7 +44,6 @@ from .serializers import (
     ProductVariantSerializer,
     MenuSerializer,
     MenuListSerializer,
-    MenuDetailSerializer,
     CategorySerializer,
     EmployeeSerializer,
     StockRequestListSerializer,
@@ -51,6 +54,15 @@ from .serializers import (
 User = get_user_model()
 
 
+def menu_validators(request, menu_id):
+    # The compiled document's version identifies the menu payload
+    document = get_menu_document(menu_id)
+    if document is None:
+        return None
+    version, compiled_at, content = document
+    return make_etag(request, menu_id, version), compiled_at
+
+
 
 
 @swagger_auto_schema(
@@ -409,9 +421,19 @@ class ProductPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+CURSOR_PARAMETERS = [
+    openapi.Parameter('pagination', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['cursor'], required=False,
+                      description='"cursor" for keyset pagination: follow the next / previous links instead of page numbers'),
+    openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                      description='Opaque cursor taken from a next / previous link'),
+    openapi.Parameter('count', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, required=False,
+                      description='With cursor pagination, also count the total (an extra query)'),
+]
+
 @swagger_auto_schema(
     method='get',
     operation_description="Fetch all products for a specific outlet.",
+    manual_parameters=CURSOR_PARAMETERS,
     responses={
         200: "Products fetched successfully.",
         404: "No products found for this outlet."
@@ -420,9 +442,33 @@ class ProductPagination(PageNumberPagination):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_products(request, outlet_id):
+    products = Product.objects.filter(outlet__id=outlet_id).order_by('id')
+
+    # Keyset pagination: every page costs the same and the total is counted only on request
+    if wants_cursor(request):
+        paginator = KeysetPagination()
+        paginated_products = paginator.paginate_queryset(products, request)
+        if not paginated_products and paginator.cursor is None:
+            return Response(
+                {"error": True, "detail": "No products found for this outlet."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = ProductSerializer(paginated_products, many=True)
+        response_data = {
+            "error": False,
+            "detail": "Products fetched successfully.",
+            "products": serializer.data,
+            "products_on_current_page": len(serializer.data),
+            "next_page_url": paginator.get_next_link(),
+            "previous_page_url": paginator.get_previous_link()
+        }
+        if paginator.count is not None:
+            response_data["total_products"] = paginator.count
+        return Response(response_data, status=status.HTTP_200_OK)
+
     try:
         # Check if the outlet exists and get the products for the outlet
-        products = Product.objects.filter(outlet__id=outlet_id)
         if not products.exists():
             return Response(
                 {"error": True, "detail": "No products found for this outlet."},
@@ -446,7 +492,7 @@ def get_products(request, outlet_id):
         "error": False,
         "detail": "Products fetched successfully.",
         "products": serializer.data,
-        "total_products": products.count(),
+        "total_products": paginator.page.paginator.count,
         "total_pages": paginator.page.paginator.num_pages,
         "current_page": paginator.page.number,
         "products_on_current_page": len(serializer.data),
@@ -540,8 +586,16 @@ def add_menu(request,user_id):
 @swagger_auto_schema(
     method='get',
     operation_description="Fetch menus for a specific outlet.",
+    manual_parameters=[
+        openapi.Parameter('active', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, required=False,
+                          description='If true, only menus active now'),
+        openapi.Parameter('at', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                          description='ISO 8601 datetime; only menus active at that moment'),
+        *CURSOR_PARAMETERS,
+    ],
     responses={
         200: "Menus fetched successfully.",
+        400: "Invalid 'at' datetime.",
         404: "Outlet not found."
     }
 )
@@ -573,11 +627,22 @@ def get_outlet_menus(request, outlet_id,user_id):
     
     # Filter menus by outlet
     menus = Menu.objects.filter(outlet=outlet)
+
+    # Keep only menus active at the requested moment, if any
+    try:
+        moment = requested_moment(request)
+    except ValueError as e:
+        return Response({"error": True, "detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if moment is not None:
+        menus = menus.filter(id__in=get_active_menu_index(outlet.id).menus_at(moment))
     
-    # Paginate the response
-    paginator = PageNumberPagination()
-    paginator.page_size = 10  # Adjust page size as needed
-    paginated_menus = paginator.paginate_queryset(menus, request)
+    # Paginate the response, by cursor if the client asks for it
+    if wants_cursor(request):
+        paginator = KeysetPagination()
+    else:
+        paginator = PageNumberPagination()
+        paginator.page_size = 10  # Adjust page size as needed
+    paginated_menus = paginator.paginate_queryset(menus.order_by('id'), request)
     
     # Serialize the paginated menus
     serializer = MenuListSerializer(paginated_menus, many=True)
@@ -604,26 +669,27 @@ def get_outlet_menus(request, outlet_id,user_id):
     operation_description="Fetch details of a specific menu.",
     responses={
         200: "Menu details fetched successfully.",
+        304: "Not modified since the version in If-None-Match / If-Modified-Since.",
         404: "Menu not found."
     }
 )
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional(menu_validators)
 def get_menu_details(request, menu_id):
-    try:
-        # Check if the menu exists
-        menu = Menu.objects.get(id=menu_id)
-    except Menu.DoesNotExist:
+    # Precompiled menu JSON with products and variants; see v1.menus
+    document = get_menu_document(menu_id)
+    if document is None:
         return Response({"error": True, "detail": "Menu not found."}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Serialize the menu details with products and variants
-    serializer = MenuDetailSerializer(menu)
-    
-    return Response({
-        "error": False,
-        "detail": "Menu details fetched successfully.",
-        "menu": serializer.data
-    }, status=status.HTTP_200_OK)
+
+    version, compiled_at, content = document
+
+    # The stored document is spliced in as is, without decoding and re-encoding it
+    return HttpResponse(
+        '{"error":false,"detail":"Menu details fetched successfully.","menu":%s}' % content,
+        content_type='application/json',
+        status=status.HTTP_200_OK
+    )
 
 
 
@@ -874,6 +940,7 @@ def update_profile(request, employee_id,user_id):
 
 @swagger_auto_schema(
     method='get',
+    manual_parameters=CURSOR_PARAMETERS,
     responses={
         200: StockRequestListSerializer(many=True),
         400: 'Invalid request',
@@ -900,10 +967,13 @@ def get_pending_stock_requests(request, outlet_id,user_id):
         # Fetch all pending stock requests for the given outlet
         stock_requests = StockRequest.objects.filter(outlet_id=outlet_id, status='PENDING')
 
-        # Paginate the results
-        paginator = PageNumberPagination()
-        paginator.page_size = 10  # Customize the number of items per page
-        paginated_stock_requests = paginator.paginate_queryset(stock_requests, request)
+        # Paginate the results, by cursor if the client asks for it
+        if wants_cursor(request):
+            paginator = KeysetPagination()
+        else:
+            paginator = PageNumberPagination()
+            paginator.page_size = 10  # Customize the number of items per page
+        paginated_stock_requests = paginator.paginate_queryset(stock_requests.order_by('id'), request)
 
         # Serialize the data
         serializer = StockRequestListSerializer(paginated_stock_requests, many=True)